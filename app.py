@@ -2,8 +2,17 @@ import os
 from datetime import datetime, timedelta
 import requests
 import random
+import csv
 import hashlib
+import functools
+import threading
+import gzip
+import json
+import time
+import uuid
+import click
 from flask import Flask, request, session, jsonify, render_template, redirect, url_for, flash, g
+from flask.cli import AppGroup
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, current_user, login_user, logout_user, login_required
 from flask_bcrypt import Bcrypt
@@ -12,8 +21,30 @@ from flask_wtf.csrf import CSRFProtect, generate_csrf
 from wtforms import StringField, PasswordField, BooleanField, SubmitField, FloatField, SelectField
 from wtforms.validators import DataRequired, Email, EqualTo, ValidationError, Length
 from dotenv import load_dotenv
-from flask_babel import Babel, _, lazy_gettext as _l, format_date, format_datetime, format_time, format_timedelta
+from flask_babel import Babel, _, lazy_gettext as _l, get_locale as babel_locale, format_date, format_datetime, format_time, format_timedelta
 from flask_mail import Mail, Message
+from sqlalchemy import event, inspect as sa_inspect, or_, text
+from sqlalchemy.exc import IntegrityError
+import assets
+import db_engine
+import events
+import exports
+import farm_import
+import geo
+import images
+import jobs
+import rollups
+import metrics
+import sessions
+import synthetic
+import page_cache
+import profiler
+import upstream
+import cache
+import http_cache
+import logs
+import singleflight
+from http_cache import cache_control
 
 # --- 1. Configuration and Initialization ---
 
@@ -41,6 +72,9 @@ else:
     app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Pool sizing, pre-ping and recycling for Postgres, WAL and busy timeout for SQLite (see db_engine.py)
+app.config['DB_PROFILE'] = os.environ.get('DB_PROFILE', 'auto')
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = db_engine.engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config['DB_PROFILE'])
 
 # --- I18N CONFIG ---
 app.config['BABEL_DEFAULT_TIMEZONE'] = 'UTC'
@@ -51,12 +85,20 @@ app.config['LANGUAGES'] = {
 }
 
 # --- VERCEL FIX 3: SESSIONS ---
-# We use standard Flask "Signed Cookies" for Vercel. 
-# Filesystem sessions (Flask-Session) crash on Vercel because the disk is read-only.
+# Server-side sessions (see sessions.py): the cookie carries only an opaque id. The default
+# store is a table in the app database, which works on Vercel's read-only disk too.
+# SESSION_STORE=cookie goes back to Flask's signed cookies.
+app.config['SESSION_STORE'] = os.environ.get('SESSION_STORE', 'database')  # database, redis://..., sqlite:///path, cookie
+app.config['SESSION_TOUCH_SECONDS'] = int(os.environ.get('SESSION_TOUCH_SECONDS', 60))  # Min. seconds between expiry refreshes
+app.config['SESSION_SWEEP_SECONDS'] = int(os.environ.get('SESSION_SWEEP_SECONDS', 300))
+app.config['SESSION_SWEEP_BATCH'] = int(os.environ.get('SESSION_SWEEP_BATCH', 1000))
 app.config['SESSION_PERMANENT'] = True
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=60)
-app.config['SESSION_COOKIE_SECURE'] = True # Secure cookies for HTTPS
+app.config['SESSION_COOKIE_SECURE'] = os.environ.get('SESSION_COOKIE_SECURE', 'True').lower() in ['true', '1', 't'] # Secure cookies for HTTPS
 app.config['SESSION_COOKIE_HTTPONLY'] = True
+# before_request marks dynamic requests as modified, which already slides the expiry;
+# leaving the default refresh on would also attach the cookie to static responses.
+app.config['SESSION_REFRESH_EACH_REQUEST'] = False
 
 # MAIL CONFIGS
 app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
@@ -66,7 +108,78 @@ app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
 app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', app.config['MAIL_USERNAME'])
 
+# UPSTREAM APIS (overridable so load tests can point at local stand-ins)
+app.config['OPEN_METEO_FORECAST_URL'] = os.environ.get('OPEN_METEO_FORECAST_URL', 'https://api.open-meteo.com/v1/forecast')
+app.config['OPEN_METEO_ARCHIVE_URL'] = os.environ.get('OPEN_METEO_ARCHIVE_URL', 'https://archive-api.open-meteo.com/v1/archive')
+app.config['NOMINATIM_URL'] = os.environ.get('NOMINATIM_URL', 'https://nominatim.openstreetmap.org')
+
+# SHARED CACHE (see cache.py): redis://..., sqlite:///path, or memory; default is a SQLite file in instance/
+app.config['CACHE_URL'] = os.environ.get('CACHE_URL')
+app.config['CACHE_PREFIX'] = os.environ.get('CACHE_PREFIX', 'agri')
+# Coalesce identical upstream fetches across workers too, through locks in the shared cache
+app.config['SINGLEFLIGHT_SHARED'] = os.environ.get('SINGLEFLIGHT_SHARED', 'False').lower() in ['true', '1', 't']
+# Anonymous home/login/register pages are served from the cache; entries are keyed by DEPLOY_ID
+app.config['PAGE_CACHE'] = os.environ.get('PAGE_CACHE', 'True').lower() in ['true', '1', 't']
+app.config['PAGE_CACHE_TTL'] = int(os.environ.get('PAGE_CACHE_TTL', 3600))
+app.config['DEPLOY_ID'] = os.environ.get('DEPLOY_ID') or os.environ.get('SOURCE_VERSION')
+
+# ADVISORY JOBS (asynchronous POST /api/advisory, processed by an in-process elastic thread pool)
+app.config['ADVISORY_JOB_THREADS'] = int(os.environ.get('ADVISORY_JOB_THREADS', 8))
+app.config['ADVISORY_JOB_TIMEOUT_SECONDS'] = int(os.environ.get('ADVISORY_JOB_TIMEOUT_SECONDS', 120))
+app.config['ADVISORY_JOB_RETENTION_HOURS'] = int(os.environ.get('ADVISORY_JOB_RETENTION_HOURS', 24))
+
+# ADVISORY DEDUPLICATION (repeat requests in the same slot of the hourly forecast reuse the stored advisory; 0 disables)
+app.config['ADVISORY_DEDUPE_MINUTES'] = int(os.environ.get('ADVISORY_DEDUPE_MINUTES', 60))
+
+# EVENT STREAM (GET /api/events pushes advisories, read-state changes and weather alerts over SSE)
+app.config['EVENT_POLL_SECONDS'] = float(os.environ.get('EVENT_POLL_SECONDS', 1.0))
+app.config['EVENT_HEARTBEAT_SECONDS'] = int(os.environ.get('EVENT_HEARTBEAT_SECONDS', 15))
+app.config['EVENT_STREAM_MAX_SECONDS'] = int(os.environ.get('EVENT_STREAM_MAX_SECONDS', 300))  # Then the browser reconnects
+app.config['EVENT_STREAMS_PER_WORKER'] = int(os.environ.get('EVENT_STREAMS_PER_WORKER', 24))  # Extra threads, see gunicorn.conf.py
+app.config['EVENT_RETENTION_HOURS'] = int(os.environ.get('EVENT_RETENTION_HOURS', 24))
+
+# FORECAST STORE (hourly forecasts per geohash cell, refreshed by a background thread)
+app.config['FORECAST_DAYS'] = int(os.environ.get('FORECAST_DAYS', 3))
+app.config['OPEN_METEO_MAX_LOCATIONS'] = int(os.environ.get('OPEN_METEO_MAX_LOCATIONS', 50))  # Coordinates per request
+app.config['FORECAST_TTL_MINUTES'] = int(os.environ.get('FORECAST_TTL_MINUTES', 60))
+app.config['FORECAST_RETRY_MINUTES'] = int(os.environ.get('FORECAST_RETRY_MINUTES', 5))
+app.config['FORECAST_KEEP_WARM_DAYS'] = int(os.environ.get('FORECAST_KEEP_WARM_DAYS', 2))
+app.config['FORECAST_LEASE_SECONDS'] = int(os.environ.get('FORECAST_LEASE_SECONDS', 120))
+app.config['FORECAST_REFRESH_POLL_SECONDS'] = int(os.environ.get('FORECAST_REFRESH_POLL_SECONDS', 60))
+app.config['FORECAST_REFRESHER'] = os.environ.get('FORECAST_REFRESHER', 'True').lower() in ['true', '1', 't']
+
+# FARM IMPORT (uploads above the size limit are rejected with 413)
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 32 * 1024 * 1024))
+app.config['GEOCODE_MIN_INTERVAL'] = float(os.environ.get('GEOCODE_MIN_INTERVAL', 1.0))  # Nominatim usage policy
+app.config['FARM_IMPORT_GEOCODE_BUDGET'] = int(os.environ.get('FARM_IMPORT_GEOCODE_BUDGET', 25))
+
+# ADVISORY RETENTION (flask advisories prune)
+app.config['ADVISORY_RETENTION_DAYS'] = int(os.environ.get('ADVISORY_RETENTION_DAYS', 365))
+
+# METRICS (/metrics needs this bearer token; without one it only answers loopback requests)
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+
+# LOGGING (JSON lines on stderr, written by a background thread)
+app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO').upper()
+app.config['LOG_FORMAT'] = os.environ.get('LOG_FORMAT', 'json')  # or 'text'
+app.config['LOG_REQUESTS'] = os.environ.get('LOG_REQUESTS', 'True').lower() in ['true', '1', 't']
+app.config['LOG_UPSTREAM_ERRORS_PER_MINUTE'] = int(os.environ.get('LOG_UPSTREAM_ERRORS_PER_MINUTE', 10))
+
+# PROFILING (off unless one of the switches is set; see profiler.py)
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+app.config['PROFILE_ALL'] = os.environ.get('PROFILE_ALL', 'False').lower() in ['true', '1', 't']
+app.config['PROFILE_TOKEN'] = os.environ.get('PROFILE_TOKEN')
+app.config['PROFILE_ENDPOINTS'] = [e for e in os.environ.get('PROFILE_ENDPOINTS', '').split(',') if e]
+app.config['PROFILE_INTERVAL_MS'] = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+app.config['PROFILE_FORMAT'] = os.environ.get('PROFILE_FORMAT', 'collapsed')  # or 'speedscope'
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+
+# HTTP CACHING & COMPRESSION
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))
+
 db = SQLAlchemy(app)
+db_engine.init_app(app, db)
 bcrypt = Bcrypt(app)
 csrf = CSRFProtect(app)
 babel = Babel()
@@ -74,6 +187,16 @@ login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 login_manager.login_message = _('Please log in to access this page.')
 mail = Mail(app)
+metrics.init_app(app, db)
+logs.init_app(app)
+profiler.init_app(app)
+cache.init_app(app)
+STATIC_ENDPOINTS = ('static', 'built_asset')
+session_store = sessions.init_app(app, db, skip_endpoints=STATIC_ENDPOINTS)
+page_cache.init_app(app)
+http_cache.init_app(app)
+assets.init_app(app)
+images.init_app(app)
 
 
 # --- 2. DATA LOADING AND PREPARATION (Rule-Based Model) ---
@@ -252,75 +375,139 @@ def predict_yield_and_advise(crop, season, state, fert_kg, pest_l, rain_mm):
     advice = {"rain": rain_advice, "fertilizer": fert_advice, "pesticide": pest_advice}
     return predicted_yield, advice
 
-def generate_ai_advisory(farm, crop_type, crop_stage, soil_type, weather_data):
-    """Generates a structured, human-readable advisory as a dictionary."""
-    advice_lists = {
-        "alerts": [],
-        "irrigation": [],
-        "nutrients": [],
-        "pests_diseases": [],
-    }
-    priority = "Low"
-    weather_outlook = "Weather data is currently unavailable. Please check again later."
-
+ADVISORY_PAYLOAD_VERSION = 1
+SEVERE_WEATHER_CODES = (65, 82, 99)
+RAIN_WEATHER_CODES = (61, 63, 80, 81, 95, 96)
+FORECAST_RAIN_ALERT_MM = 10  # Rain over the next 48h worth planning irrigation around
+
+def evaluate_advisory_rules(crop_type, crop_stage, soil_type, weather_data):
+    """
+    Runs the advisory rules and returns a compact, language-neutral record:
+    the inputs, the priority and the codes of the rules that fired. Text is produced
+    later by render_advisory, in whatever language the reader uses.
+    """
     crop_info = CROP_ADVISORY_DATA.get(crop_type, CROP_ADVISORY_DATA["default"])
-    stage_key = crop_stage.title()
-    if stage_key not in crop_info["stages"]:
-        stage_key = next(iter(crop_info["stages"]))
-
-    stage_advice = crop_info["stages"].get(stage_key)
     ideal_min, ideal_max = crop_info["ideal_temp"]
-    advice_lists["nutrients"].append(f"For the {crop_stage.lower()} stage, {stage_advice}")
+    priority = "Low"
+    rules = []
+    payload = {"v": ADVISORY_PAYLOAD_VERSION, "crop": crop_type, "stage": crop_stage, "soil": soil_type}
 
     if weather_data:
         temp = weather_data.get('temperature')
         code = weather_data.get('weathercode')
-        weather_desc = WMO_WEATHER_CODES.get(code, "current weather conditions")
-        weather_outlook = f"The forecast indicates {weather_desc} with a temperature of {temp}°C."
+        payload["temp"], payload["code"] = temp, code
 
         if temp > ideal_max + 2:
             priority = "High"
-            advice_lists["alerts"].append(f"Heat Alert: Temperature ({temp}°C) is above the ideal maximum ({ideal_max}°C). This can cause heat stress.")
-            advice_lists["irrigation"].append("Consider irrigating during cooler parts of the day to reduce evaporation.")
+            rules.append("heat")
         elif temp < ideal_min - 2:
             priority = "High"
-            advice_lists["alerts"].append(f"Cold Alert: Temperature ({temp}°C) is below the ideal minimum ({ideal_min}°C). This could slow growth.")
+            rules.append("cold")
 
-        if code in [65, 82, 99]:
+        if code in SEVERE_WEATHER_CODES:
             priority = "High"
-            advice_lists["alerts"].append(f"Severe Weather Alert: {weather_desc} is expected, which may cause crop damage and waterlogging.")
-            advice_lists["irrigation"].append("Ensure field drainage is clear. Postpone irrigation.")
-        elif code in [61, 63, 80, 81, 95, 96]:
+            rules.append("severe_weather")
+        elif code in RAIN_WEATHER_CODES:
             if priority != "High": priority = "Medium"
-            advice_lists["irrigation"].append("Rain is expected, so monitor soil moisture before the next irrigation cycle.")
-            advice_lists["pests_diseases"].append("Increased humidity after rain can favor fungal diseases. Scout for signs of blight, mildew, or rust.")
+            rules.append("rain")
+
+        window = weather_data.get('window')
+        if window:
+            payload["rain48"], payload["tmax48"], payload["tmin48"] = window['precip_mm'], window['temp_max'], window['temp_min']
+            if window['precip_mm'] >= FORECAST_RAIN_ALERT_MM and "rain" not in rules and "severe_weather" not in rules:
+                if priority != "High": priority = "Medium"
+                rules.append("rain_forecast")
+            if window['temp_max'] > ideal_max + 2 and "heat" not in rules:
+                if priority != "High": priority = "Medium"
+                rules.append("heat_forecast")
+            if window['temp_min'] < ideal_min - 2 and "cold" not in rules:
+                if priority != "High": priority = "Medium"
+                rules.append("cold_forecast")
 
     if soil_type.lower() == "sandy":
-        advice_lists["irrigation"].append("Your sandy soil drains quickly. If irrigating, prefer more frequent, shorter cycles to prevent water and nutrient runoff.")
+        rules.append("sandy_soil")
     elif soil_type.lower() == "clay":
-        advice_lists["irrigation"].append("Your clay soil retains water well. Check for waterlogging after rain or heavy irrigation.")
+        rules.append("clay_soil")
+
+    payload["priority"] = priority
+    payload["rules"] = rules
+    return payload
+
+def render_advisory(payload):
+    """Turns an evaluated advisory record into display text in the current locale."""
+    crop_info = CROP_ADVISORY_DATA.get(payload["crop"], CROP_ADVISORY_DATA["default"])
+    crop_stage = payload["stage"]
+    stage_key = crop_stage.title()
+    if stage_key not in crop_info["stages"]:
+        stage_key = next(iter(crop_info["stages"]))
+    ideal_min, ideal_max = crop_info["ideal_temp"]
+    rules = payload["rules"]
+    alerts, irrigation, pests_diseases = [], [], []
+    nutrients = [_("For the {stage} stage, {advice}").format(stage=_(crop_stage).lower(), advice=_(crop_info["stages"][stage_key]))]
+
+    temp, code = payload.get("temp"), payload.get("code")
+    if "temp" in payload:
+        weather_desc = _(WMO_WEATHER_CODES[code]) if code in WMO_WEATHER_CODES else _("current weather conditions")
+        weather_outlook = _("The forecast indicates {weather} with a temperature of {temp}°C.").format(weather=weather_desc, temp=temp)
+    else:
+        weather_outlook = _("Weather data is currently unavailable. Please check again later.")
+
+    if "heat" in rules:
+        alerts.append(_("Heat Alert: Temperature ({temp}°C) is above the ideal maximum ({ideal_max}°C). This can cause heat stress.").format(temp=temp, ideal_max=ideal_max))
+        irrigation.append(_("Consider irrigating during cooler parts of the day to reduce evaporation."))
+    if "cold" in rules:
+        alerts.append(_("Cold Alert: Temperature ({temp}°C) is below the ideal minimum ({ideal_min}°C). This could slow growth.").format(temp=temp, ideal_min=ideal_min))
+    if "severe_weather" in rules:
+        alerts.append(_("Severe Weather Alert: {weather} is expected, which may cause crop damage and waterlogging.").format(weather=weather_desc))
+        irrigation.append(_("Ensure field drainage is clear. Postpone irrigation."))
+    if "rain" in rules:
+        irrigation.append(_("Rain is expected, so monitor soil moisture before the next irrigation cycle."))
+        pests_diseases.append(_("Increased humidity after rain can favor fungal diseases. Scout for signs of blight, mildew, or rust."))
+    if "rain_forecast" in rules:
+        irrigation.append(_("About {rain} mm of rain is forecast over the next 48 hours. Consider postponing irrigation and fertilizer application.").format(rain=payload["rain48"]))
+    if "heat_forecast" in rules:
+        alerts.append(_("Heat Watch: Temperatures up to {temp}°C are forecast over the next 48 hours, above the ideal maximum ({ideal_max}°C).").format(temp=payload["tmax48"], ideal_max=ideal_max))
+        irrigation.append(_("Plan irrigation for early morning or evening ahead of the hot spell."))
+    if "cold_forecast" in rules:
+        alerts.append(_("Cold Watch: Temperatures down to {temp}°C are forecast over the next 48 hours, below the ideal minimum ({ideal_min}°C).").format(temp=payload["tmin48"], ideal_min=ideal_min))
+    if "sandy_soil" in rules:
+        irrigation.append(_("Your sandy soil drains quickly. If irrigating, prefer more frequent, shorter cycles to prevent water and nutrient runoff."))
+    if "clay_soil" in rules:
+        irrigation.append(_("Your clay soil retains water well. Check for waterlogging after rain or heavy irrigation."))
 
     actionable_advice = {}
-    if advice_lists["irrigation"]:
-        actionable_advice["Irrigation"] = ' '.join(advice_lists["irrigation"])
-    if advice_lists["nutrients"]:
-        actionable_advice["Crop Management"] = ' '.join(advice_lists["nutrients"])
-    if advice_lists["pests_diseases"]:
-        actionable_advice["Pest & Disease Watch"] = ' '.join(advice_lists["pests_diseases"])
-
-    if advice_lists["alerts"]:
-        alert_text = ' '.join(advice_lists["alerts"])
-        if "Crop Management" in actionable_advice:
-            actionable_advice["Crop Management"] = f"**Alerts:** {alert_text} " + actionable_advice["Crop Management"]
-        else:
-            actionable_advice["Alerts"] = alert_text
+    if irrigation:
+        actionable_advice[_("Irrigation")] = ' '.join(irrigation)
+    crop_management = ' '.join(nutrients)
+    if alerts:
+        crop_management = _("**Alerts:** {alerts}").format(alerts=' '.join(alerts)) + " " + crop_management
+    actionable_advice[_("Crop Management")] = crop_management
+    if pests_diseases:
+        actionable_advice[_("Pest & Disease Watch")] = ' '.join(pests_diseases)
+
+    content = f"{_('Weather Outlook')}:\n{weather_outlook}\n\n" + _("ACTIONABLE ADVICE") + "\n" + "\n\n".join(
+        f"{key}:\n{value}" for key, value in actionable_advice.items())
 
     return {
-        "priority": priority.title(),
+        "crop_display": _(payload["crop"]),
+        "priority": payload["priority"],
+        "priority_display": _(payload["priority"]),
         "weather_outlook": weather_outlook,
-        "actionable_advice": actionable_advice
+        "actionable_advice": actionable_advice,
+        "content": content,
     }
 
+@functools.lru_cache(maxsize=4096)
+def _render_advisory_cached(payload_json, locale):
+    # Identical advisories (same crop, stage, soil, weather and rules) share one entry per
+    # locale. The locale is only part of the key; gettext already follows the request.
+    # The returned dict is shared, so callers must not modify it.
+    return render_advisory(json.loads(payload_json))
+
+def generate_ai_advisory(farm, crop_type, crop_stage, soil_type, weather_data):
+    """Generates a structured, human-readable advisory as a dictionary."""
+    return render_advisory(evaluate_advisory_rules(crop_type, crop_stage, soil_type, weather_data))
+
 
 # --- 4. Database Models ---
 class User(db.Model, UserMixin):
@@ -352,17 +539,132 @@ class Farm(db.Model):
     area_hectares = db.Column(db.Float, nullable=True)
     area_geojson = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    geohash = db.Column(db.String(12), nullable=True, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     advisories = db.relationship('Advisory', backref='farm', lazy=True, cascade='all, delete-orphan')
+    advisory_jobs = db.relationship('AdvisoryJob', backref='farm', lazy=True, cascade='all, delete-orphan')
+
+    @property
+    def weather_cell(self):
+        return self.geohash[:geo.WEATHER_CELL_PRECISION] if self.geohash else None
+
+    @staticmethod
+    def in_cells(cells, query=None):
+        """Filters farms whose geohash starts with any of the given cell prefixes (index range scans)."""
+        query = query if query is not None else Farm.query
+        cells = list(cells)
+        if not cells:
+            return query.filter(db.false())
+        return query.filter(or_(*[Farm.geohash.startswith(cell, autoescape=True) for cell in cells]))
+
+    @staticmethod
+    def within_bbox(min_lat, min_lon, max_lat, max_lon, query=None):
+        """Farms inside a bounding box, narrowed by geohash prefixes before the exact coordinate check."""
+        cells = geo.cells_covering_bbox(min_lat, min_lon, max_lat, max_lon)
+        return Farm.in_cells(cells, query).filter(
+            Farm.latitude.between(min_lat, max_lat),
+            Farm.longitude.between(min_lon, max_lon)
+        )
+
+    @staticmethod
+    def within_radius(latitude, longitude, radius_km, query=None):
+        """Returns [(farm, distance_km), ...] within radius_km of a point, nearest first."""
+        candidates = Farm.within_bbox(*geo.bbox_around(latitude, longitude, radius_km), query=query).all()
+        results = []
+        for farm in candidates:
+            distance = geo.haversine_km(latitude, longitude, farm.latitude, farm.longitude)
+            if distance <= radius_km:
+                results.append((farm, distance))
+        return sorted(results, key=lambda item: item[1])
+
+    @staticmethod
+    def group_by_cell(farms, precision=geo.WEATHER_CELL_PRECISION):
+        """Groups farms by geohash cell so callers can do one upstream call per cell."""
+        groups = {}
+        for farm in farms:
+            cell = farm.geohash[:precision] if farm.geohash else geo.encode(farm.latitude, farm.longitude, precision)
+            if cell:
+                groups.setdefault(cell, []).append(farm)
+        return groups
+
+    @staticmethod
+    def cell_counts(precision=geo.WEATHER_CELL_PRECISION):
+        """Number of farms per geohash cell, computed in the database."""
+        cell = db.func.substr(Farm.geohash, 1, precision)
+        return dict(db.session.query(cell, db.func.count(Farm.id)).filter(Farm.geohash.isnot(None)).group_by(cell).all())
+
+@event.listens_for(Farm, 'before_insert')
+@event.listens_for(Farm, 'before_update')
+def sync_farm_geohash(mapper, connection, farm):
+    """Keeps Farm.geohash in step with latitude/longitude on every insert and update."""
+    farm.geohash = geo.encode(farm.latitude, farm.longitude)
 
 class Advisory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    # title/content hold pre-rendered text only for advisories created before payload existed;
+    # newer rows leave them empty and render from payload in the reader's language.
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
     priority = db.Column(db.String(50), nullable=False, default='Medium')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     farm_id = db.Column(db.Integer, db.ForeignKey('farm.id'), nullable=False)
     is_read = db.Column(db.Boolean, default=False)
+    payload = db.Column(db.Text, nullable=True)
+    payload_hash = db.Column(db.String(40), nullable=True, index=True)
+    dedupe_key = db.Column(db.String(40), nullable=True, index=True, unique=True)  # See advisory_dedupe_key
+
+    @staticmethod
+    def from_payload(farm, payload):
+        payload_json = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        return Advisory(
+            title='', content='', priority=payload['priority'], farm_id=farm.id, payload=payload_json,
+            payload_hash=hashlib.sha1(payload_json.encode('utf-8')).hexdigest()
+        )
+
+    @property
+    def rendered(self):
+        if self.payload is None:
+            return None
+        return _render_advisory_cached(self.payload, str(babel_locale()))
+
+    @property
+    def display_title(self):
+        rendered = self.rendered
+        if rendered is None:
+            return self.title
+        return _("AgriAssist advisory for {crop_type} at {farm_name}").format(crop_type=rendered['crop_display'], farm_name=self.farm.name)
+
+    @property
+    def display_content(self):
+        rendered = self.rendered
+        return self.content if rendered is None else rendered['content']
+
+class AdvisoryJob(db.Model):
+    """A queued advisory request, processed by the background job pool (see jobs.py)."""
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    farm_id = db.Column(db.Integer, db.ForeignKey('farm.id'), nullable=False)
+    crop_type = db.Column(db.String(50), nullable=False)
+    crop_stage = db.Column(db.String(50), nullable=False)
+    soil_type = db.Column(db.String(50), nullable=False)
+    dedupe_key = db.Column(db.String(40), nullable=True, index=True)
+    status = db.Column(db.String(10), nullable=False, default='queued', index=True)  # queued, running, done, failed
+    # Not a foreign key: bulk advisory deletes and pruning must not be blocked by old jobs.
+    advisory_id = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.String(200), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+class IdempotencyKey(db.Model):
+    """What the first POST /api/advisory with a client's Idempotency-Key produced, for replaying retries."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    key = db.Column(db.String(64), primary_key=True)
+    request_hash = db.Column(db.String(40), nullable=False)
+    advisory_id = db.Column(db.Integer, nullable=True)
+    job_id = db.Column(db.String(32), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
 class TranslationCache(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -397,6 +699,104 @@ class TranslationCache(db.Model):
         ).first()
         return entry.translated_text if entry else None
 
+class ForecastCell(db.Model):
+    """Latest hourly forecast for one weather cell (geohash prefix), shared by all workers."""
+    cell = db.Column(db.String(12), primary_key=True)
+    hourly = db.Column(db.Text, nullable=True)
+    fetched_at = db.Column(db.DateTime, nullable=True)
+    refresh_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    requested_at = db.Column(db.DateTime, nullable=True)
+    claimed_until = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(200), nullable=True)
+    alert = db.Column(db.String(20), nullable=True)  # Severe weather code expected soon, if any
+
+class UserEvent(db.Model):
+    """A change pushed to the user's open pages over GET /api/events (see events.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # advisory, read, deleted, weather_alert
+    data = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class YieldPrediction(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    crop = db.Column(db.String(50), nullable=False)
+    state = db.Column(db.String(50), nullable=False)
+    season = db.Column(db.String(20), nullable=False)
+    year = db.Column(db.SmallInteger, nullable=False)
+    area_hectares = db.Column(db.Float, nullable=False)
+    fertilizer_kg = db.Column(db.Float, nullable=False)
+    pesticide_l = db.Column(db.Float, nullable=False)
+    rainfall_mm = db.Column(db.Float, nullable=False)
+    yield_per_ha = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class YieldRollup(db.Model):
+    """Running count/sum/min/max of predicted yield per (crop, state, season, year); '*' means all."""
+    crop = db.Column(db.String(50), primary_key=True)
+    state = db.Column(db.String(50), primary_key=True)
+    season = db.Column(db.String(20), primary_key=True)
+    year = db.Column(db.SmallInteger, primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+    total = db.Column(db.Float, nullable=False)
+    min_yield = db.Column(db.Float, nullable=False)
+    max_yield = db.Column(db.Float, nullable=False)
+
+class YieldRollupBucket(db.Model):
+    """Log-scale histogram behind YieldRollup percentiles (see rollups.py)."""
+    crop = db.Column(db.String(50), primary_key=True)
+    state = db.Column(db.String(50), primary_key=True)
+    season = db.Column(db.String(20), primary_key=True)
+    year = db.Column(db.SmallInteger, primary_key=True)
+    bucket = db.Column(db.SmallInteger, primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+
+def _rollup_keys(crop, state, season, year):
+    # Every prediction feeds its own key plus the all-seasons, all-states and national totals.
+    return [{'crop': crop, 'state': st, 'season': se, 'year': year}
+            for st in (state, rollups.ALL) for se in (season, rollups.ALL)]
+
+def record_yield_prediction(user_id, crop, state, season, area, fert_kg, pest_l, rain_mm, yield_per_ha):
+    """Stores a prediction and folds it into the rollups in the same transaction."""
+    year = datetime.utcnow().year
+    db.session.add(YieldPrediction(
+        user_id=user_id, crop=crop, state=state, season=season, year=year, area_hectares=area,
+        fertilizer_kg=fert_kg, pesticide_l=pest_l, rainfall_mm=rain_mm, yield_per_ha=yield_per_ha
+    ))
+    _add_to_rollups(crop, state, season, year, yield_per_ha)
+    db.session.commit()
+
+def _add_to_rollups(crop, state, season, year, value, weight=1):
+    bucket = rollups.bucket_for(value)
+    for keys in _rollup_keys(crop, state, season, year):
+        rollups.upsert(db.session, YieldRollup.__table__, keys,
+                       {'count': weight, 'total': value * weight, 'min_yield': value, 'max_yield': value},
+                       increments=('count', 'total'), minimums=('min_yield',), maximums=('max_yield',))
+        rollups.upsert(db.session, YieldRollupBucket.__table__, dict(keys, bucket=bucket), {'count': weight},
+                       increments=('count',))
+
+def yield_rollup_stats(crop, state=rollups.ALL, season=rollups.ALL, year=None, value=None):
+    """Reads one rollup (two indexed lookups). With `value`, also reports its percentile rank."""
+    year = year or datetime.utcnow().year
+    rollup = db.session.get(YieldRollup, (crop, state, season, year))
+    if rollup is None:
+        return None
+    buckets = dict(db.session.execute(
+        db.select(YieldRollupBucket.bucket, YieldRollupBucket.count).where(
+            YieldRollupBucket.crop == crop, YieldRollupBucket.state == state,
+            YieldRollupBucket.season == season, YieldRollupBucket.year == year)
+    ).all())
+    stats = {
+        'crop': crop, 'state': state, 'season': season, 'year': year, 'count': rollup.count,
+        'mean': round(rollup.total / rollup.count, 2), 'min': rollup.min_yield, 'max': rollup.max_yield,
+    }
+    for name, q in (('p25', 0.25), ('p50', 0.5), ('p75', 0.75), ('p90', 0.9)):
+        stats[name] = round(min(max(rollups.percentile(buckets, q), rollup.min_yield), rollup.max_yield), 2)
+    if value is not None:
+        stats['percent_rank'] = rollups.percent_rank(buckets, value)
+    return stats
+
 # --- 5. User Loader and i18n ---
 
 @login_manager.user_loader
@@ -421,10 +821,15 @@ app.jinja_env.filters['format_timedelta'] = format_timedelta
 
 @app.before_request
 def before_request():
+    # Static files are publicly cacheable, so they must not refresh the session cookie.
+    if request.endpoint in STATIC_ENDPOINTS:
+        return
     session.permanent = True
     app.permanent_session_lifetime = timedelta(minutes=60) # Increased to 60 mins
     session.modified = True
     g.language = get_locale()
+    ensure_forecast_refresher()
+    advisory_job_pool.start()
 
 # --- 6. Web Forms ---
 
@@ -477,6 +882,7 @@ class PredictionForm(FlaskForm):
 
 @app.route('/')
 @app.route('/home')
+@page_cache.cached_page
 def home():
     return render_template('home.html', title=_('Home'), google_maps_api_key=app.config.get('GOOGLE_MAPS_API_KEY'))
 
@@ -525,28 +931,30 @@ def farms():
         google_maps_api_key=app.config.get('GOOGLE_MAPS_API_KEY')
     )
 
-@app.route('/advisories')
-@login_required
-def advisories():
-    farm_ids = [farm.id for farm in current_user.farms]
-    query = Advisory.query.filter(Advisory.farm_id.in_(farm_ids))
+def advisory_filters(args):
+    """WHERE clauses shared by the advisories page and the export: owner plus farm/status/priority filters."""
+    clauses = [owned_advisories()]
 
-    filter_farm_id = request.args.get('farm_id')
+    filter_farm_id = args.get('farm_id')
     if filter_farm_id and filter_farm_id.isdigit():
-        query = query.filter(Advisory.farm_id == int(filter_farm_id))
+        clauses.append(Advisory.farm_id == int(filter_farm_id))
 
-    filter_status = request.args.get('status')
+    filter_status = args.get('status')
     if filter_status == 'read':
-        query = query.filter_by(is_read=True)
+        clauses.append(Advisory.is_read.is_(True))
     elif filter_status == 'unread':
-        query = query.filter_by(is_read=False)
+        clauses.append(Advisory.is_read.is_(False))
 
-    filter_priority = request.args.get('priority', '').lower()
+    filter_priority = args.get('priority', '').lower()
     if filter_priority in ['high', 'medium', 'low']:
-        query = query.filter(Advisory.priority.ilike(filter_priority))
+        clauses.append(Advisory.priority.ilike(filter_priority))
+    return clauses
+
+@app.route('/advisories')
+@login_required
+def advisories():
+    all_advisories = Advisory.query.filter(*advisory_filters(request.args)).order_by(Advisory.created_at.desc()).all()
 
-    all_advisories = query.order_by(Advisory.created_at.desc()).all()
-    
     crop_options_translated = [(c, _(c)) for c in CROP_OPTIONS]
     crop_stages_translated = [(s, _(s)) for s in CROP_STAGE_OPTIONS]
     soil_types_translated = [(s, _(s)) for s in SOIL_TYPE_OPTIONS]
@@ -631,10 +1039,11 @@ def send_otp_email(recipient, otp):
             body=_("Your one-time verification code is: {otp}. It will expire in 5 minutes.").format(otp=otp),
             html=html_body
         )
-        mail.send(msg)
+        with metrics.track_upstream('smtp'):
+            mail.send(msg)
         return True
     except Exception as e:
-        print(f"Error sending email to {recipient}: {e}")
+        logs.upstream_log.error("Could not send OTP email", extra={'service': 'smtp', 'error': str(e)})
         return False
 
 def send_welcome_email(recipient, first_name):
@@ -700,13 +1109,15 @@ def send_welcome_email(recipient, first_name):
             recipients=[recipient],
             html=html_body
         )
-        mail.send(msg)
+        with metrics.track_upstream('smtp'):
+            mail.send(msg)
         return True
     except Exception as e:
-        print(f"Error sending welcome email to {recipient}: {e}")
+        logs.upstream_log.error("Could not send welcome email", extra={'service': 'smtp', 'error': str(e)})
         return False
 
 @app.route('/login', methods=['GET', 'POST'])
+@page_cache.cached_page
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('dashboard'))
@@ -734,6 +1145,7 @@ def logout():
     return redirect(url_for('home'))
 
 @app.route('/register', methods=['GET', 'POST'])
+@page_cache.cached_page
 def register():
     if current_user.is_authenticated:
         return redirect(url_for('dashboard'))
@@ -817,59 +1229,367 @@ def change_language(language):
 
 # --- 9. API Routes and Helpers ---
 
+# Forecasts are kept per geohash cell in ForecastCell and refreshed in the background,
+# so a request only reads a row. A missing cell is fetched once synchronously; a stale
+# one is still served (with its age) while the refresher fetches a new copy.
+FORECAST_HOURLY_VARIABLES = 'temperature_2m,precipitation,weather_code,is_day'
+FORECAST_WINDOW_HOURS = 48
+WEATHER_ALERT_HOURS = 24  # Severe weather this close is pushed to farmers as an alert
+weather_cache = cache.Namespace('weather_cell', ttl=60, maxsize=4096)  # In front of the forecast store
+geocode_cache = cache.Namespace('geocode', ttl=30 * 86400, maxsize=2048)
+reverse_geocode_cache = cache.Namespace('reverse_geocode', ttl=30 * 86400, maxsize=2048)
+rainfall_cache = cache.Namespace('rainfall', ttl=30 * 86400, maxsize=2048)
+forecast_flight = singleflight.Group('forecast')
+
+def _hourly_from_location(location):
+    hourly = (location or {}).get('hourly') or {}
+    if not all(key in hourly for key in ['time', 'temperature_2m', 'weather_code']):
+        raise ValueError('forecast response is missing hourly data')
+    return {key: hourly.get(key) for key in ['time', 'temperature_2m', 'precipitation', 'weather_code', 'is_day']}
+
+def fetch_forecasts(cells):
+    """
+    Hourly multi-day forecasts for the centres of several cells, using Open-Meteo's
+    comma-separated coordinate lists: one request per OPEN_METEO_MAX_LOCATIONS cells.
+    Returns {cell: hourly}. Raises on network or format errors.
+    """
+    cells = list(dict.fromkeys(cells))
+    forecasts = {}
+    size = app.config['OPEN_METEO_MAX_LOCATIONS']
+    for chunk in (cells[i:i + size] for i in range(0, len(cells), size)):
+        centres = [geo.decode(cell) for cell in chunk]
+        response = upstream.get('open-meteo', app.config['OPEN_METEO_FORECAST_URL'], params={
+            'latitude': ','.join(f"{latitude:.4f}" for latitude, _lon in centres),
+            'longitude': ','.join(f"{longitude:.4f}" for _lat, longitude in centres),
+            'hourly': FORECAST_HOURLY_VARIABLES, 'forecast_days': app.config['FORECAST_DAYS'], 'timezone': 'UTC',
+        })
+        data = response.json()
+        # A single location comes back as an object, several as a list in request order.
+        locations = data if isinstance(data, list) else [data]
+        if len(locations) != len(chunk):
+            raise ValueError(f'forecast response has {len(locations)} locations, expected {len(chunk)}')
+        for cell, location in zip(chunk, locations):
+            forecasts[cell] = _hourly_from_location(location)
+    return forecasts
+
+def fetch_forecast(cell):
+    """Hourly multi-day forecast for the centre of a cell. Raises on network or format errors."""
+    return fetch_forecasts([cell])[cell]
+
+def refresh_forecast_cells(cells):
+    """
+    Fetches and stores several cells with batched requests. On failure the previous
+    forecasts are kept and a retry is scheduled. Returns {cell: ForecastCell}.
+    """
+    now = datetime.utcnow()
+    rows = {row.cell: row for row in db.session.execute(
+        db.select(ForecastCell).where(ForecastCell.cell.in_(cells))).scalars()}
+    for cell in cells:
+        if cell not in rows:
+            rows[cell] = ForecastCell(cell=cell, requested_at=now)
+            db.session.add(rows[cell])
+    try:
+        forecasts, error = fetch_forecasts(list(rows)), None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logs.upstream_log.error("Forecast fetch failed", extra={'service': 'open-meteo', 'cells': len(rows), 'error': str(e)})
+        forecasts, error = {}, str(e)[:200]
+    alerts = {}
+    for cell, row in rows.items():
+        if cell in forecasts:
+            row.hourly = json.dumps(forecasts[cell], separators=(',', ':'))
+            row.fetched_at, row.last_error = now, None
+            alert = forecast_alert(forecasts[cell], now)
+            if alert is not None and str(alert['code']) != row.alert:
+                alerts[cell] = alert
+            row.alert = str(alert['code']) if alert else None
+            row.refresh_after = now + timedelta(minutes=app.config['FORECAST_TTL_MINUTES'])
+        else:
+            row.last_error = error
+            row.refresh_after = now + timedelta(minutes=app.config['FORECAST_RETRY_MINUTES'])
+        row.claimed_until = None
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker stored one of these cells first; its copy is just as good.
+        db.session.rollback()
+        rows = {row.cell: row for row in db.session.execute(
+            db.select(ForecastCell).where(ForecastCell.cell.in_(cells))).scalars()}
+        alerts = {}
+    if alerts:
+        publish_weather_alerts(alerts)
+    return rows
+
+def publish_weather_alerts(alerts):
+    """Tells the owner of every farm in the given cells about newly forecast severe weather ({cell: alert})."""
+    farms = Farm.in_cells(alerts).with_entities(Farm.id, Farm.name, Farm.user_id, Farm.geohash).all()
+    for farm in farms:
+        cell = next(cell for cell in alerts if farm.geohash.startswith(cell))
+        publish_user_event(farm.user_id, 'weather_alert', {
+            'farm_id': farm.id, 'farm_name': farm.name, 'code': alerts[cell]['code'],
+            'time': alerts[cell]['time'] + 'Z'})
+    db.session.commit()
+
+def refresh_forecast_cell(cell):
+    """Fetches and stores one cell; see refresh_forecast_cells."""
+    return refresh_forecast_cells([cell]).get(cell)
+
+def claim_forecast_cell(cell, now):
+    """Atomically leases a due cell to this process so workers never refresh the same cell twice."""
+    lease = now + timedelta(seconds=app.config['FORECAST_LEASE_SECONDS'])
+    claimed = db.session.execute(
+        db.update(ForecastCell)
+        .where(ForecastCell.cell == cell, ForecastCell.refresh_after <= now,
+               or_(ForecastCell.claimed_until.is_(None), ForecastCell.claimed_until < now))
+        .values(claimed_until=lease)
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
+
+def refresh_due_forecasts(limit=50):
+    """Refreshes up to `limit` due cells that someone asked for recently. Returns the number refreshed."""
+    now = datetime.utcnow()
+    due = db.session.execute(
+        db.select(ForecastCell.cell)
+        .where(ForecastCell.refresh_after <= now,
+               ForecastCell.requested_at >= now - timedelta(days=app.config['FORECAST_KEEP_WARM_DAYS']),
+               or_(ForecastCell.claimed_until.is_(None), ForecastCell.claimed_until < now))
+        .order_by(ForecastCell.refresh_after).limit(limit)
+    ).scalars().all()
+    claimed = [cell for cell in due if claim_forecast_cell(cell, now)]
+    if claimed:
+        refresh_forecast_cells(claimed)
+    return len(claimed)
+
+_forecast_refresher = {'pid': None}
+_forecast_wakeup = threading.Event()
+
+def _forecast_refresher_loop():
+    while True:
+        try:
+            with app.app_context():
+                while refresh_due_forecasts():
+                    pass
+        except Exception:
+            logs.log.exception("Forecast refresher pass failed")
+        _forecast_wakeup.wait(app.config['FORECAST_REFRESH_POLL_SECONDS'])
+        _forecast_wakeup.clear()
+
+def ensure_forecast_refresher():
+    """Starts the refresher thread once per process (a forked worker gets its own)."""
+    if not app.config['FORECAST_REFRESHER'] or _forecast_refresher['pid'] == os.getpid():
+        return
+    _forecast_refresher['pid'] = os.getpid()
+    threading.Thread(target=_forecast_refresher_loop, name='forecast-refresher', daemon=True).start()
+
+def get_forecasts(cells):
+    """
+    Stored forecast rows for several cells ({cell: ForecastCell}). Cells never seen
+    before are fetched together in one batched request; stale ones wake the refresher.
+    A cell whose first fetch failed is only fetched again once its retry is due, so an
+    upstream outage costs one request per FORECAST_RETRY_MINUTES, not one per page view.
+    """
+    now = datetime.utcnow()
+    rows = _load_forecast_rows(cells)
+    missing = [cell for cell in cells if cell not in rows
+               or (rows[cell].hourly is None and rows[cell].refresh_after <= now)]
+    for cell in cells:
+        metrics.record_cache('forecast_store', cell in rows and rows[cell].hourly is not None)
+    if any(row.refresh_after <= now for row in rows.values()):
+        _forecast_wakeup.set()
+    idle = [row.cell for row in rows.values()
+            if row.requested_at is None or now - row.requested_at > timedelta(hours=1)]
+    if idle:
+        db.session.execute(db.update(ForecastCell).where(ForecastCell.cell.in_(idle)).values(requested_at=now))
+        db.session.commit()
+    if missing:
+        # Farmers in one village open the dashboard together; fetch each cold cell set once.
+        key = ','.join(sorted(missing))
+        def fetched_elsewhere():
+            loaded = _load_forecast_rows(missing, refresh=True)
+            return loaded if all(cell in loaded and loaded[cell].hourly for cell in missing) else None
+        def fetch():
+            refresh_forecast_cells(missing)
+            return True
+        forecast_flight.do(key, fetch, recheck=fetched_elsewhere)
+        # Rows fetched by another thread belong to its session; read them back in ours.
+        rows.update(_load_forecast_rows(missing, refresh=True))
+    return rows
+
+def _load_forecast_rows(cells, refresh=False):
+    query = db.select(ForecastCell).where(ForecastCell.cell.in_(cells))
+    if refresh:
+        query = query.execution_options(populate_existing=True)
+    return {row.cell: row for row in db.session.execute(query).scalars()}
+
+def get_forecast(cell):
+    """The stored forecast row for a cell, fetching it only if the cell has never been seen."""
+    return get_forecasts([cell]).get(cell)
+
+def forecast_hour_index(hourly, now):
+    try:
+        return hourly['time'].index(now.strftime('%Y-%m-%dT%H:00'))
+    except ValueError:
+        return None
+
+def forecast_window(hourly, start, hours=FORECAST_WINDOW_HOURS):
+    """Totals over the next `hours` hours: precipitation sum and temperature range."""
+    temps = [t for t in hourly['temperature_2m'][start:start + hours] if t is not None]
+    rain = [r for r in (hourly.get('precipitation') or [])[start:start + hours] if r is not None]
+    if not temps:
+        return None
+    return {'hours': min(hours, len(temps)), 'precip_mm': round(sum(rain), 1),
+            'temp_max': max(temps), 'temp_min': min(temps)}
+
+def forecast_alert(hourly, now):
+    """The first severe weather hour in the next WEATHER_ALERT_HOURS as {'code', 'time'}, or None."""
+    start = forecast_hour_index(hourly, now)
+    if start is None:
+        return None
+    end = start + WEATHER_ALERT_HOURS
+    for code, hour in zip(hourly['weather_code'][start:end], hourly['time'][start:end]):
+        if code in SEVERE_WEATHER_CODES:
+            return {'code': code, 'time': hour}
+    return None
+
+def _weather_from_forecast(cell, row, now):
+    if row is None or row.hourly is None:
+        return None
+    hourly = json.loads(row.hourly)
+    index = forecast_hour_index(hourly, now)
+    if index is None:
+        logs.upstream_log.warning("Stored forecast does not cover the current hour", extra={'service': 'open-meteo', 'cell': cell})
+        return None
+    return {
+        'temperature': hourly['temperature_2m'][index], 'weathercode': hourly['weather_code'][index],
+        'is_day': (hourly.get('is_day') or [1] * (index + 1))[index],
+        'window': forecast_window(hourly, index),
+        'as_of': row.fetched_at.isoformat() + 'Z',
+        'stale': now - row.fetched_at > timedelta(minutes=app.config['FORECAST_TTL_MINUTES']),
+    }
+
+def get_weather_for_cells(cells):
+    """Current conditions and the next-48h outlook for several geohash cells: {cell: weather or None}."""
+    now = datetime.utcnow()
+    weather, pending = {}, []
+    for cell in dict.fromkeys(cells):
+        weather[cell] = weather_cache.get(cell)
+        if weather[cell] is None:
+            pending.append(cell)
+    if pending:
+        rows = get_forecasts(pending)
+        for cell in pending:
+            weather[cell] = _weather_from_forecast(cell, rows.get(cell), now)
+            if weather[cell] is not None:
+                weather_cache.set(cell, weather[cell])
+    return weather
+
+def get_weather_for_cell(cell):
+    """Current conditions and the next-48h outlook for a geohash cell, shared by every farm in it."""
+    return get_weather_for_cells([cell])[cell]
+
+def get_weather_for_farms(farms):
+    """{farm.id: weather or None} for many farms, costing one batched upstream request at most."""
+    cells = {farm.id: farm.weather_cell or geo.cell_for(farm.latitude, farm.longitude) for farm in farms
+             if farm.latitude and farm.longitude}
+    weather = get_weather_for_cells(list(cells.values())) if cells else {}
+    return {farm.id: weather.get(cells.get(farm.id)) for farm in farms}
+
 def get_weather_for_farm(farm):
     if not farm or not farm.latitude or not farm.longitude: return None
+    cell = farm.weather_cell or geo.cell_for(farm.latitude, farm.longitude)
+    return get_weather_for_cell(cell)
+
+def geocode_place(query):
+    """First Nominatim match for a free-text place as {'display_name', 'lat', 'lon'}, or None."""
+    return geocode_cache.get_or_set(query.strip().lower(), lambda: _nominatim_search(query))
+
+def _nominatim_search(query):
+    response = upstream.get('nominatim', f"{app.config['NOMINATIM_URL']}/search",
+                            params={'q': query, 'format': 'json', 'limit': 1}, headers=upstream.NOMINATIM_HEADERS)
+    data = response.json()
+    if not data:
+        return None
+    return {'display_name': data[0].get('display_name'), 'lat': float(data[0].get('lat')), 'lon': float(data[0].get('lon'))}
+
+def _import_geocode_lookup(query):
     try:
-        url = (f"https://api.open-meteo.com/v1/forecast?latitude={farm.latitude}&longitude={farm.longitude}"
-               "&current=temperature_2m,is_day,weather_code")
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json().get('current', {})
-        if 'temperature_2m' in data and 'weather_code' in data:
-            return { 'temperature': data.get('temperature_2m'), 'weathercode': data.get('weather_code'), 'is_day': data.get('is_day', 1) }
-        else:
-            print(f"Weather API response for farm {farm.id} missing essential keys.")
-            return None
+        result = geocode_place(query)
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching weather data for farm {farm.id}: {e}")
+        logs.upstream_log.error("Geocoding failed", extra={'service': 'nominatim', 'error': str(e)})
         return None
+    return (result['lat'], result['lon']) if result else None
+
+def _cached_geocode_coordinates(query):
+    result = geocode_cache.get(query.strip().lower())
+    return (result['lat'], result['lon']) if result else None
+
+def run_farm_import(stream, fmt, user_id, geocode_budget=None):
+    """Parses `stream` as csv/geojson and bulk-inserts the farms for user_id; returns the import report."""
+    rows = farm_import.iter_geojson(stream) if fmt == 'geojson' else farm_import.iter_csv(stream)
+    geocoder = farm_import.ThrottledGeocoder(
+        _import_geocode_lookup, app.config['GEOCODE_MIN_INTERVAL'],
+        app.config['FARM_IMPORT_GEOCODE_BUDGET'] if geocode_budget is None else geocode_budget,
+        cached=_cached_geocode_coordinates)
+
+    def insert_batch(batch):
+        db.session.execute(db.insert(Farm), batch)
+        db.session.commit()
+
+    return farm_import.import_farms(rows, user_id, insert_batch, geocoder)
+
+@app.route('/api/farms/import', methods=['POST'])
+@login_required
+def import_farms():
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': _('No file uploaded.')}), 400
+    fmt = farm_import.detect_format(upload.filename, upload.mimetype, request.form.get('format'))
+    if fmt not in ('csv', 'geojson'):
+        return jsonify({'error': _('Unsupported import format.')}), 400
+    try:
+        report = run_farm_import(upload.stream, fmt, current_user.id)
+    except (farm_import.ImportFormatError, UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        partial = getattr(e, 'report', None)
+        if partial and partial['imported']:
+            # Chunks are committed as they are read; say how far the import got before the error.
+            return jsonify({'error': _('The file could not be read past the first {count} farms, which were imported: {error}').format(
+                count=partial['imported'], error=str(e)), 'partial': True, **partial}), 400
+        return jsonify({'error': _('The file could not be read: {error}').format(error=str(e))}), 400
+    if report['imported']:
+        flash(_('{count} farms imported.').format(count=report['imported']), 'success')
+    return jsonify({'success': True, **report}), 201 if report['imported'] else 200
 
 @app.route('/api/geocode')
 @login_required
+@cache_control(private=True, max_age=86400)
 def geocode():
     query = request.args.get('q')
     if not query: return jsonify({'error': _('Query parameter "q" is required.')}), 400
-    url = f"https://nominatim.openstreetmap.org/search?q={query}&format=json&limit=1"
-    headers = {'User-Agent': 'AgriAssist/1.0'}
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        if data:
-            result = data[0]
-            return jsonify({'results': [{'display_name': result.get('display_name'), 'lat': float(result.get('lat')), 'lon': float(result.get('lon'))}]})
+        result = geocode_place(query)
+        if result:
+            return jsonify({'results': [result]})
         else: return jsonify({'results': []})
     except requests.exceptions.RequestException as e:
-        print(f"Geocoding error: {e}")
+        logs.upstream_log.error("Geocoding failed", extra={'service': 'nominatim', 'error': str(e)})
         return jsonify({'error': _('Failed to connect to geocoding service.')}), 500
 
 @app.route('/api/reverse_geocode')
 @login_required
+@cache_control(private=True, max_age=86400)
 def reverse_geocode():
-    lat, lon = request.args.get('lat'), request.args.get('lon')
-    if not lat or not lon: return jsonify({'error': _('Latitude and longitude are required.')}), 400
-    url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={lat}&lon={lon}"
-    headers = {'User-Agent': 'AgriAssist/1.0'}
+    lat, lon = request.args.get('lat', type=float), request.args.get('lon', type=float)
+    if lat is None or lon is None: return jsonify({'error': _('Latitude and longitude are required.')}), 400
+    url = f"{app.config['NOMINATIM_URL']}/reverse?format=json&lat={lat}&lon={lon}"
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        address = data.get('address', {})
-        state = address.get('state')
+        # ~100 m is far finer than a state boundary needs.
+        state = reverse_geocode_cache.get_or_set(f"{lat:.3f},{lon:.3f}", lambda: upstream.get(
+            'nominatim', url, headers=upstream.NOMINATIM_HEADERS).json().get('address', {}).get('state'))
         if state: return jsonify({'state': state})
         else: return jsonify({'error': _('State not found for this location.')}), 404
     except requests.exceptions.RequestException as e:
-        print(f"Reverse geocoding error: {e}")
+        logs.upstream_log.error("Reverse geocoding failed", extra={'service': 'nominatim', 'error': str(e)})
         return jsonify({'error': _('Failed to connect to geocoding service.')}), 500
 
 @app.route('/api/farms', methods=['POST'])
@@ -891,90 +1611,300 @@ def manage_farm(farm_id):
     flash(_('Farm deleted successfully.'), 'success')
     return jsonify({'success': True})
 
+def advisory_dedupe_key(farm, crop_type, crop_stage, soil_type, now=None):
+    """
+    Identifies requests that would produce the same advisory: same farm and inputs, same
+    weather cell, same ADVISORY_DEDUPE_MINUTES slot of the hourly forecast. None if disabled.
+    """
+    minutes = app.config['ADVISORY_DEDUPE_MINUTES']
+    if not minutes:
+        return None
+    now = now or datetime.utcnow()
+    slot = int((now - datetime(1970, 1, 1)).total_seconds() // (minutes * 60))
+    cell = farm.weather_cell or geo.cell_for(farm.latitude, farm.longitude)
+    parts = [farm.id, crop_type, crop_stage, soil_type, cell, slot]
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+def find_duplicate_advisory(farm, dedupe_key):
+    if dedupe_key is None:
+        return None
+    advisory = Advisory.query.filter_by(farm_id=farm.id, dedupe_key=dedupe_key).first()
+    metrics.record_cache('advisory_dedupe', advisory is not None)
+    return advisory
+
+def create_advisory(farm, crop_type, crop_stage, soil_type):
+    """
+    Fetches the farm's weather, evaluates the rules and stores the advisory. Returns
+    (advisory, created); a repeat within the dedupe window gets the stored advisory back
+    without any upstream call or insert.
+    """
+    dedupe_key = advisory_dedupe_key(farm, crop_type, crop_stage, soil_type)
+    existing = find_duplicate_advisory(farm, dedupe_key)
+    if existing is not None:
+        return existing, False
+    weather = get_weather_for_farm(farm)
+    payload = evaluate_advisory_rules(crop_type, crop_stage, soil_type, weather)
+    advisory = Advisory.from_payload(farm, payload)
+    advisory.dedupe_key = dedupe_key
+    db.session.add(advisory)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        # An identical request running at the same time stored it first.
+        db.session.rollback()
+        return Advisory.query.filter_by(farm_id=farm.id, dedupe_key=dedupe_key).one(), False
+    publish_user_event(farm.user_id, 'advisory', {'id': advisory.id, 'farm_id': farm.id, 'farm_name': farm.name,
+                                                  'priority': advisory.priority})
+    db.session.commit()
+    return advisory, True
+
+def advisory_json(advisory, farm):
+    rendered = advisory.rendered
+    return {
+        'id': advisory.id,
+        'title': advisory.display_title,
+        'content': rendered['content'],
+        'farm': {'name': farm.name},
+        'priority': advisory.priority,
+        'farm_name': farm.name,
+        'priority_display': rendered['priority_display'],
+        'weather_outlook': rendered['weather_outlook'],
+        'actionable_advice': rendered['actionable_advice']
+    }
+
+def wants_async():
+    return 'respond-async' in request.headers.get('Prefer', '') or request.args.get('async') == '1'
+
+def _advisory_job_accepted(job):
+    status_url = url_for('advisory_job_status', job_id=job.id)
+    response = jsonify({'success': True, 'job_id': job.id, 'status': job.status, 'status_url': status_url})
+    response.headers['Location'] = status_url
+    response.headers['Retry-After'] = '1'
+    return response, 202
+
+def _replay_idempotent_advisory(previous, farm):
+    """The response to a retried request, rebuilt from what its first attempt produced."""
+    if previous.job_id is not None:
+        job = db.session.get(AdvisoryJob, previous.job_id)
+        if job is not None:
+            response, status = _advisory_job_accepted(job)
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response, status
+    advisory = db.session.get(Advisory, previous.advisory_id) if previous.advisory_id else None
+    if advisory is None:
+        return jsonify({'error': _('This advisory has since been deleted.')}), 410
+    response = jsonify({'success': True, 'advisory': advisory_json(advisory, farm), 'deduplicated': True})
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response, 200
+
+def _idempotent_job_failed(previous):
+    if previous.job_id is None:
+        return False
+    job = db.session.get(AdvisoryJob, previous.job_id)
+    return job is not None and job.status == 'failed'
+
+def _remember_idempotency_key(key, request_hash, advisory_id=None, job_id=None):
+    db.session.add(IdempotencyKey(user_id=current_user.id, key=key, request_hash=request_hash,
+                                  advisory_id=advisory_id, job_id=job_id))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent retry with the same key got there first; its outcome is the same advisory.
+        db.session.rollback()
+
 @app.route('/api/advisory', methods=['POST'])
 @login_required
 def get_advisory():
+    """
+    Creates an advisory. With `Prefer: respond-async` (or ?async=1) the work is queued
+    and 202 is returned at once with a job id to poll; otherwise it runs inline.
+    Repeats within the dedupe window return the stored advisory (200 instead of 201),
+    and a retry carrying the same Idempotency-Key gets the first attempt's response.
+    """
     data = request.get_json()
     if not data or not all(k in data for k in ['farm_id', 'crop_type', 'crop_stage', 'soil_type']):
         return jsonify({'error': _('Missing required advisory data.')}), 400
+    idempotency_key = request.headers.get('Idempotency-Key', '').strip()
+    if len(idempotency_key) > 64:
+        return jsonify({'error': _('Idempotency-Key must be at most 64 characters.')}), 400
 
     farm = Farm.query.filter_by(id=data.get('farm_id'), user_id=current_user.id).first_or_404()
-    weather = get_weather_for_farm(farm)
-
-    advisory_data = generate_ai_advisory(
-        farm=farm, crop_type=data['crop_type'],
-        crop_stage=data['crop_stage'], soil_type=data['soil_type'], weather_data=weather
-    )
-    title = _("AgriAssist advisory for {crop_type} at {farm_name}").format(crop_type=_(data['crop_type']), farm_name=farm.name)
-
-    content_parts = []
-    if advisory_data.get("weather_outlook"):
-        content_parts.append(f"{_('Weather Outlook')}:\n{advisory_data['weather_outlook']}")
-
-    if advisory_data.get("actionable_advice"):
-        actionable_advice_parts = []
-        for key, value in advisory_data["actionable_advice"].items():
-            actionable_advice_parts.append(f"{_(key)}:\n{value}")
-        content_parts.append(_("ACTIONABLE ADVICE") + "\n" + "\n\n".join(actionable_advice_parts))
-
-    content = "\n\n".join(content_parts) if content_parts else _("No specific advice at this time. Continue standard monitoring.")
+    crop_type, crop_stage, soil_type = data['crop_type'], data['crop_stage'], data['soil_type']
+    request_hash = hashlib.sha1(json.dumps([farm.id, crop_type, crop_stage, soil_type]).encode('utf-8')).hexdigest()
+    if idempotency_key:
+        previous = db.session.get(IdempotencyKey, (current_user.id, idempotency_key))
+        if previous is not None:
+            if previous.request_hash != request_hash:
+                return jsonify({'error': _('This Idempotency-Key was already used for a different request.')}), 422
+            if not _idempotent_job_failed(previous):
+                return _replay_idempotent_advisory(previous, farm)
+            # A failed job is not an outcome to replay: forget the key and run the request again.
+            db.session.delete(previous)
+            db.session.commit()
 
-    advisory = Advisory(
-        title=title, content=content,
-        priority=advisory_data['priority'], farm_id=farm.id
-    )
-    db.session.add(advisory)
+    if wants_async():
+        dedupe_key = advisory_dedupe_key(farm, crop_type, crop_stage, soil_type)
+        advisory = find_duplicate_advisory(farm, dedupe_key)
+        if advisory is not None:
+            if idempotency_key:
+                _remember_idempotency_key(idempotency_key, request_hash, advisory_id=advisory.id)
+            return jsonify({'success': True, 'advisory': advisory_json(advisory, farm), 'deduplicated': True}), 200
+        # An identical request may still be queued or running; hand out its job instead.
+        job = dedupe_key and AdvisoryJob.query.filter(
+            AdvisoryJob.user_id == current_user.id, AdvisoryJob.dedupe_key == dedupe_key,
+            AdvisoryJob.status.in_(['queued', 'running'])).first()
+        if not job:
+            job = AdvisoryJob(user_id=current_user.id, farm_id=farm.id, crop_type=crop_type,
+                              crop_stage=crop_stage, soil_type=soil_type, dedupe_key=dedupe_key)
+            db.session.add(job)
+            db.session.commit()
+            advisory_job_pool.submit(job.id)
+        if idempotency_key:
+            _remember_idempotency_key(idempotency_key, request_hash, job_id=job.id)
+        return _advisory_job_accepted(job)
+
+    advisory, created = create_advisory(farm, crop_type, crop_stage, soil_type)
+    if idempotency_key:
+        _remember_idempotency_key(idempotency_key, request_hash, advisory_id=advisory.id)
+    return jsonify({'success': True, 'advisory': advisory_json(advisory, farm), 'deduplicated': not created}), \
+        201 if created else 200
+
+@app.route('/api/advisory/jobs/<job_id>')
+@login_required
+def advisory_job_status(job_id):
+    job = AdvisoryJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    body = {'job_id': job.id, 'status': job.status}
+    if job.status == 'done':
+        advisory = db.session.get(Advisory, job.advisory_id) if job.advisory_id else None
+        if advisory is None:
+            return jsonify({**body, 'error': _('This advisory has since been deleted.')}), 410
+        body.update(success=True, advisory=advisory_json(advisory, job.farm))
+    elif job.status == 'failed':
+        body.update(success=False, error=_('The advisory could not be generated. Please try again.'))
+    else:
+        response = jsonify(body)
+        response.headers['Retry-After'] = '1'
+        return response
+    return jsonify(body)
+
+def claim_advisory_job(job_id):
+    """Moves a queued job to running; False if another thread or worker already took it."""
+    claimed = db.session.execute(
+        db.update(AdvisoryJob)
+        .where(AdvisoryJob.id == job_id, AdvisoryJob.status == 'queued')
+        .values(status='running', started_at=datetime.utcnow(), attempts=AdvisoryJob.attempts + 1)
+    ).rowcount
     db.session.commit()
+    return claimed == 1
 
-    translated_actionable_advice = {
-        _(key): value for key, value in advisory_data.get('actionable_advice', {}).items()
-    }
+def run_advisory_job(job_id):
+    with app.app_context():
+        if not claim_advisory_job(job_id):
+            return
+        job = db.session.get(AdvisoryJob, job_id)
+        try:
+            advisory, _created = create_advisory(job.farm, job.crop_type, job.crop_stage, job.soil_type)
+            job.status, job.advisory_id = 'done', advisory.id
+        except Exception as e:
+            db.session.rollback()
+            logs.log.exception("Advisory job failed", extra={'job': job_id})
+            job = db.session.get(AdvisoryJob, job_id)
+            job.status, job.error = 'failed', str(e)[:200]
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
 
-    return jsonify({
-        'success': True,
-        'advisory': {
-            'id': advisory.id,
-            'title': advisory.title,
-            'content': advisory.content,
-            'farm': {'name': farm.name},
-            'priority': advisory.priority,
-            'farm_name': farm.name,
-            'priority_display': _(advisory_data['priority']),
-            'weather_outlook': advisory_data['weather_outlook'],
-            'actionable_advice': translated_actionable_advice
-        }
-    }), 201
+def sweep_advisory_jobs():
+    """
+    Requeues jobs that were never dispatched or whose worker died mid-run, and drops
+    finished jobs and idempotency keys past ADVISORY_JOB_RETENTION_HOURS. Returns the
+    ids to dispatch. A job that is merely slow is requeued as well, so delivery is
+    at-least-once; the advisory dedupe key keeps a second run from adding a duplicate.
+    """
+    with app.app_context():
+        now = datetime.utcnow()
+        stuck = now - timedelta(seconds=app.config['ADVISORY_JOB_TIMEOUT_SECONDS'])
+        db.session.execute(
+            db.update(AdvisoryJob)
+            .where(AdvisoryJob.status == 'running', AdvisoryJob.started_at < stuck)
+            .values(status=db.case((AdvisoryJob.attempts >= ADVISORY_JOB_MAX_ATTEMPTS, 'failed'), else_='queued'),
+                    error=db.case((AdvisoryJob.attempts >= ADVISORY_JOB_MAX_ATTEMPTS, 'timed out'), else_=None)))
+        db.session.execute(
+            db.delete(AdvisoryJob)
+            .where(AdvisoryJob.status.in_(['done', 'failed']),
+                   AdvisoryJob.created_at < now - timedelta(hours=app.config['ADVISORY_JOB_RETENTION_HOURS'])))
+        # Idempotency keys are replayable for as long as the jobs they may point at.
+        db.session.execute(
+            db.delete(IdempotencyKey)
+            .where(IdempotencyKey.created_at < now - timedelta(hours=app.config['ADVISORY_JOB_RETENTION_HOURS'])))
+        db.session.commit()
+        # A few seconds of grace so jobs that were just submitted are not dispatched twice.
+        return db.session.execute(
+            db.select(AdvisoryJob.id)
+            .where(AdvisoryJob.status == 'queued', AdvisoryJob.created_at < now - timedelta(seconds=5))
+            .order_by(AdvisoryJob.created_at).limit(100)
+        ).scalars().all()
+
+ADVISORY_JOB_MAX_ATTEMPTS = 3
+advisory_job_pool = jobs.ElasticPool(
+    'advisory-jobs', run_advisory_job, max_threads=app.config['ADVISORY_JOB_THREADS'],
+    sweep=sweep_advisory_jobs)
+
+def owned_advisories(ids=None):
+    """WHERE clause for the current user's advisories (optionally only `ids`), without loading any farms."""
+    clause = Advisory.farm_id.in_(db.select(Farm.id).where(Farm.user_id == current_user.id))
+    if ids is not None:
+        clause = db.and_(clause, Advisory.id.in_(ids))
+    return clause
+
+def _advisory_ids_from_request(data):
+    ids = (data or {}).get('ids')
+    if not isinstance(ids, list):
+        return []
+    return [int(i) for i in ids if isinstance(i, int) or (isinstance(i, str) and i.isdigit())]
 
 @app.route('/api/advisories/bulk-delete', methods=['DELETE'])
 @login_required
 def bulk_delete_advisories():
-    data = request.get_json()
-    ids_to_delete = data.get('ids', [])
+    ids_to_delete = _advisory_ids_from_request(request.get_json(silent=True))
     if not ids_to_delete:
         return jsonify({'error': _('No advisory IDs provided.')}), 400
 
-    farm_ids = [farm.id for farm in current_user.farms]
-    advisories_to_delete = Advisory.query.filter(
-        Advisory.farm_id.in_(farm_ids),
-        Advisory.id.in_(ids_to_delete)
-    ).all()
-
-    if not advisories_to_delete:
+    deleted_ids = db.session.execute(
+        db.delete(Advisory).where(owned_advisories(ids_to_delete)).returning(Advisory.id)).scalars().all()
+    if not deleted_ids:
+        db.session.rollback()
         return jsonify({'error': _('No valid advisories found to delete.')}), 404
-
-    for advisory in advisories_to_delete:
-        db.session.delete(advisory)
+    # Only the rows actually removed, so other tabs never drop advisories that were not deleted.
+    publish_user_event(current_user.id, 'deleted', {'ids': deleted_ids})
     db.session.commit()
 
     flash(_('Selected advisories deleted successfully.'), 'success')
-    return jsonify({'success': True, 'deleted_count': len(advisories_to_delete)})
+    return jsonify({'success': True, 'deleted_count': len(deleted_ids)})
+
+@app.route('/api/advisories/bulk-read', methods=['PATCH'])
+@login_required
+def bulk_mark_advisories_read():
+    data = request.get_json(silent=True) or {}
+    ids = _advisory_ids_from_request(data)
+    if not ids:
+        return jsonify({'error': _('No advisory IDs provided.')}), 400
+    is_read = data.get('is_read', True)
+    if not isinstance(is_read, bool):
+        return jsonify({'error': _('is_read must be true or false.')}), 400
+
+    updated_ids = db.session.execute(
+        db.update(Advisory).where(owned_advisories(ids)).values(is_read=is_read).returning(Advisory.id)).scalars().all()
+    if updated_ids:
+        publish_user_event(current_user.id, 'read', {'ids': updated_ids, 'is_read': is_read})
+    db.session.commit()
+    return jsonify({'success': True, 'updated_count': len(updated_ids), 'is_read': is_read})
 
 @app.route('/api/advisories/delete-all', methods=['DELETE'])
 @login_required
 def delete_all_advisories():
-    farm_ids = [farm.id for farm in current_user.farms]
-
-    num_deleted = Advisory.query.filter(Advisory.farm_id.in_(farm_ids)).delete(synchronize_session=False)
+    num_deleted = db.session.execute(db.delete(Advisory).where(owned_advisories())).rowcount
+    if num_deleted:
+        publish_user_event(current_user.id, 'deleted', {'all': True})
     db.session.commit()
 
     if num_deleted > 0:
@@ -982,6 +1912,87 @@ def delete_all_advisories():
 
     return jsonify({'success': True, 'deleted_count': num_deleted})
 
+ADVISORY_EXPORT_FIELDS = ['id', 'created_at', 'farm_id', 'farm_name', 'crop', 'stage', 'soil', 'priority',
+                          'is_read', 'temperature', 'weather_code', 'title', 'content']
+FARM_EXPORT_FIELDS = ['id', 'name', 'location', 'latitude', 'longitude', 'area_hectares', 'geohash',
+                      'created_at', 'area_geojson']
+
+def _export_request():
+    """Returns (format, gzip) from the query string, or None if the format is unknown."""
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in exports.FORMATS:
+        return None
+    return fmt, request.args.get('gzip', '').lower() in ['1', 'true', 'yes']
+
+@app.route('/api/advisories/export')
+@login_required
+def export_advisories():
+    options = _export_request()
+    if options is None:
+        return jsonify({'error': _('Unsupported export format.')}), 400
+    fmt, compress = options
+    statement = (
+        db.select(Advisory.id, Advisory.created_at, Advisory.farm_id, Farm.name.label('farm_name'), Advisory.priority,
+                  Advisory.is_read, Advisory.title, Advisory.content, Advisory.payload)
+        .join(Farm, Advisory.farm_id == Farm.id)
+        .where(*advisory_filters(request.args))
+        .order_by(Advisory.created_at.desc())
+        .execution_options(yield_per=exports.YIELD_PER)
+    )
+    locale = str(babel_locale())
+
+    def rows():
+        for row in db.session.execute(statement):
+            record = {'id': row.id, 'created_at': row.created_at.isoformat(), 'farm_id': row.farm_id,
+                      'farm_name': row.farm_name, 'priority': row.priority, 'is_read': row.is_read}
+            if row.payload is None:
+                record.update(title=row.title, content=row.content)
+            else:
+                payload = json.loads(row.payload)
+                rendered = _render_advisory_cached(row.payload, locale)
+                record.update(
+                    crop=payload['crop'], stage=payload['stage'], soil=payload['soil'],
+                    temperature=payload.get('temp'), weather_code=payload.get('code'),
+                    title=_("AgriAssist advisory for {crop_type} at {farm_name}").format(
+                        crop_type=rendered['crop_display'], farm_name=row.farm_name),
+                    content=rendered['content'],
+                )
+            yield record
+
+    filename = f"advisories-{datetime.utcnow():%Y%m%d}"
+    return exports.stream_export(rows(), ADVISORY_EXPORT_FIELDS, fmt, filename, compress=compress)
+
+@app.route('/api/farms/export')
+@login_required
+def export_farms():
+    options = _export_request()
+    if options is None:
+        return jsonify({'error': _('Unsupported export format.')}), 400
+    fmt, compress = options
+    statement = (
+        db.select(*[getattr(Farm, field) for field in FARM_EXPORT_FIELDS])
+        .where(Farm.user_id == current_user.id)
+        .order_by(Farm.id)
+        .execution_options(yield_per=exports.YIELD_PER)
+    )
+
+    def rows():
+        for row in db.session.execute(statement):
+            record = row._asdict()
+            record['created_at'] = row.created_at.isoformat() if row.created_at else None
+            yield record
+
+    filename = f"farms-{datetime.utcnow():%Y%m%d}"
+    return exports.stream_export(rows(), FARM_EXPORT_FIELDS, fmt, filename, compress=compress)
+
+@app.route('/api/advisories/<int:advisory_id>')
+@login_required
+def advisory_detail(advisory_id):
+    advisory = Advisory.query.get_or_404(advisory_id)
+    if advisory.farm.owner != current_user:
+        return jsonify({'error': _('Forbidden')}), 403
+    return jsonify({'success': True, 'advisory': {**advisory_json(advisory, advisory.farm), 'is_read': advisory.is_read}})
+
 @app.route('/api/advisories/<int:advisory_id>', methods=['DELETE'])
 @login_required
 def delete_advisory(advisory_id):
@@ -989,6 +2000,7 @@ def delete_advisory(advisory_id):
     if advisory.farm.owner != current_user:
         return jsonify({'error': _('Forbidden')}), 403
     db.session.delete(advisory)
+    publish_user_event(current_user.id, 'deleted', {'ids': [advisory_id]})
     db.session.commit()
     flash(_('Advisory deleted successfully.'), 'success')
     return jsonify({'success': True})
@@ -999,13 +2011,27 @@ def toggle_advisory_read(advisory_id):
     advisory = Advisory.query.get_or_404(advisory_id)
     if advisory.farm.owner != current_user:
         return jsonify({'error': _('Forbidden')}), 403
-    data = request.get_json()
-    advisory.is_read = data.get('is_read', not advisory.is_read)
+    data = request.get_json(silent=True) or {}
+    is_read = data.get('is_read', not advisory.is_read)
+    if not isinstance(is_read, bool):
+        return jsonify({'error': _('is_read must be true or false.')}), 400
+    advisory.is_read = is_read
+    publish_user_event(current_user.id, 'read', {'ids': [advisory.id], 'is_read': is_read})
     db.session.commit()
     return jsonify({'success': True, 'is_read': advisory.is_read})
 
+@app.route('/api/farms/weather')
+@login_required
+@cache_control(private=True, max_age=300)
+def farms_weather():
+    """Weather for every farm of the user, fetched with one batched upstream request."""
+    farms = current_user.farms
+    weather = get_weather_for_farms(farms)
+    return jsonify({'farms': [{'farm_id': farm.id, 'name': farm.name, 'weather': weather[farm.id]} for farm in farms]})
+
 @app.route('/api/farms/<int:farm_id>/weather')
 @login_required
+@cache_control(private=True, max_age=300)
 def farm_weather(farm_id):
     farm = Farm.query.filter_by(id=farm_id, user_id=current_user.id).first_or_404()
     weather = get_weather_for_farm(farm)
@@ -1016,6 +2042,7 @@ def farm_weather(farm_id):
 
 @app.route('/api/farms/<int:farm_id>/nutrient_needs')
 @login_required
+@cache_control(private=True, max_age=300)
 def get_nutrient_needs(farm_id):
     """Calculates an estimated fertilizer need based on default data, weather, and farm area."""
     farm = Farm.query.filter_by(id=farm_id, user_id=current_user.id).first_or_404()
@@ -1042,6 +2069,7 @@ def get_nutrient_needs(farm_id):
 
 @app.route('/api/farms/<int:farm_id>/pesticide_needs')
 @login_required
+@cache_control(private=True, max_age=300)
 def get_pesticide_needs(farm_id):
     """Calculates an estimated pesticide need based on default data, weather, and farm area."""
     farm = Farm.query.filter_by(id=farm_id, user_id=current_user.id).first_or_404()
@@ -1067,23 +2095,29 @@ def get_pesticide_needs(farm_id):
     return jsonify({'recommendation': recommendation})
 
 
+def fetch_annual_rainfall(lat, lon, year):
+    """Average yearly precipitation (mm) over the five years before `year`, or None without data."""
+    start, end = f"{year - 5}-01-01", f"{year - 1}-12-31"
+    url = (f"{app.config['OPEN_METEO_ARCHIVE_URL']}?latitude={lat:.2f}&longitude={lon:.2f}"
+           f"&start_date={start}&end_date={end}&daily=precipitation_sum")
+    precip = upstream.get('archive', url).json().get('daily', {}).get('precipitation_sum', [])
+    if not precip or all(p is None for p in precip):
+        return None
+    num_years = len(range(year - 5, year))
+    return sum(filter(None, precip)) / num_years
+
 @app.route('/api/annual_rainfall')
 @login_required
+@cache_control(private=True, max_age=86400)
 def get_annual_rainfall():
-    lat, lon = request.args.get('lat'), request.args.get('lon')
-    if not lat or not lon: return jsonify({'error': _('Latitude and longitude are required.')}), 400
+    lat, lon = request.args.get('lat', type=float), request.args.get('lon', type=float)
+    if lat is None or lon is None: return jsonify({'error': _('Latitude and longitude are required.')}), 400
     year = datetime.now().year
-    start, end = f"{year - 5}-01-01", f"{year - 1}-12-31"
     try:
-        url = (f"https://archive-api.open-meteo.com/v1/archive?latitude={lat}&longitude={lon}"
-               f"&start_date={start}&end_date={end}&daily=precipitation_sum")
-        r = requests.get(url, timeout=10); r.raise_for_status()
-        precip = r.json().get('daily', {}).get('precipitation_sum', [])
-        if not precip or all(p is None for p in precip):
+        # The archive grid is ~10 km, so nearby farms share one five-year average.
+        avg_rainfall = rainfall_cache.get_or_set(f"{lat:.2f},{lon:.2f},{year}", lambda: fetch_annual_rainfall(lat, lon, year))
+        if avg_rainfall is None:
             return jsonify({'error': _('No historical rainfall data available for this location.')}), 404
-        total_precip = sum(filter(None, precip))
-        num_years = len(range(year - 5, year))
-        avg_rainfall = total_precip / num_years if num_years > 0 else 0
         return jsonify({'annual_rainfall': round(avg_rainfall, 2)})
     except requests.exceptions.RequestException:
         return jsonify({'error': _('Failed to connect to the historical data service.')}), 500
@@ -1115,28 +2149,163 @@ def api_predict_yield():
             )
             total_yield = round(predicted_yield * area, 2)
             historical_data = get_historical_yields(crop, state)
+            record_yield_prediction(current_user.id, crop, state, season, area, fert_kg, pest_l, rain_mm, predicted_yield)
 
             return jsonify({
                 'success': True,
                 'yield_per_ha_tons': predicted_yield,
                 'total_tons': total_yield,
                 'advice': advice,
-                'historical': historical_data
+                'historical': historical_data,
+                'comparison': {
+                    'state': yield_rollup_stats(crop, state, season, value=predicted_yield),
+                    'national': yield_rollup_stats(crop, rollups.ALL, season, value=predicted_yield),
+                }
             })
         except Exception as e:
-            print(f"Prediction Error: {e}")
+            logs.log.exception("Yield prediction failed", extra={'crop': form.crop.data, 'state': form.state.data})
             return jsonify({'error': _('An error occurred during prediction calculation.')}), 500
 
     return jsonify({'error': _('Invalid input data.'), 'details': form.errors}), 400
 
+@app.route('/api/yield-rollups')
+@login_required
+@cache_control(private=True, max_age=60)
+def api_yield_rollups():
+    crop = request.args.get('crop')
+    if crop not in CROP_OPTIONS:
+        return jsonify({'error': _('A valid crop is required.')}), 400
+    year = request.args.get('year', type=int)
+    states = request.args.getlist('state') or [rollups.ALL]
+    season = request.args.get('season', rollups.ALL)
+    return jsonify({'rollups': [yield_rollup_stats(crop, state, season, year) for state in states]})
+
 @app.route('/api/session/ping', methods=['POST'])
 @login_required
 def session_ping():
     """An endpoint for the client to hit to keep the session alive."""
     return jsonify({'status': 'ok'})
 
+# --- EVENT STREAM (Server-Sent Events, see events.py) ---
+
+EVENT_PRUNE_EVERY = 500  # Publishes per process between deletions of expired events
+_event_publishes = {'count': 0}
+
+def publish_user_event(user_id, kind, data):
+    """Adds an event for the user's open pages to the session; it is delivered once the caller commits."""
+    db.session.add(UserEvent(user_id=user_id, kind=kind, data=events.encode(data)))
+    db.session.info['user_events'] = True
+    _event_publishes['count'] += 1
+    if _event_publishes['count'] % EVENT_PRUNE_EVERY == 0:
+        cutoff = datetime.utcnow() - timedelta(hours=app.config['EVENT_RETENTION_HOURS'])
+        db.session.execute(db.delete(UserEvent).where(UserEvent.created_at < cutoff))
+
+@event.listens_for(db.session, 'after_commit')
+def _wake_event_broker(session):
+    if session.info.pop('user_events', False):
+        event_broker.wake()
+
+def _load_user_events(after_id):
+    with app.app_context():
+        return [tuple(row) for row in db.session.execute(
+            db.select(UserEvent.id, UserEvent.user_id, UserEvent.kind, UserEvent.data)
+            .where(UserEvent.id > after_id).order_by(UserEvent.id).limit(1000))]
+
+def _latest_user_event_id():
+    with app.app_context():
+        return db.session.execute(db.select(db.func.max(UserEvent.id))).scalar() or 0
+
+event_broker = events.Broker('user-events', _load_user_events, _latest_user_event_id,
+                             poll_interval=app.config['EVENT_POLL_SECONDS'])
+
+@app.route('/api/events')
+@login_required
+def user_events():
+    """
+    Server-Sent Events for the signed-in user. A stream ends after EVENT_STREAM_MAX_SECONDS and
+    the browser reconnects with Last-Event-ID, so nothing published in between is lost.
+    """
+    if event_broker.stats()['streams'] >= app.config['EVENT_STREAMS_PER_WORKER']:
+        response = jsonify({'error': _('Too many open event streams. Please retry shortly.')})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    user_id = current_user.id
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id', '')
+    heartbeat = app.config['EVENT_HEARTBEAT_SECONDS']
+    deadline = time.monotonic() + app.config['EVENT_STREAM_MAX_SECONDS']
+
+    def stream():
+        # Subscribe before reading the backlog so nothing published in between is missed.
+        subscription = event_broker.subscribe(user_id)
+        try:
+            # A short-lived session: the stream holds no database connection while it waits.
+            with app.app_context():
+                if last_id.isdigit():
+                    backlog = [tuple(row) for row in db.session.execute(
+                        db.select(UserEvent.id, UserEvent.kind, UserEvent.data)
+                        .where(UserEvent.user_id == user_id, UserEvent.id > int(last_id))
+                        .order_by(UserEvent.id).limit(events.MAX_PENDING))]
+                    first = 'retry: 3000\n\n'
+                else:
+                    backlog = []
+                    # An id on the first frame lets a reconnect resume even if no event arrived yet.
+                    first = f'retry: 3000\nid: {_latest_user_event_id()}\n\n'
+            subscription.skip = {event_id for event_id, _kind, _data in backlog}
+            yield first + ''.join(events.format_event(*item) for item in backlog)
+            while time.monotonic() < deadline:
+                batch = subscription.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+                yield ''.join(events.format_event(*item) for item in batch) or events.format_comment('keep-alive')
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    response = app.response_class(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Proxies must pass each event on immediately
+    return response
+
 
 # START ===== VOICE ASSISTANT BRAIN =====
+VOICE_NAV_TARGETS = [('dashboard', _l('dashboard')), ('farms', _l('farms')), ('home', _l('home')), ('advisories', _l('advisories'))]
+
+def parse_voice_intent(transcript, farm_names=()):
+    """
+    Maps a normalised transcript to (intent, params) without touching the database or network.
+    Keywords are matched in the active locale, so this must run inside a request context.
+    """
+    # 1. Navigation Intent
+    nav_keywords = [_('navigate to'), _('go to'), _('open'), _('show')]
+    if any(keyword in transcript for keyword in nav_keywords):
+        for target, keyword in VOICE_NAV_TARGETS:
+            if str(keyword) in transcript:
+                return 'navigate', {'target': target}
+        return 'navigate', {'target': None}
+
+    # 2. Data Query Intent: Farm Count
+    if _('how many farms') in transcript:
+        return 'farm_count', {}
+
+    # 3. Data Query Intent: Weather
+    if _('weather') in transcript:
+        for index, name in enumerate(farm_names):
+            if name.lower() in transcript:
+                return 'weather', {'farm_index': index}
+        if any(keyword in transcript for keyword in [_('all farms'), _('all my farms'), _('every farm'), _('my farms')]):
+            return 'weather_all', {}
+        return 'weather', {'farm_index': None}
+
+    # 4. General Knowledge Intent: Crop Info
+    if _('ideal temperature for') in transcript or _('temperature for') in transcript:
+        for crop in CROP_ADVISORY_DATA:
+            if crop.lower() in transcript:
+                return 'crop_temperature', {'crop': crop}
+        return 'crop_temperature', {'crop': None}
+
+    # 5. Greeting Intent
+    if any(greeting in transcript for greeting in [_('hello'), _('hi'), _('hey')]):
+        return 'greeting', {}
+
+    return 'unknown', {}
+
 @app.route('/api/voice-command', methods=['POST'])
 @login_required
 def process_voice_command():
@@ -1149,27 +2318,26 @@ def process_voice_command():
     if not transcript:
         return jsonify({'speak': response_text, 'action': action})
 
-    # 1. Navigation Intent
-    nav_keywords = [_('navigate to'), _('go to'), _('open'), _('show')]
-    if any(keyword in transcript for keyword in nav_keywords):
-        if _('dashboard') in transcript:
+    user_farms = current_user.farms
+    intent, params = parse_voice_intent(transcript, [farm.name for farm in user_farms])
+
+    if intent == 'navigate':
+        target = params['target']
+        if target == 'dashboard':
             response_text = _('Navigating to your dashboard.')
-            action = {'type': 'navigate', 'url': url_for('dashboard')}
-        elif _('farms') in transcript:
+        elif target == 'farms':
             response_text = _('Opening your farms page.')
-            action = {'type': 'navigate', 'url': url_for('farms')}
-        elif _('home') in transcript:
+        elif target == 'home':
             response_text = _('Let\'s go to your home page.')
-            action = {'type': 'navigate', 'url': url_for('home')}
-        elif _('advisories') in transcript:
+        elif target == 'advisories':
             response_text = _('Showing your latest advisories.')
-            action = {'type': 'navigate', 'url': url_for('advisories')}
         else:
             response_text = _("I'm not sure where you want to go. You can say 'go to dashboard', for example.")
+        if target:
+            action = {'type': 'navigate', 'url': url_for(target)}
 
-    # 2. Data Query Intent: Farm Count
-    elif _('how many farms') in transcript:
-        farm_count = len(current_user.farms)
+    elif intent == 'farm_count':
+        farm_count = len(user_farms)
         if farm_count == 0:
             response_text = _("You haven't added any farms yet.")
         elif farm_count == 1:
@@ -1177,37 +2345,38 @@ def process_voice_command():
         else:
             response_text = _("You have {count} farms registered.").format(count=farm_count)
 
-    # 3. Data Query Intent: Weather
-    elif _('weather') in transcript:
-        if not current_user.farms:
+    elif intent == 'weather':
+        if not user_farms:
             response_text = _("I can't get the weather because you don't have any farms registered.")
-        else:
-            found_farm = None
-            for farm in current_user.farms:
-                if farm.name.lower() in transcript:
-                    found_farm = farm
-                    break
-
-            if found_farm:
-                weather_data = get_weather_for_farm(found_farm)
-                if weather_data and 'temperature' in weather_data:
-                    temp = weather_data['temperature']
-                    desc = WMO_WEATHER_CODES.get(weather_data['weathercode'], 'the current conditions')
-                    response_text = _("The weather at {farm_name} is {temperature} degrees Celsius with {description}.").format(
-                        farm_name=found_farm.name, temperature=temp, description=desc
-                    )
-                else:
-                    response_text = _("Sorry, I couldn't retrieve the weather for {farm_name} at this time.").format(farm_name=found_farm.name)
+        elif params['farm_index'] is not None:
+            found_farm = user_farms[params['farm_index']]
+            weather_data = get_weather_for_farm(found_farm)
+            if weather_data and 'temperature' in weather_data:
+                temp = weather_data['temperature']
+                desc = WMO_WEATHER_CODES.get(weather_data['weathercode'], 'the current conditions')
+                response_text = _("The weather at {farm_name} is {temperature} degrees Celsius with {description}.").format(
+                    farm_name=found_farm.name, temperature=temp, description=desc
+                )
             else:
-                response_text = _("Which farm would you like the weather for? For example, say 'what is the weather at my Main Farm'.")
+                response_text = _("Sorry, I couldn't retrieve the weather for {farm_name} at this time.").format(farm_name=found_farm.name)
+        else:
+            response_text = _("Which farm would you like the weather for? For example, say 'what is the weather at my Main Farm'.")
+
+    elif intent == 'weather_all':
+        weather_by_farm = get_weather_for_farms(user_farms)
+        reports = [_("{farm_name}: {temperature} degrees, {description}").format(
+                       farm_name=farm.name, temperature=weather_by_farm[farm.id]['temperature'],
+                       description=_(WMO_WEATHER_CODES.get(weather_by_farm[farm.id]['weathercode'], 'the current conditions')))
+                   for farm in user_farms if weather_by_farm[farm.id]]
+        if not user_farms:
+            response_text = _("I can't get the weather because you don't have any farms registered.")
+        elif reports:
+            response_text = _("Here is the weather at your farms. {reports}.").format(reports='. '.join(reports))
+        else:
+            response_text = _("Sorry, I couldn't retrieve the weather for your farms at this time.")
 
-    # 4. General Knowledge Intent: Crop Info
-    elif _('ideal temperature for') in transcript or _('temperature for') in transcript:
-        found_crop = None
-        for crop in CROP_ADVISORY_DATA:
-            if crop.lower() in transcript:
-                found_crop = crop
-                break
+    elif intent == 'crop_temperature':
+        found_crop = params['crop']
         if found_crop:
             ideal_min, ideal_max = CROP_ADVISORY_DATA[found_crop]['ideal_temp']
             response_text = _("The ideal temperature for growing {crop} is between {min} and {max} degrees Celsius.").format(
@@ -1216,8 +2385,7 @@ def process_voice_command():
         else:
             response_text = _("I don't have temperature data for that crop. Please be more specific.")
 
-    # 5. Greeting Intent
-    elif any(greeting in transcript for greeting in [_('hello'), _('hi'), _('hey')]):
+    elif intent == 'greeting':
         response_text = _("Hello, {user}! How can I assist you with your farm today?").format(user=current_user.first_name)
 
     return jsonify({'speak': response_text, 'action': action, 'transcript': transcript})
@@ -1233,11 +2401,266 @@ def inject_globals():
         'LANGUAGES': app.config['LANGUAGES']
     }
 
+def upgrade_schema():
+    """
+    Adds columns and indexes introduced after a table was first created.
+    db.create_all() never alters existing tables, so new columns must be nullable.
+    """
+    inspector = sa_inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    connection.execute(text(
+                        f"ALTER TABLE {preparer.quote(table.name)} ADD COLUMN {preparer.quote(column.name)} {column_type}"
+                    ))
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+
+def backfill_farm_geohashes(batch_size=1000):
+    """Fills Farm.geohash for rows created before the column existed. Returns the number of rows updated."""
+    updated = 0
+    while True:
+        rows = db.session.query(Farm.id, Farm.latitude, Farm.longitude).filter(Farm.geohash.is_(None)).limit(batch_size).all()
+        if not rows:
+            break
+        db.session.execute(
+            db.update(Farm),
+            [{'id': row.id, 'geohash': geo.encode(row.latitude, row.longitude) or ''} for row in rows]
+        )
+        db.session.commit()
+        updated += len(rows)
+    return updated
+
+@app.cli.command('backfill-geohash')
+def backfill_geohash_command():
+    """Computes the geohash index for farms that are missing it."""
+    click.echo(f"Backfilled geohash for {backfill_farm_geohashes()} farms.")
+
+def prune_advisories(older_than_days, batch_size=1000, archive_path=None):
+    """
+    Deletes advisories older than `older_than_days` in batches of `batch_size`, committing
+    after each batch so no transaction holds locks for long. With `archive_path`, every
+    deleted row is first appended to that gzip'd NDJSON file. Returns (rows, seconds).
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    columns = [column for column in Advisory.__table__.columns]
+    archive = gzip.open(archive_path, 'at', encoding='utf-8') if archive_path else None
+    started, removed = time.perf_counter(), 0
+    try:
+        while True:
+            if archive:
+                rows = db.session.execute(
+                    db.select(*columns).where(Advisory.created_at < cutoff).order_by(Advisory.id).limit(batch_size)
+                ).mappings().all()
+                ids = [row['id'] for row in rows]
+                for row in rows:
+                    archive.write(json.dumps(dict(row), default=str) + '\n')
+            else:
+                ids = db.session.execute(
+                    db.select(Advisory.id).where(Advisory.created_at < cutoff).order_by(Advisory.id).limit(batch_size)
+                ).scalars().all()
+            if not ids:
+                break
+            db.session.execute(db.delete(Advisory).where(Advisory.id.in_(ids)))
+            db.session.commit()
+            removed += len(ids)
+    finally:
+        if archive:
+            archive.close()
+    return removed, time.perf_counter() - started
+
+def compact_advisory_table():
+    """Returns freed pages to the OS (SQLite) or refreshes visibility maps and stats (Postgres)."""
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        if db.engine.dialect.name == 'sqlite':
+            connection.execute(text('VACUUM'))
+        elif db.engine.dialect.name == 'postgresql':
+            connection.execute(text(f'VACUUM (ANALYZE) {Advisory.__table__.name}'))
+
+farms_cli = AppGroup('farms', help='Farm data management.')
+
+@farms_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'username', required=True, help='Username that will own the farms.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'geojson']), default=None, help='Defaults to the file extension.')
+@click.option('--geocode-budget', type=int, default=1000, show_default=True, help='Maximum Nominatim lookups.')
+@click.option('--errors', 'errors_path', default=None, help='Write the per-row error report to this JSON file.')
+def import_farms_command(path, username, fmt, geocode_budget, errors_path):
+    """Bulk-imports farms from a CSV or GeoJSON file."""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f"No user named {username}.")
+    with open(path, 'rb') as stream:
+        try:
+            report = run_farm_import(stream, farm_import.detect_format(path, explicit=fmt), user.id, geocode_budget)
+        except (farm_import.ImportFormatError, UnicodeDecodeError, csv.Error) as e:
+            imported = getattr(e, 'report', None) and e.report['imported']
+            raise click.ClickException(f"The file could not be read ({imported or 0} farms imported before the error): {e}")
+    rate = report['imported'] / report['elapsed_s'] if report['elapsed_s'] else 0.0
+    click.echo(f"Imported {report['imported']} farms ({report['geocoded']} geocoded), {report['failed']} rows failed, "
+               f"in {report['elapsed_s']:.2f}s ({rate:,.0f} rows/s).")
+    if errors_path:
+        with open(errors_path, 'w') as fh:
+            json.dump(report['errors'], fh, indent=2)
+    else:
+        for error in report['errors'][:20]:
+            click.echo(f"  row {error['row']}: {' '.join(error['errors'])}")
+
+app.cli.add_command(farms_cli)
+
+@app.cli.command('rebuild-yield-rollups')
+def rebuild_yield_rollups_command():
+    """Recomputes the yield rollups from stored predictions (repair or backfill)."""
+    db.session.execute(db.delete(YieldRollupBucket))
+    db.session.execute(db.delete(YieldRollup))
+    grouped = db.session.execute(
+        db.select(YieldPrediction.crop, YieldPrediction.state, YieldPrediction.season, YieldPrediction.year,
+                  YieldPrediction.yield_per_ha, db.func.count())
+        .group_by(YieldPrediction.crop, YieldPrediction.state, YieldPrediction.season,
+                  YieldPrediction.year, YieldPrediction.yield_per_ha)
+    )
+    for crop, state, season, year, value, count in grouped:
+        _add_to_rollups(crop, state, season, year, value, weight=count)
+    db.session.commit()
+    click.echo(f"Rebuilt yield rollups from {YieldPrediction.query.count()} predictions.")
+
+@app.cli.command('refresh-forecasts')
+@click.option('--all', 'refresh_all', is_flag=True, help='Refresh every stored cell, not only the due ones.')
+def refresh_forecasts_command(refresh_all):
+    """Refreshes stored forecasts now instead of waiting for the background refresher."""
+    if refresh_all:
+        db.session.execute(db.update(ForecastCell).values(refresh_after=datetime.utcnow(), requested_at=datetime.utcnow()))
+        db.session.commit()
+    total = 0
+    while True:
+        refreshed = refresh_due_forecasts()
+        if not refreshed:
+            break
+        total += refreshed
+    click.echo(f"Refreshed {total} forecast cells.")
+
+advisories_cli = AppGroup('advisories', help='Advisory maintenance.')
+
+@advisories_cli.command('prune')
+@click.option('--days', type=int, default=None, help='Age in days; defaults to ADVISORY_RETENTION_DAYS.')
+@click.option('--batch-size', type=int, default=1000, show_default=True)
+@click.option('--archive', 'archive_path', default=None, help='Append deleted rows to this .ndjson.gz file first.')
+@click.option('--vacuum', is_flag=True, help='Compact the table afterwards.')
+def prune_advisories_command(days, batch_size, archive_path, vacuum):
+    """Removes advisories past the retention period."""
+    days = days if days is not None else app.config['ADVISORY_RETENTION_DAYS']
+    removed, elapsed = prune_advisories(days, batch_size, archive_path)
+    rate = removed / elapsed if elapsed else 0.0
+    click.echo(f"Pruned {removed} advisories older than {days} days in {elapsed:.2f}s ({rate:,.0f} rows/s).")
+    if archive_path and removed:
+        click.echo(f"Archived to {archive_path}.")
+    if vacuum:
+        compact_advisory_table()
+        click.echo("Compacted advisory table.")
+
+app.cli.add_command(advisories_cli)
+
+sessions_cli = AppGroup('sessions', help='Server-side session maintenance.')
+
+@sessions_cli.command('sweep')
+@click.option('--batch-size', type=int, default=None, help='Rows deleted per transaction.')
+def sweep_sessions_command(batch_size):
+    """Deletes expired sessions now instead of waiting for the background sweeper."""
+    if session_store is None:
+        click.echo("SESSION_STORE=cookie: there is nothing to sweep.")
+        return
+    removed = sessions.sweep_expired(session_store, batch_size or app.config['SESSION_SWEEP_BATCH'])
+    click.echo(f"Removed {removed} expired sessions from the {session_store.name} store.")
+
+app.cli.add_command(sessions_cli)
+
+def synthetic_advisory_payload(rng):
+    """A rule payload for random inputs and weather, for synthetic advisories."""
+    temperature = round(rng.uniform(8, 44), 1)
+    weather = {
+        'temperature': temperature, 'weathercode': rng.choice(list(WMO_WEATHER_CODES)),
+        'window': {'hours': 48, 'precip_mm': round(rng.expovariate(1 / 8), 1),
+                   'temp_max': round(temperature + rng.uniform(0, 6), 1),
+                   'temp_min': round(temperature - rng.uniform(4, 12), 1)},
+    }
+    return evaluate_advisory_rules(rng.choice(CROP_OPTIONS), rng.choice(CROP_STAGE_OPTIONS),
+                                   rng.choice(SOIL_TYPE_OPTIONS), weather)
+
+synthetic_cli = AppGroup('synthetic', help='Synthetic data for scale testing.')
+
+@synthetic_cli.command('generate')
+@click.option('--users', 'user_count', type=int, default=0, show_default=True)
+@click.option('--farms', 'farm_count', type=int, default=0, show_default=True)
+@click.option('--advisories', 'advisory_count', type=int, default=0, show_default=True)
+@click.option('--translations', 'translation_count', type=int, default=0, show_default=True)
+@click.option('--seed', type=int, default=0, show_default=True, help='Same seed and starting database, same rows.')
+@click.option('--as-of', 'as_of', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Date the generated timestamps count back from; defaults to today (UTC).')
+@click.option('--days', type=int, default=365, show_default=True, help='Advisories are spread over this many days.')
+@click.option('--password', default='synthetic', show_default=True, help='Password of every generated user.')
+@click.option('--batch-size', type=int, default=10000, show_default=True, help='Rows per COPY or executemany batch.')
+def generate_synthetic_command(user_count, farm_count, advisory_count, translation_count, seed, as_of, days, password, batch_size):
+    """
+    Bulk-loads generated users, farms, advisories and translation cache rows (COPY on
+    Postgres, executemany elsewhere). Farms go to all existing users and advisories to all
+    existing farms, so tables can be filled in separate runs.
+    """
+    loader = synthetic.BulkLoader(db.engine)
+    now = as_of or datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+    def load(model, columns, make_rows, count):
+        table = model.__table__
+        start_id = loader.next_id(table)
+        reported = [0]
+
+        def progress(done):
+            if done - reported[0] >= 1000000:
+                reported[0] = done
+                click.echo(f"  {table.name}: {done:,} / {count:,}")
+
+        rows, elapsed = loader.load(table, columns, make_rows(synthetic.rng_for(seed, table.name), start_id),
+                                    batch_size, progress)
+        loader.finish(table)
+        rate = rows / elapsed if elapsed else 0.0
+        click.echo(f"Generated {rows:,} {table.name} rows in {elapsed:.2f}s ({rate:,.0f} rows/s).")
+
+    if user_count:
+        password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        load(User, synthetic.USER_COLUMNS,
+             lambda rng, start: synthetic.users(rng, start, user_count, password_hash, now), user_count)
+    if farm_count:
+        user_ids = loader.ids(User.__table__)
+        if not user_ids:
+            raise click.ClickException("Farms need users; pass --users as well.")
+        load(Farm, synthetic.FARM_COLUMNS,
+             lambda rng, start: synthetic.farms(rng, start, farm_count, user_ids, now), farm_count)
+    if advisory_count:
+        farm_ids = loader.ids(Farm.__table__)
+        if not farm_ids:
+            raise click.ClickException("Advisories need farms; pass --farms as well.")
+        pool = synthetic.payload_pool(synthetic.rng_for(seed, 'payload'), synthetic_advisory_payload)
+        load(Advisory, synthetic.ADVISORY_COLUMNS,
+             lambda rng, start: synthetic.advisories(rng, start, advisory_count, farm_ids, pool, now, days), advisory_count)
+    if translation_count:
+        target_langs = [language for language in app.config['LANGUAGES'] if language != 'en']
+        load(TranslationCache, synthetic.TRANSLATION_COLUMNS,
+             lambda rng, start: synthetic.translations(rng, start, translation_count, target_langs), translation_count)
+
+app.cli.add_command(synthetic_cli)
+
 # --- VERCEL FIX: Create tables automatically when app loads ---
 # This ensures that when Vercel starts your "Serverless Function",
 # it checks if the database tables exist and creates them if they don't.
 with app.app_context():
     db.create_all()
+    upgrade_schema()
+    backfill_farm_geohashes()
 
     # Create admin user if it doesn't exist
     if not User.query.filter_by(username='admin').first():
@@ -0,0 +1,240 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import click
+from flask import current_app, request, send_from_directory, url_for, abort
+from flask.cli import AppGroup
+
+try:
+    import brotli
+except ImportError:  # .br siblings are skipped when Brotli is not installed
+    brotli = None
+
+# Static asset pipeline.
+# `flask assets build` minifies static/js and static/css into static/dist with a
+# content hash in every filename, writes .gz/.br siblings and a manifest.json.
+# Templates call asset_url('js/main.js'); without a manifest it falls back to the
+# plain /static URL so development works without a build step.
+
+ASSET_SOURCES = ('js', 'css')
+DIST_DIRNAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_MAX_AGE = 31536000  # One year; the hash changes whenever the content does
+
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+
+
+def minify_js(source):
+    """
+    Conservative JS minifier: drops comments, indentation and blank lines but keeps
+    line breaks so automatic semicolon insertion behaves exactly as before.
+    Strings, template literals and regex literals are copied verbatim.
+    """
+    out, i, n = [], 0, len(source)
+    last_significant = ''
+    while i < n:
+        ch = source[i]
+        nxt = source[i + 1] if i + 1 < n else ''
+        if ch in '"\'`':
+            end = _skip_string(source, i, ch)
+            out.append(source[i:end])
+            last_significant = ch
+            i = end
+        elif ch == '/' and nxt == '/':
+            while i < n and source[i] != '\n':
+                i += 1
+        elif ch == '/' and nxt == '*':
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            out.append(' ')
+        elif ch == '/' and (last_significant in _REGEX_PRECEDERS or last_significant == '' or _ends_with_keyword(out)):
+            end = _skip_regex(source, i)
+            out.append(source[i:end])
+            last_significant = '/'
+            i = end
+        else:
+            out.append(ch)
+            if not ch.isspace():
+                last_significant = ch
+            i += 1
+    lines = (line.strip() for line in ''.join(out).splitlines())
+    return '\n'.join(line for line in lines if line) + '\n'
+
+
+def _ends_with_keyword(out):
+    tail = ''.join(out[-8:]).rstrip()
+    return re.search(r'\b(return|typeof|case|do|else|in|of|void|yield)$', tail) is not None
+
+
+def _skip_string(source, start, quote):
+    i = start + 1
+    while i < len(source):
+        if source[i] == '\\':
+            i += 2
+            continue
+        if source[i] == quote:
+            return i + 1
+        if quote == '`' and source.startswith('${', i):
+            i = _skip_template_expression(source, i + 2)
+            continue
+        i += 1
+    return len(source)
+
+
+def _skip_template_expression(source, i):
+    depth = 1
+    while i < len(source) and depth:
+        ch = source[i]
+        if ch in '"\'`':
+            i = _skip_string(source, i, ch)
+            continue
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+        i += 1
+    return i
+
+
+def _skip_regex(source, start):
+    i, in_class = start + 1, False
+    while i < len(source) and source[i] != '\n':
+        ch = source[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '[':
+            in_class = True
+        elif ch == ']':
+            in_class = False
+        elif ch == '/' and not in_class:
+            i += 1
+            while i < len(source) and source[i].isalpha():
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def minify_css(source):
+    """Removes comments and redundant whitespace from a stylesheet, leaving strings untouched."""
+    parts = re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', source)
+    for index in range(0, len(parts), 2):
+        chunk = re.sub(r'/\*.*?\*/', '', parts[index], flags=re.S)
+        chunk = re.sub(r'\s+', ' ', chunk)
+        chunk = re.sub(r'\s*([{};,>])\s*', r'\1', chunk)
+        chunk = re.sub(r':\s+', ':', chunk)
+        chunk = chunk.replace(';}', '}')
+        parts[index] = chunk
+    return ''.join(parts).strip() + '\n'
+
+
+MINIFIERS = {'.js': minify_js, '.css': minify_css}
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fh:
+        fh.write(data)
+
+
+def build_assets(static_folder):
+    """Builds fingerprinted, minified and precompressed assets. Returns per-file size stats."""
+    dist_folder = os.path.join(static_folder, DIST_DIRNAME)
+    manifest, stats = {}, []
+    for source_dir in ASSET_SOURCES:
+        for root, _, files in os.walk(os.path.join(static_folder, source_dir)):
+            for name in sorted(files):
+                base, ext = os.path.splitext(name)
+                if ext not in MINIFIERS or base.endswith('.min'):
+                    continue
+                source_path = os.path.join(root, name)
+                logical = os.path.relpath(source_path, static_folder).replace(os.sep, '/')
+                with open(source_path, encoding='utf-8') as fh:
+                    original = fh.read()
+                minified = MINIFIERS[ext](original).encode('utf-8')
+                digest = hashlib.sha256(minified).hexdigest()[:12]
+                hashed = f"{os.path.splitext(logical)[0]}.{digest}{ext}"
+                target = os.path.join(dist_folder, hashed)
+                _write(target, minified)
+                gz = gzip.compress(minified, compresslevel=9, mtime=0)
+                _write(target + '.gz', gz)
+                br = brotli.compress(minified, quality=11) if brotli is not None else None
+                if br is not None:
+                    _write(target + '.br', br)
+                manifest[logical] = hashed
+                stats.append({
+                    'asset': logical, 'file': hashed, 'original': len(original.encode('utf-8')),
+                    'minified': len(minified), 'gzip': len(gz), 'brotli': len(br) if br else None,
+                })
+    _write(os.path.join(dist_folder, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return stats
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIRNAME, MANIFEST_NAME), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def asset_url(filename):
+    """URL for a static asset: the fingerprinted build when one exists, else the source file."""
+    hashed = current_app.extensions['asset_manifest'].get(filename)
+    if hashed:
+        return url_for('built_asset', filename=hashed)
+    return url_for('static', filename=filename)
+
+
+def serve_built_asset(filename):
+    """Serves a fingerprinted asset, preferring its precompressed sibling."""
+    dist_folder = os.path.join(current_app.static_folder, DIST_DIRNAME)
+    if not os.path.isfile(os.path.join(dist_folder, filename)):
+        abort(404)
+    encoding, served = None, filename
+    accepted = request.accept_encodings
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if accepted[candidate] and os.path.isfile(os.path.join(dist_folder, filename + suffix)):
+            encoding, served = candidate, filename + suffix
+            break
+    response = send_from_directory(dist_folder, served, mimetype=_mimetype_for(filename), max_age=IMMUTABLE_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def _mimetype_for(filename):
+    if filename.endswith('.css'):
+        return 'text/css'
+    if filename.endswith('.js'):
+        return 'application/javascript'
+    if filename.endswith('.avif'):
+        return 'image/avif'
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+assets_cli = AppGroup('assets', help='Build fingerprinted static assets.')
+
+
+@assets_cli.command('build')
+def build_command():
+    """Minifies, fingerprints and precompresses static/js and static/css."""
+    stats = build_assets(current_app.static_folder)
+    for row in stats:
+        click.echo(f"{row['asset']:<28} {row['original']:>8} -> {row['minified']:>8} min, "
+                   f"{row['gzip']:>7} gz, {row['brotli'] or '-':>7} br  ({row['file']})")
+    click.echo(f"Wrote {len(stats)} assets to {os.path.join(current_app.static_folder, DIST_DIRNAME)}")
+
+
+def init_app(app):
+    app.extensions['asset_manifest'] = load_manifest(app.static_folder)
+    app.add_url_rule('/assets/<path:filename>', 'built_asset', serve_built_asset)
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.cli.add_command(assets_cli)
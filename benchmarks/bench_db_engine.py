@@ -0,0 +1,162 @@
+"""
+Database engine benchmark: SQLAlchemy defaults versus the tuned profile in db_engine.py.
+
+For each profile it measures:
+    connections/s   pooled checkout + SELECT 1 + checkin, from --threads threads
+    writes/s        single-row INSERT transactions from --processes concurrent processes
+    reads/s         COUNT(*) queries from one reader process running alongside the writers
+    errors          writes that failed (e.g. "database is locked")
+
+    python benchmarks/bench_db_engine.py                          # temporary SQLite files
+    python benchmarks/bench_db_engine.py --url postgresql://...   # a scratch Postgres database
+
+SQLite runs use a fresh file per profile because the journal mode is stored in the file.
+On Postgres a scratch table named bench_db_engine is created and dropped.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+import db_engine  # noqa: E402
+
+PROFILES = ('none', 'auto')
+TABLE = 'bench_db_engine'
+
+
+def make_engine(url, profile):
+    return db_engine.configure_engine(create_engine(url, **db_engine.engine_options(url, profile)), profile)
+
+
+def connections_per_second(url, profile, threads, duration):
+    engine = make_engine(url, profile)
+    counts = [0] * threads
+    stop = time.perf_counter() + duration
+
+    def run(slot):
+        while time.perf_counter() < stop:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            counts[slot] += 1
+
+    workers = [threading.Thread(target=run, args=(slot,)) for slot in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    engine.dispose()
+    return sum(counts) / duration
+
+
+def _writer(url, profile, writes, results):
+    engine = make_engine(url, profile)
+    done = errors = 0
+    started = time.perf_counter()
+    for i in range(writes):
+        try:
+            with engine.begin() as connection:
+                connection.execute(text(f'INSERT INTO {TABLE} (pid, n, payload) VALUES (:pid, :n, :payload)'),
+                                   {'pid': os.getpid(), 'n': i, 'payload': 'x' * 200})
+            done += 1
+        except OperationalError:
+            errors += 1
+    results.put(('write', done, errors, time.perf_counter() - started))
+    engine.dispose()
+
+
+def _reader(url, profile, stop_event, results):
+    engine = make_engine(url, profile)
+    reads = 0
+    started = time.perf_counter()
+    while not stop_event.is_set():
+        try:
+            with engine.connect() as connection:
+                connection.execute(text(f'SELECT COUNT(*) FROM {TABLE}')).scalar()
+            reads += 1
+        except OperationalError:
+            pass
+    results.put(('read', reads, 0, time.perf_counter() - started))
+    engine.dispose()
+
+
+def write_concurrency(url, profile, processes, writes):
+    engine = make_engine(url, profile)
+    with engine.begin() as connection:
+        connection.execute(text(f'DROP TABLE IF EXISTS {TABLE}'))
+        connection.execute(text(f'CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, pid INTEGER, n INTEGER, payload TEXT)'
+                                if engine.dialect.name == 'sqlite' else
+                                f'CREATE TABLE {TABLE} (id SERIAL PRIMARY KEY, pid INTEGER, n INTEGER, payload TEXT)'))
+    engine.dispose()
+
+    results, stop_event = multiprocessing.Queue(), multiprocessing.Event()
+    reader = multiprocessing.Process(target=_reader, args=(url, profile, stop_event, results))
+    writers = [multiprocessing.Process(target=_writer, args=(url, profile, writes, results)) for _ in range(processes)]
+    started = time.perf_counter()
+    reader.start()
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    elapsed = time.perf_counter() - started
+    stop_event.set()
+    reader.join()
+
+    outcome = {'writes': 0, 'errors': 0, 'reads': 0, 'read_seconds': 0.0}
+    for _ in range(processes + 1):
+        kind, count, errors, seconds = results.get()
+        if kind == 'write':
+            outcome['writes'] += count
+            outcome['errors'] += errors
+        else:
+            outcome['reads'], outcome['read_seconds'] = count, seconds
+
+    engine = make_engine(url, profile)
+    with engine.begin() as connection:
+        connection.execute(text(f'DROP TABLE IF EXISTS {TABLE}'))
+    engine.dispose()
+    return {
+        'writes_per_sec': outcome['writes'] / elapsed,
+        'reads_per_sec': outcome['reads'] / max(outcome['read_seconds'], 1e-9),
+        'errors': outcome['errors'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Database URL (default: temporary SQLite files).')
+    parser.add_argument('--threads', type=int, default=8, help='Threads for the connection benchmark.')
+    parser.add_argument('--duration', type=float, default=3.0, help='Seconds per connection benchmark.')
+    parser.add_argument('--processes', type=int, default=4, help='Concurrent writer processes.')
+    parser.add_argument('--writes', type=int, default=300, help='INSERT transactions per writer.')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+    args = parser.parse_args()
+    # Size the tuned pool as gunicorn would for a worker running --threads threads.
+    os.environ.setdefault('GUNICORN_THREADS', str(args.threads))
+
+    scratch = tempfile.mkdtemp(prefix='bench-db-')
+    report = {}
+    for profile in PROFILES:
+        url = args.url or 'sqlite:///' + os.path.join(scratch, f'{profile}.db')
+        report[profile] = {'connections_per_sec': connections_per_second(url, profile, args.threads, args.duration)}
+        report[profile].update(write_concurrency(url, profile, args.processes, args.writes))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'profile':<8} {'conn/s':>10} {'writes/s':>10} {'reads/s':>10} {'errors':>7}")
+    for profile, result in report.items():
+        print(f"{profile:<8} {result['connections_per_sec']:>10.0f} {result['writes_per_sec']:>10.0f} "
+              f"{result['reads_per_sec']:>10.0f} {result['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
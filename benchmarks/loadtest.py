@@ -0,0 +1,362 @@
+"""
+End-to-end load test for AgriAssist.
+
+Starts local stand-ins for Open-Meteo, Nominatim, MyMemory and SMTP (see stubs.py),
+seeds a throwaway SQLite database, boots the app under gunicorn and drives realistic
+user journeys from many virtual users. Per-route p50/p95/p99 latency and throughput
+are printed and stored in benchmarks/results/ so runs can be compared.
+
+    python benchmarks/loadtest.py run --users 20 --duration 60 --latency-ms 150 --error-rate 0.02
+    python benchmarks/loadtest.py run --workers 4 --threads 8 --label gthread --compare benchmarks/results/<previous>.json
+    python benchmarks/loadtest.py compare benchmarks/results/<before>.json benchmarks/results/<after>.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+sys.path.insert(0, BENCH_DIR)
+
+from stubs import Fault, MyMemoryStub, NominatimStub, OpenMeteoStub, SMTPStub  # noqa: E402
+
+PASSWORD = 'loadtest-pass'
+CROPS = ['Rice', 'Wheat', 'Tomato', 'Potato', 'Cotton', 'Maize', 'Onion']
+STAGES = ['Pre-Planting', 'Germination', 'Vegetative', 'Flowering', 'Fruiting', 'Harvest']
+SOILS = ['Sandy', 'Clay', 'Loamy', 'Silty', 'Peaty', 'Chalky']
+SEASONS = ['Kharif', 'Rabi', 'Zaid', 'Whole Year']
+STATES = ['Punjab', 'Karnataka', 'Maharashtra', 'Uttar Pradesh', 'Tamil Nadu', 'Rajasthan']
+VOICE_COMMANDS = [
+    'go to dashboard', 'how many farms do i have', 'what is the weather at farm 1',
+    'ideal temperature for rice', 'hello', 'open advisories',
+]
+# Relative weight of each journey after login.
+JOURNEYS = {'dashboard': 5, 'advisory': 3, 'prediction': 2, 'voice': 2, 'advisories_page': 1, 'signup': 0}
+
+CSRF_META = re.compile(r'<meta name="csrf-token" content="([^"]+)"')
+CSRF_INPUT = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+
+# --- Recording ---
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def add(self, route, seconds, ok):
+        with self.lock:
+            latencies, errors = self.samples.setdefault(route, ([], [0]))
+            latencies.append(seconds)
+            if not ok:
+                errors[0] += 1
+
+    def summary(self, elapsed):
+        routes, all_latencies, total_errors = {}, [], 0
+        for route, (latencies, errors) in sorted(self.samples.items()):
+            routes[route] = _stats(latencies, errors[0], elapsed)
+            all_latencies.extend(latencies)
+            total_errors += errors[0]
+        return {'routes': routes, 'overall': _stats(all_latencies, total_errors, elapsed)}
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def _stats(latencies, errors, elapsed):
+    ordered = sorted(latencies)
+    to_ms = lambda seconds: round(seconds * 1000, 1)
+    return {
+        'count': len(ordered),
+        'errors': errors,
+        'rps': round(len(ordered) / elapsed, 2) if elapsed else 0,
+        'mean_ms': to_ms(sum(ordered) / len(ordered)) if ordered else 0,
+        'p50_ms': to_ms(_percentile(ordered, 50)),
+        'p95_ms': to_ms(_percentile(ordered, 95)),
+        'p99_ms': to_ms(_percentile(ordered, 99)),
+        'max_ms': to_ms(ordered[-1]) if ordered else 0,
+    }
+
+
+# --- Virtual user ---
+
+class VirtualUser:
+    def __init__(self, base_url, username, recorder, smtp, rng):
+        self.base_url = base_url
+        self.username = username
+        self.recorder = recorder
+        self.smtp = smtp
+        self.rng = rng
+        self.http = requests.Session()
+        self.csrf = None
+        self.farm_ids = []
+
+    def call(self, route, method, path, ok_statuses=(200, 201, 302), **kwargs):
+        kwargs.setdefault('timeout', 30)
+        kwargs.setdefault('allow_redirects', False)
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, **kwargs)
+            ok = response.status_code in ok_statuses
+        except requests.RequestException:
+            response, ok = None, False
+        self.recorder.add(route, time.perf_counter() - started, ok)
+        if response is not None and response.headers.get('Content-Type', '').startswith('text/html'):
+            match = CSRF_META.search(response.text)
+            if match:
+                self.csrf = match.group(1)
+        return response
+
+    def login(self):
+        page = self.call('GET /login', 'GET', '/login')
+        token = CSRF_INPUT.search(page.text).group(1) if page is not None else ''
+        self.call('POST /login', 'POST', '/login', data={
+            'csrf_token': token, 'username': self.username, 'password': PASSWORD,
+        })
+        dashboard = self.call('GET /dashboard', 'GET', '/dashboard')
+        if dashboard is not None:
+            match = re.search(r'<script type="application/json" id="farms-data">(.*?)</script>', dashboard.text, re.S)
+            self.farm_ids = [farm['id'] for farm in json.loads(match.group(1))] if match else []
+
+    def _json_headers(self):
+        return {'X-CSRFToken': self.csrf or '', 'Content-Type': 'application/json'}
+
+    def journey_dashboard(self):
+        self.call('GET /dashboard', 'GET', '/dashboard')
+        for farm_id in self.farm_ids:
+            self.call('GET /api/farms/<id>/weather', 'GET', f'/api/farms/{farm_id}/weather')
+            self.call('GET /api/farms/<id>/nutrient_needs', 'GET', f'/api/farms/{farm_id}/nutrient_needs')
+            self.call('GET /api/farms/<id>/pesticide_needs', 'GET', f'/api/farms/{farm_id}/pesticide_needs')
+        lat, lon = 12.0 + self.rng.random() * 10, 74.0 + self.rng.random() * 10
+        self.call('GET /api/reverse_geocode', 'GET', f'/api/reverse_geocode?lat={lat:.4f}&lon={lon:.4f}')
+        self.call('GET /api/annual_rainfall', 'GET', f'/api/annual_rainfall?lat={lat:.4f}&lon={lon:.4f}')
+
+    def journey_advisory(self):
+        self.call('GET /farms', 'GET', '/farms')
+        if not self.farm_ids:
+            return
+        self.call('GET /api/geocode', 'GET', '/api/geocode?q=' + self.rng.choice(['mandya', 'ludhiana', 'nashik', 'guntur']))
+        self.call('POST /api/advisory', 'POST', '/api/advisory', headers=self._json_headers(), json={
+            'farm_id': self.rng.choice(self.farm_ids), 'crop_type': self.rng.choice(CROPS),
+            'crop_stage': self.rng.choice(STAGES), 'soil_type': self.rng.choice(SOILS),
+        })
+
+    def journey_prediction(self):
+        self.call('POST /api/predict_yield', 'POST', '/api/predict_yield', headers={'X-CSRFToken': self.csrf or ''}, data={
+            'csrf_token': self.csrf or '', 'crop': self.rng.choice(CROPS), 'season': self.rng.choice(SEASONS),
+            'state': self.rng.choice(STATES), 'area': round(0.5 + self.rng.random() * 5, 2),
+            'annual_rainfall': self.rng.randint(400, 2200), 'fertilizer': self.rng.randint(50, 300),
+            'pesticide': round(self.rng.random() * 5, 1),
+        })
+
+    def journey_voice(self):
+        self.call('POST /api/voice-command', 'POST', '/api/voice-command', headers=self._json_headers(),
+                  json={'transcript': self.rng.choice(VOICE_COMMANDS)})
+
+    def journey_advisories_page(self):
+        self.call('GET /advisories', 'GET', '/advisories')
+
+    def journey_signup(self):
+        anonymous = VirtualUser(self.base_url, None, self.recorder, self.smtp, self.rng)
+        page = anonymous.call('GET /register', 'GET', '/register')
+        token = CSRF_INPUT.search(page.text).group(1) if page is not None else ''
+        username = f"signup{self.rng.randrange(10 ** 9)}"
+        email = f"{username}@example.com"
+        anonymous.call('POST /register', 'POST', '/register', data={
+            'csrf_token': token, 'username': username, 'email': email, 'first_name': 'Load',
+            'last_name': 'Test', 'password': PASSWORD, 'password2': PASSWORD,
+        })
+        otp = self.smtp.last_otp(email)
+        page = anonymous.call('GET /verify-otp', 'GET', '/verify-otp')
+        token = CSRF_INPUT.search(page.text).group(1) if page is not None and CSRF_INPUT.search(page.text) else ''
+        anonymous.call('POST /verify-otp', 'POST', '/verify-otp', data={'csrf_token': token, 'otp': otp or '000000'})
+
+    def run(self, deadline, journeys):
+        self.login()
+        names, weights = zip(*[(name, weight) for name, weight in journeys.items() if weight > 0])
+        while time.time() < deadline:
+            getattr(self, f'journey_{self.rng.choices(names, weights)[0]}')()
+
+
+# --- Orchestration ---
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code < 500:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f'App did not come up at {url}')
+
+
+def seed(users, farms_per_user):
+    """Creates load-test users and farms. Runs in a subprocess with the app's environment."""
+    sys.path.insert(0, ROOT)
+    from app import app, db, bcrypt, User, Farm
+    with app.app_context():
+        password_hash = bcrypt.generate_password_hash(PASSWORD).decode('utf-8')
+        rng = random.Random(42)
+        for index in range(users):
+            user = User(username=f'loadtest{index}', email=f'loadtest{index}@example.com', first_name='Farm',
+                        last_name=f'User{index}', password_hash=password_hash, is_verified=True)
+            db.session.add(user)
+            db.session.flush()
+            for farm_index in range(farms_per_user):
+                lat, lon = 8.0 + rng.random() * 20, 70.0 + rng.random() * 17
+                db.session.add(Farm(name=f'Farm {farm_index + 1}', location='Load test', latitude=lat,
+                                    longitude=lon, area_hectares=round(0.5 + rng.random() * 4, 2), user_id=user.id))
+        db.session.commit()
+
+
+def run(args):
+    fault = Fault(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                  timeout_rate=args.timeout_rate)
+    meteo, nominatim, mymemory = OpenMeteoStub(fault).start(), NominatimStub(fault).start(), MyMemoryStub(fault).start()
+    smtp = SMTPStub().start()
+    workdir = tempfile.mkdtemp(prefix='agri-loadtest-')
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        'SECRET_KEY': 'loadtest-secret',
+        'SESSION_COOKIE_SECURE': 'False',
+        'OPEN_METEO_FORECAST_URL': f'{meteo.url}/v1/forecast',
+        'OPEN_METEO_ARCHIVE_URL': f'{meteo.url}/v1/archive',
+        'NOMINATIM_URL': nominatim.url,
+        'MYMEMORY_API_URL': f'{mymemory.url}/get',
+        'MAIL_SERVER': '127.0.0.1', 'MAIL_PORT': str(smtp.port), 'MAIL_USE_TLS': 'False',
+        'MAIL_USERNAME': '', 'MAIL_PASSWORD': '', 'MAIL_DEFAULT_SENDER': 'noreply@loadtest.local',
+    })
+    env.setdefault('LOG_REQUESTS', 'False')  # one access line per request would flood the console
+    subprocess.run([sys.executable, os.path.abspath(__file__), 'seed', '--users', str(args.users),
+                    '--farms', str(args.farms)], env=env, cwd=ROOT, check=True)
+    server = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}',
+        '--workers', str(args.workers), '--threads', str(args.threads), '--log-level', 'warning',
+    ], env=env, cwd=ROOT)
+    base_url = f'http://127.0.0.1:{port}'
+    journeys = dict(JOURNEYS, signup=args.signup_weight)
+    recorder = Recorder()
+    try:
+        _wait_for(base_url + '/login')
+        started = time.time()
+        deadline = started + args.duration
+        threads = []
+        for index in range(args.users):
+            user = VirtualUser(base_url, f'loadtest{index}', recorder, smtp, random.Random(index))
+            thread = threading.Thread(target=user.run, args=(deadline, journeys), daemon=True)
+            threads.append(thread)
+            thread.start()
+            time.sleep(args.ramp_up / max(args.users, 1))
+        for thread in threads:
+            thread.join(timeout=args.duration + 60)
+        elapsed = time.time() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        for stub in (meteo, nominatim, mymemory, smtp):
+            stub.stop()
+
+    result = {
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'label': args.label,
+        'config': {key: value for key, value in vars(args).items() if key not in ('func', 'compare')},
+        'elapsed_s': round(elapsed, 2),
+        'upstream_calls': {'open-meteo': meteo.calls, 'nominatim': nominatim.calls,
+                           'mymemory': mymemory.calls, 'smtp': smtp.count},
+        **recorder.summary(elapsed),
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    name = f"loadtest-{datetime.utcnow():%Y%m%d-%H%M%S}{'-' + args.label if args.label else ''}.json"
+    path = os.path.join(RESULTS_DIR, name)
+    with open(path, 'w') as fh:
+        json.dump(result, fh, indent=2)
+    print_table(result)
+    print(f'\nSaved {path}')
+    if args.compare:
+        with open(args.compare) as fh:
+            print_comparison(json.load(fh), result)
+
+
+def print_table(result):
+    print(f"\n{'route':<38} {'count':>7} {'err':>5} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8}")
+    rows = list(result['routes'].items()) + [('OVERALL', result['overall'])]
+    for route, row in rows:
+        print(f"{route:<38} {row['count']:>7} {row['errors']:>5} {row['rps']:>7} "
+              f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8}")
+    print(f"\nupstream calls: {json.dumps(result['upstream_calls'])}")
+
+
+def print_comparison(before, after):
+    print(f"\n{'route':<38} {'p95 before':>11} {'p95 after':>10} {'change':>8} {'rps before':>11} {'rps after':>10}")
+    routes = sorted(set(before['routes']) | set(after['routes'])) + ['OVERALL']
+    for route in routes:
+        old = before['overall'] if route == 'OVERALL' else before['routes'].get(route)
+        new = after['overall'] if route == 'OVERALL' else after['routes'].get(route)
+        if not old or not new:
+            continue
+        change = (new['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0.0
+        print(f"{route:<38} {old['p95_ms']:>11} {new['p95_ms']:>10} {change:>+7.1f}% {old['rps']:>11} {new['rps']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help='Run a load test and store the result.')
+    run_parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users.')
+    run_parser.add_argument('--farms', type=int, default=2, help='Farms seeded per user.')
+    run_parser.add_argument('--duration', type=float, default=60, help='Seconds of load after ramp-up starts.')
+    run_parser.add_argument('--ramp-up', type=float, default=5, help='Seconds over which users start.')
+    run_parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes.')
+    run_parser.add_argument('--threads', type=int, default=1, help='Threads per gunicorn worker.')
+    run_parser.add_argument('--latency-ms', type=float, default=120, help='Base upstream latency.')
+    run_parser.add_argument('--jitter-ms', type=float, default=80, help='Uniform extra upstream latency.')
+    run_parser.add_argument('--error-rate', type=float, default=0.0, help='Share of upstream calls answered with 500.')
+    run_parser.add_argument('--timeout-rate', type=float, default=0.0, help='Share of upstream calls that hang.')
+    run_parser.add_argument('--signup-weight', type=int, default=0, help='Weight of the register + OTP journey.')
+    run_parser.add_argument('--label', default='', help='Suffix for the result file.')
+    run_parser.add_argument('--compare', help='Previous result file to compare against.')
+    run_parser.set_defaults(func=run)
+
+    seed_parser = sub.add_parser('seed', help=argparse.SUPPRESS)
+    seed_parser.add_argument('--users', type=int, required=True)
+    seed_parser.add_argument('--farms', type=int, required=True)
+    seed_parser.set_defaults(func=lambda args: seed(args.users, args.farms))
+
+    compare_parser = sub.add_parser('compare', help='Compare two stored results.')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.set_defaults(func=lambda args: print_comparison(*(json.load(open(p)) for p in (args.before, args.after))))
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""
+Micro-benchmarks for the pure compute paths, with regression gating.
+
+Each benchmark runs one function over a representative corpus (every crop, stage,
+soil, weather code, season, state and locale) and records:
+    ops_per_sec      best of --repeat timed passes over the corpus
+    peak_alloc       peak bytes held above the starting point during one pass (tracemalloc)
+
+    python benchmarks/microbench.py                    # compare against the stored baseline
+    python benchmarks/microbench.py --save-baseline    # record a new baseline on this machine
+    python benchmarks/microbench.py --only advisory --threshold 10
+    python benchmarks/microbench.py --require-baseline # CI: a missing baseline fails the run
+
+The process exits with status 1 when a benchmark is slower, or allocates more, than the
+baseline by more than --threshold percent. No baseline is committed, because the numbers
+only mean something on the machine that recorded them: record it with --save-baseline on
+the machine that gates and keep it there (or pass --baseline). Gating jobs should always
+use --require-baseline, which exits with status 2 when the baseline file is missing or has
+no entry for a benchmark that ran; without it a missing baseline only prints a note.
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'microbench.db'))
+
+import app as agri  # noqa: E402
+import translation  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'microbench_baseline.json')
+LOCALES = list(agri.app.config['LANGUAGES'])
+WEATHER_SAMPLES = [None] + [
+    {'temperature': temperature, 'weathercode': code, 'is_day': 1}
+    for temperature in (4.0, 14.0, 22.5, 31.0, 41.0)
+    for code in list(agri.WMO_WEATHER_CODES) + [42]
+]
+VOICE_TRANSCRIPTS = [
+    'go to dashboard', 'open my farms', 'show advisories', 'navigate to home', 'open the barn',
+    'how many farms do i have', 'what is the weather at north field', 'weather please',
+    'what is the ideal temperature for wheat', 'temperature for mango', 'hello', 'hey there',
+    'i would like to know something completely unrelated to farming today',
+]
+FARM_NAMES = ['North Field', 'River Plot', 'Main Farm', 'Hill Orchard']
+
+
+class FakeFarm:
+    id = 1
+    name = 'Bench Farm'
+
+
+def advisory_corpus():
+    crops = list(agri.CROP_ADVISORY_DATA) + ['Banana']
+    return list(itertools.product(crops, agri.CROP_STAGE_OPTIONS + ['unknown stage'], agri.SOIL_TYPE_OPTIONS, WEATHER_SAMPLES))
+
+
+def prediction_corpus():
+    return list(itertools.product(agri.CROP_OPTIONS, agri.SEASON_OPTIONS, ['Punjab', 'Rajasthan', 'Kerala', 'Goa'],
+                                  (0.0, 120.0, 260.0), (0.0, 3.5), (300.0, 900.0, 2400.0)))
+
+
+def historical_corpus():
+    return list(itertools.product(agri.CROP_OPTIONS, agri.STATE_OPTIONS))
+
+
+def bench_advisory():
+    farm, corpus = FakeFarm(), advisory_corpus()
+    def run():
+        for crop, stage, soil, weather in corpus:
+            agri.generate_ai_advisory(farm, crop, stage, soil, weather)
+    return run, len(corpus), None
+
+
+def bench_prediction():
+    corpus = prediction_corpus()
+    def run():
+        for crop, season, state, fert, pest, rain in corpus:
+            agri.predict_yield_and_advise(crop, season, state, fert, pest, rain)
+    return run, len(corpus), None
+
+
+def bench_historical():
+    corpus = historical_corpus()
+    def run():
+        for crop, state in corpus:
+            agri.get_historical_yields(crop, state)
+    return run, len(corpus), None
+
+
+def bench_voice_intent():
+    from flask_babel import force_locale
+    ctx = agri.app.test_request_context()
+    ctx.push()
+    def run():
+        for locale in LOCALES:
+            with force_locale(locale):
+                for transcript in VOICE_TRANSCRIPTS:
+                    agri.parse_voice_intent(transcript, FARM_NAMES)
+    return run, len(LOCALES) * len(VOICE_TRANSCRIPTS), ctx.pop
+
+
+def bench_translate_cache_hit():
+    texts = [f"Advisory sentence number {i} about irrigation and nutrients." for i in range(200)]
+    ctx = agri.app.app_context()
+    ctx.push()
+    for text in texts:
+        for locale in LOCALES:
+            if locale != 'en':
+                agri.TranslationCache.add_translation(text, 'en', locale, f"[{locale}] {text}")
+    targets = [(text, locale) for text in texts for locale in LOCALES if locale != 'en']
+    def run():
+        for text, locale in targets:
+            translation.translate_text(text, target_language=locale)
+    return run, len(targets), ctx.pop
+
+
+BENCHMARKS = {
+    'advisory': bench_advisory,
+    'prediction': bench_prediction,
+    'historical_yields': bench_historical,
+    'voice_intent': bench_voice_intent,
+    'translate_cache_hit': bench_translate_cache_hit,
+}
+
+
+def measure(name, repeat, min_time):
+    run, calls, teardown = BENCHMARKS[name]()
+    try:
+        run()  # warm-up: imports, babel catalogs, SQLite page cache
+        best = float('inf')
+        for _ in range(repeat):
+            gc.collect()
+            passes, started = 0, time.perf_counter()
+            while True:
+                run()
+                passes += 1
+                elapsed = time.perf_counter() - started
+                if elapsed >= min_time:
+                    break
+            best = min(best, elapsed / passes)
+        gc.collect()
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        if teardown:
+            teardown()
+    return {
+        'calls_per_pass': calls,
+        'ops_per_sec': round(calls / best, 1),
+        'us_per_op': round(best / calls * 1e6, 2),
+        'peak_alloc': peak - base,
+    }
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"\n{'benchmark':<22} {'ops/sec':>12} {'baseline':>12} {'change':>8} {'peak alloc':>10} {'baseline':>10} {'change':>8}")
+    for name, row in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<22} {row['ops_per_sec']:>12} {'-':>12} {'new':>8} {row['peak_alloc']:>10}")
+            continue
+        speed = (row['ops_per_sec'] - base['ops_per_sec']) / base['ops_per_sec'] * 100
+        alloc = ((row['peak_alloc'] - base['peak_alloc']) / base['peak_alloc'] * 100) if base['peak_alloc'] else 0.0
+        flag = ''
+        if speed < -threshold:
+            flag += ' SLOWER'
+        if alloc > threshold:
+            flag += ' MORE-ALLOC'
+        if flag:
+            regressions.append(name)
+        print(f"{name:<22} {row['ops_per_sec']:>12} {base['ops_per_sec']:>12} {speed:>+7.1f}% "
+              f"{row['peak_alloc']:>10} {base['peak_alloc']:>10} {alloc:>+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', action='append', choices=sorted(BENCHMARKS), help='Run only these benchmarks.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed passes; the best one is kept.')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per timed pass.')
+    parser.add_argument('--threshold', type=float, default=15.0, help='Allowed regression in percent.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline file to compare against or save.')
+    parser.add_argument('--save-baseline', action='store_true', help='Write this run as the new baseline.')
+    parser.add_argument('--require-baseline', action='store_true',
+                        help='Exit with status 2 when the baseline, or a benchmark in it, is missing.')
+    parser.add_argument('--json', action='store_true', help='Print raw results as JSON.')
+    args = parser.parse_args()
+
+    results = {name: measure(name, args.repeat, args.min_time) for name in (args.only or BENCHMARKS)}
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as fh:
+                baseline = json.load(fh)
+        baseline.update(results)
+        with open(args.baseline, 'w') as fh:
+            json.dump(baseline, fh, indent=2, sort_keys=True)
+        print(f"Saved baseline for {', '.join(results)} to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        compare(results, {}, args.threshold)
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one.")
+        return 2 if args.require_baseline else 0
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    regressions = compare(results, baseline, args.threshold)
+    missing = [name for name in results if name not in baseline]
+    if missing and args.require_baseline:
+        print(f"\nNo baseline for: {', '.join(missing)}; run with --save-baseline to record them.")
+        return 2
+    if regressions:
+        print(f"\nRegression beyond {args.threshold}% in: {', '.join(regressions)}")
+        return 1
+    print(f"\nNo regressions beyond {args.threshold}%.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
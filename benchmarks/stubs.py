@@ -0,0 +1,251 @@
+"""
+Local stand-ins for the third-party services AgriAssist calls.
+
+    OpenMeteoStub   /v1/forecast and /v1/archive
+    NominatimStub   /search and /reverse
+    MyMemoryStub    /get
+    SMTPStub        a minimal SMTP server that keeps every message so OTPs can be read back
+
+Every HTTP stub takes a Fault profile: a base latency, uniform jitter, and the share of
+requests that fail with a 500 or hang past the client's timeout.
+"""
+import email
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+@dataclass
+class Fault:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0    # share of requests answered with HTTP 500
+    timeout_rate: float = 0.0  # share of requests that stall for timeout_s
+    timeout_s: float = 11.0    # just past the app's 10s requests timeout
+
+    def apply(self):
+        """Sleeps for the configured latency and returns 'error', 'timeout' or None."""
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000.0)
+        roll = random.random()
+        if roll < self.timeout_rate:
+            time.sleep(self.timeout_s)
+            return 'timeout'
+        if roll < self.timeout_rate + self.error_rate:
+            return 'error'
+        return None
+
+
+def _floats(values):
+    return [float(v) for v in values.split(',') if v]
+
+
+def forecast_payload(params):
+    latitudes = _floats(params.get('latitude', ['0'])[0])
+    longitudes = _floats(params.get('longitude', ['0'])[0])
+    results = []
+    for lat, lon in zip(latitudes, longitudes):
+        seed = int(abs(lat * 1000) + abs(lon * 1000))
+        rng = random.Random(seed)
+        results.append({
+            'latitude': lat, 'longitude': lon, 'timezone': 'GMT',
+            'current': {
+                'time': time.strftime('%Y-%m-%dT%H:00', time.gmtime()),
+                'temperature_2m': round(18 + rng.random() * 20, 1),
+                'is_day': 1,
+                'weather_code': rng.choice([0, 1, 2, 3, 61, 63, 65, 80, 95]),
+            },
+        })
+        if 'hourly' in params:
+            hours = 24 * int(params.get('forecast_days', ['3'])[0])
+            midnight = int(time.time()) // 86400 * 86400
+            results[-1]['hourly'] = {
+                'time': [time.strftime('%Y-%m-%dT%H:00', time.gmtime(midnight + 3600 * h)) for h in range(hours)],
+                'temperature_2m': [round(18 + rng.random() * 20, 1) for _ in range(hours)],
+                'precipitation': [round(max(0.0, rng.random() * 4 - 3), 1) for _ in range(hours)],
+                'weather_code': [rng.choice([0, 1, 2, 3, 61, 63, 65, 80, 95]) for _ in range(hours)],
+                'is_day': [1 if 6 <= h % 24 < 18 else 0 for h in range(hours)],
+            }
+    return results[0] if len(results) == 1 else results
+
+
+def archive_payload(params):
+    days = 5 * 365
+    rng = random.Random(params.get('latitude', ['0'])[0])
+    return {'daily': {'time': [], 'precipitation_sum': [round(rng.random() * 6, 1) for _ in range(days)]}}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    routes = {}
+    fault = Fault()
+    counter = None
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        handler = self.routes.get(parsed.path)
+        self.counter[parsed.path] = self.counter.get(parsed.path, 0) + 1
+        if handler is None:
+            return self._send(404, {'error': 'not found'})
+        outcome = self.fault.apply()
+        if outcome == 'timeout':
+            return
+        if outcome == 'error':
+            return self._send(500, {'error': 'injected failure'})
+        self._send(200, handler(parse_qs(parsed.query)))
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class HTTPStub:
+    """Runs a threaded HTTP server on 127.0.0.1 in a daemon thread."""
+    name = 'stub'
+    routes = {}
+
+    def __init__(self, fault=None, port=0):
+        self.fault = fault or Fault()
+        self.calls = {}
+        handler = type(f'{self.__class__.__name__}Handler', (_StubHandler,), {
+            'routes': self.routes, 'fault': self.fault, 'counter': self.calls,
+        })
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class OpenMeteoStub(HTTPStub):
+    name = 'open-meteo'
+    routes = {'/v1/forecast': forecast_payload, '/v1/archive': archive_payload}
+
+
+class NominatimStub(HTTPStub):
+    name = 'nominatim'
+    routes = {
+        '/search': lambda params: [{'display_name': params.get('q', [''])[0].title() + ', India', 'lat': '12.9716', 'lon': '77.5946'}],
+        '/reverse': lambda params: {'address': {'state': 'Karnataka', 'country': 'India'}},
+    }
+
+
+class MyMemoryStub(HTTPStub):
+    name = 'mymemory'
+    routes = {
+        '/get': lambda params: {'responseStatus': 200, 'responseData': {'translatedText': params.get('q', [''])[0][::-1]}},
+    }
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self._reply('220 stub ESMTP')
+        recipients, in_data, lines = [], False, []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+            if in_data:
+                if line == '.':
+                    in_data = False
+                    self.server.store('\n'.join(lines), recipients)
+                    recipients, lines = [], []
+                    self._reply('250 OK: queued')
+                else:
+                    lines.append(line[1:] if line.startswith('..') else line)
+                continue
+            command = line[:4].upper()
+            if command == 'EHLO':
+                self._reply('250-stub', '250 8BITMIME')
+            elif command == 'HELO':
+                self._reply('250 stub')
+            elif command == 'MAIL':
+                self._reply('250 OK')
+            elif command == 'RCPT':
+                match = re.search(r'<([^>]+)>', line)
+                recipients.append(match.group(1) if match else line[8:].strip())
+                self._reply('250 OK')
+            elif command == 'DATA':
+                in_data = True
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('250 OK')
+
+    def _reply(self, *lines):
+        self.wfile.write(''.join(f'{line}\r\n' for line in lines).encode())
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    """Accepts mail on 127.0.0.1 and remembers the last message per recipient."""
+    name = 'smtp'
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0):
+        super().__init__(('127.0.0.1', port), _SMTPHandler)
+        self.messages = {}
+        self.count = 0
+        self._lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def store(self, message, recipients):
+        with self._lock:
+            self.count += 1
+            for recipient in recipients:
+                self.messages[recipient.lower()] = message
+
+    def last_otp(self, recipient):
+        """Extracts the six-digit code from the last message sent to recipient."""
+        raw = self.messages.get(recipient.lower())
+        if raw is None:
+            return None
+        for part in email.message_from_string(raw).walk():
+            if part.get_content_type() == 'text/plain':
+                text = part.get_payload(decode=True).decode(part.get_content_charset() or 'utf-8', 'replace')
+                match = re.search(r'\b(\d{6})\b', text)
+                if match:
+                    return match.group(1)
+        return None
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,116 @@
+"""
+Bytes-on-the-wire benchmark for the dashboard flow.
+
+Runs the same sequence of requests a farmer makes when opening the dashboard three ways:
+  1. baseline  - no Accept-Encoding and no validators (what we shipped before)
+  2. compressed - first visit with Accept-Encoding: br, gzip
+  3. revisit   - second visit sending If-None-Match with the ETags from visit 2
+
+Upstream APIs are replaced by canned responses so the numbers are deterministic.
+
+    python benchmarks/wire_bytes.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'wire_bytes.db'))
+
+import requests
+from stubs import forecast_payload
+
+
+class CannedResponse:
+    def __init__(self, payload):
+        self._payload = payload
+        self.status_code = 200
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        pass
+
+
+def canned_get(url, *args, **kwargs):
+    if 'archive' in url:
+        return CannedResponse({'daily': {'precipitation_sum': [2.5] * 1826}})
+    if 'forecast' in url:
+        # The same hourly payload the load test stub serves, so the forecast store accepts it.
+        params = {key: [str(value)] for key, value in (kwargs.get('params') or {}).items()}
+        return CannedResponse(forecast_payload(params))
+    if 'reverse' in url:
+        return CannedResponse({'address': {'state': 'Karnataka'}})
+    return CannedResponse([{'display_name': 'Mandya, Karnataka', 'lat': '12.52', 'lon': '76.89'}])
+
+
+requests.get = canned_get
+
+from app import app  # noqa: E402  (import after DATABASE_URL and the canned upstream are in place)
+
+
+def wire_size(response):
+    header_bytes = sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+    return header_bytes + len(response.get_data())
+
+
+def dashboard_flow(client, farm_id):
+    return [
+        '/dashboard',
+        f'/api/farms/{farm_id}/weather',
+        f'/api/farms/{farm_id}/nutrient_needs',
+        f'/api/farms/{farm_id}/pesticide_needs',
+        '/api/reverse_geocode?lat=12.52&lon=76.89',
+        '/api/annual_rainfall?lat=12.52&lon=76.89',
+    ]
+
+
+def run_pass(client, urls, headers_for):
+    total, etags, rows = 0, {}, []
+    for url in urls:
+        response = client.get(url, headers=headers_for(url))
+        # An error page would still have a size; measuring one would make the numbers meaningless.
+        assert response.status_code in (200, 304), f'{url} returned {response.status_code}'
+        size = wire_size(response)
+        total += size
+        etags[url] = response.headers.get('ETag')
+        rows.append((url, response.status_code, response.headers.get('Content-Encoding', '-'), size))
+    return total, etags, rows
+
+
+def main():
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['SESSION_COOKIE_SECURE'] = False
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': os.environ.get('ADMIN_PASSWORD', 'admin123')})
+    farm = client.post('/api/farms', json={
+        'name': 'Bench Farm', 'location': 'Mandya', 'latitude': 12.52, 'longitude': 76.89, 'area_hectares': 1.5
+    }).get_json()
+    urls = dashboard_flow(client, farm['farm_id'])
+
+    baseline, _, baseline_rows = run_pass(client, urls, lambda url: {'Accept-Encoding': 'identity'})
+    compressed, etags, compressed_rows = run_pass(client, urls, lambda url: {'Accept-Encoding': 'br, gzip'})
+    revisit, _, revisit_rows = run_pass(client, urls, lambda url: {
+        'Accept-Encoding': 'br, gzip', 'If-None-Match': etags.get(url) or ''
+    })
+
+    for label, rows in (('baseline', baseline_rows), ('compressed', compressed_rows), ('revisit', revisit_rows)):
+        print(f"\n{label}")
+        for url, status, encoding, size in rows:
+            print(f"  {status}  {encoding:<5} {size:>8} B  {url}")
+
+    summary = {
+        'baseline_bytes': baseline,
+        'compressed_bytes': compressed,
+        'revisit_bytes': revisit,
+        'compressed_saving_pct': round(100 * (1 - compressed / baseline), 1),
+        'revisit_saving_pct': round(100 * (1 - revisit / baseline), 1),
+    }
+    print('\n' + json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
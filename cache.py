@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import logs
+import metrics
+import singleflight
+
+try:
+    import redis
+except ImportError:  # Redis is optional; the SQLite file tier covers single-host setups
+    redis = None
+
+# Two-tier cache shared by every worker.
+# Each Namespace keeps a small in-process LRU in front of a shared store, so repeated
+# lookups in one worker cost a dict access and every other worker (and the next deploy)
+# still finds what one worker fetched. The shared store is chosen by CACHE_URL:
+#   redis://host:6379/0          a Redis-protocol server (Redis, Valkey, KeyDB, ...)
+#   sqlite:///path/cache.sqlite3 a WAL-mode SQLite file, for single-host setups
+#   memory                       in-process tier only
+# With no CACHE_URL a SQLite file in the instance folder is used. Values are stored as
+# JSON; a failing shared store is logged and treated as a miss, never as an error.
+
+DEFAULT_MAXSIZE = 1024
+SQLITE_MAX_ENTRIES = 200_000
+_PRUNE_EVERY = 1000
+_MAX_KEY_LENGTH = 200
+
+
+class LocalLRU:
+    """Thread-safe LRU with per-entry expiry."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, value, expires):
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class NullStore:
+    """Shared tier for CACHE_URL=memory: every lookup misses."""
+    name = 'memory'
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def add(self, key, value, ttl):
+        return True
+
+    def delete(self, key):
+        pass
+
+
+class RedisStore:
+    name = 'redis'
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError('CACHE_URL points at Redis but the redis package is not installed.')
+        # redis-py's connection pool notices a fork and reconnects in the child.
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=int(ttl) if ttl else None)
+
+    def add(self, key, value, ttl):
+        return bool(self.client.set(key, value, ex=int(ttl) if ttl else None, nx=True))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+
+class SQLiteStore:
+    """
+    A cache table in a local SQLite file in WAL mode, so readers in every worker proceed
+    while one writes. Expired rows are dropped, and the table is trimmed to max_entries
+    (soonest-expiring first), every _PRUNE_EVERY writes.
+    """
+    name = 'sqlite'
+
+    def __init__(self, path, max_entries=SQLITE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = self._connection()
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)')
+        connection.execute('CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+
+    def _connection(self):
+        # One connection per thread and process; SQLite connections must not cross a fork.
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl):
+        connection = self._connection()
+        connection.execute('INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                           (key, value, time.time() + ttl if ttl else None))
+        self._writes += 1
+        if self._writes % _PRUNE_EVERY == 0:
+            self.prune()
+
+    def add(self, key, value, ttl):
+        connection = self._connection()
+        now = time.time()
+        connection.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+        return connection.execute('INSERT OR IGNORE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                                  (key, value, now + ttl if ttl else None)).rowcount == 1
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def prune(self):
+        connection = self._connection()
+        connection.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        excess = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute('DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)', (excess,))
+
+
+_store = NullStore()
+_prefix = 'agri'
+
+
+def store_from_url(url, instance_path):
+    if not url:
+        path = os.path.join(instance_path, 'cache.sqlite3')
+        try:
+            return SQLiteStore(path)
+        except (OSError, sqlite3.OperationalError) as e:
+            # The default must not stop boot where the app directory is read-only (e.g. Vercel).
+            logs.log.warning('SQLite cache unavailable; using the in-process LRU only',
+                             extra={'path': path, 'error': str(e)})
+            return NullStore()
+    if url == 'memory':
+        return NullStore()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisStore(url)
+    if url.startswith('sqlite:///'):
+        return SQLiteStore(url[len('sqlite:///'):])
+    raise ValueError(f'Unsupported CACHE_URL: {url}')
+
+
+def acquire_lock(name, ttl):
+    """
+    Takes a cross-worker lock in the shared store (set-if-absent with expiry). Returns a
+    token for release_lock, or None if another worker holds it. Without a shared store,
+    or if the store fails, the lock is always granted.
+    """
+    token = os.urandom(8).hex()
+    try:
+        return token if _store.add(f'{_prefix}:lock:{name}', token, ttl) else None
+    except Exception as e:
+        logs.log.warning('Shared cache lock failed', extra={'store': _store.name, 'error': str(e)})
+        return token
+
+
+def release_lock(name, token):
+    key = f'{_prefix}:lock:{name}'
+    try:
+        held = _store.get(key)
+        if held is not None and (held.decode() if isinstance(held, bytes) else held) == token:
+            _store.delete(key)
+    except Exception as e:
+        logs.log.warning('Shared cache unlock failed', extra={'store': _store.name, 'error': str(e)})
+
+
+class Namespace:
+    """
+    A named slice of the cache with its own TTL (seconds, None for no expiry), local LRU
+    size and key version. Bump `version` when the shape of the cached values changes.
+    """
+
+    def __init__(self, name, ttl=None, maxsize=DEFAULT_MAXSIZE, version=1):
+        self.name = name
+        self.ttl = ttl
+        self.version = version
+        self.local = LocalLRU(maxsize)
+        self.flight = singleflight.Group(name)
+
+    def _key(self, key):
+        key = str(key)
+        if len(key) > _MAX_KEY_LENGTH:
+            key = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return f'{_prefix}:{self.name}:v{self.version}:{key}'
+
+    def _load(self, full_key):
+        entry = self.local.get(full_key)
+        if entry is not None:
+            return entry[1]
+        try:
+            raw = _store.get(full_key)
+        except Exception as e:
+            logs.log.warning('Shared cache read failed', extra={'cache': self.name, 'store': _store.name, 'error': str(e)})
+            raw = None
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        # The shared store does not say how long the entry has left; keep it locally for
+        # at most the namespace TTL.
+        self.local.set(full_key, value, time.time() + self.ttl if self.ttl else None)
+        return value
+
+    def get(self, key, default=None):
+        value = self._load(self._key(key))
+        metrics.record_cache(self.name, value is not None)
+        return default if value is None else value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        full_key = self._key(key)
+        self.local.set(full_key, value, time.time() + ttl if ttl else None)
+        try:
+            _store.set(full_key, json.dumps(value, separators=(',', ':'), default=str), ttl)
+        except Exception as e:
+            logs.log.warning('Shared cache write failed', extra={'cache': self.name, 'store': _store.name, 'error': str(e)})
+
+    def delete(self, key):
+        full_key = self._key(key)
+        self.local.delete(full_key)
+        try:
+            _store.delete(full_key)
+        except Exception as e:
+            logs.log.warning('Shared cache delete failed', extra={'cache': self.name, 'store': _store.name, 'error': str(e)})
+
+    def get_or_set(self, key, compute, ttl=None):
+        """
+        Cached value for key, computing and storing it on a miss. Concurrent misses for the
+        same key are coalesced so compute() runs once. None results are not cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        full_key = self._key(key)
+
+        def fill():
+            value = self._load(full_key)
+            if value is None:
+                value = compute()
+                if value is not None:
+                    self.set(key, value, ttl)
+            return value
+
+        return self.flight.do(full_key, fill, recheck=lambda: self._load(full_key))
+
+
+def init_app(app):
+    global _store, _prefix
+    _prefix = app.config.get('CACHE_PREFIX', 'agri')
+    _store = store_from_url(app.config.get('CACHE_URL'), app.instance_path)
+    if app.config.get('SINGLEFLIGHT_SHARED') and not isinstance(_store, NullStore):
+        singleflight.use_shared_locks(acquire_lock, release_lock)
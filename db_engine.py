@@ -0,0 +1,103 @@
+import os
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+import metrics
+
+# Engine settings tuned per database backend, passed to Flask-SQLAlchemy as
+# SQLALCHEMY_ENGINE_OPTIONS before the engine is created.
+#
+# PostgreSQL (Neon): a LIFO QueuePool sized to the threads of one gunicorn worker plus
+# the background threads and the advisory job pool. Connections are pre-pinged and recycled before Neon's
+# idle-suspend closes them. Through Neon's PgBouncer endpoint (a "-pooler" host),
+# psycopg 3's automatic server-side prepared statements are turned off, because they do
+# not survive transaction pooling. psycopg2 never prepares statements.
+#
+# SQLite: WAL journal so readers never block the writer, synchronous=NORMAL, and a
+# busy timeout so concurrent workers wait for the write lock instead of failing with
+# "database is locked".
+#
+# DB_PROFILE=none keeps SQLAlchemy's defaults; the DB_* variables override single values.
+
+BACKGROUND_CONNECTIONS = 3   # Forecast refresher, event poller and session sweeper
+NEON_IDLE_RECYCLE = 240      # Seconds; Neon suspends idle computes after ~5 minutes
+SQLITE_BUSY_TIMEOUT_MS = 15000
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            metrics.record_db_acquire(time.perf_counter() - started)
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def pool_size_for_worker():
+    # gunicorn.conf.py exports the thread count of each worker before the app is loaded;
+    # advisory job threads (jobs.ElasticPool) each hold a connection while they run.
+    return _env_int('DB_POOL_SIZE', _env_int('GUNICORN_THREADS', 1) + BACKGROUND_CONNECTIONS
+                    + _env_int('ADVISORY_JOB_THREADS', 8))
+
+
+def engine_options(uri, profile='auto'):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URI under the given profile ('auto' or 'none')."""
+    if profile == 'none':
+        return {}
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend == 'postgresql':
+        size = pool_size_for_worker()
+        connect_args = {'connect_timeout': _env_int('DB_CONNECT_TIMEOUT', 10), 'application_name': 'agri-assist'}
+        if url.get_driver_name() == 'psycopg' and '-pooler' in (url.host or ''):
+            connect_args['prepare_threshold'] = None
+        return {
+            'poolclass': TimedQueuePool,
+            'pool_size': size,
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', size),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', 10),
+            'pool_recycle': _env_int('DB_POOL_RECYCLE', NEON_IDLE_RECYCLE),
+            'pool_pre_ping': True,
+            'pool_use_lifo': True,
+            'query_cache_size': _env_int('DB_QUERY_CACHE_SIZE', 1200),
+            'connect_args': connect_args,
+        }
+    if backend == 'sqlite' and url.database not in (None, '', ':memory:'):
+        return {
+            'poolclass': TimedQueuePool,
+            'pool_size': pool_size_for_worker(),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+            'query_cache_size': _env_int('DB_QUERY_CACHE_SIZE', 1200),
+            'connect_args': {'timeout': _env_int('DB_BUSY_TIMEOUT_MS', SQLITE_BUSY_TIMEOUT_MS) / 1000,
+                             'check_same_thread': False},
+        }
+    return {}
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f"PRAGMA busy_timeout={_env_int('DB_BUSY_TIMEOUT_MS', SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+
+def configure_engine(engine, profile='auto'):
+    """Per-connection setup that engine options cannot express. Safe to call on any engine."""
+    if profile != 'none' and engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+        event.listen(engine, 'connect', _sqlite_pragmas)
+    return engine
+
+
+def init_app(app, db):
+    with app.app_context():
+        configure_engine(db.engine, app.config.get('DB_PROFILE', 'auto'))
@@ -0,0 +1,144 @@
+import collections
+import json
+import os
+import threading
+import time
+import logs
+import metrics
+
+# Per-user event fan-out for the Server-Sent Events stream (GET /api/events).
+# Events are rows in the database (app.UserEvent), so every worker sees events published
+# by any other worker, and a reconnecting browser resumes from its Last-Event-ID. Each
+# worker runs one poller thread, only while it has subscribers, that reads new rows with
+# a single indexed query per interval and hands them to the local subscriptions of their
+# user. Publishers call wake() after committing so this worker delivers without waiting.
+#
+# Ids from a database sequence can commit out of order, so the poller re-reads the last
+# REORDER_WINDOW ids and skips the ones it has already delivered.
+
+REORDER_WINDOW = 100
+MAX_PENDING = 200        # Events kept per subscription before the oldest are dropped
+IDLE_EXIT_SECONDS = 30   # The poller stops after this long without subscribers
+
+
+def format_event(event_id, kind, data):
+    """One SSE frame; `data` is the stored JSON text (always a single line)."""
+    return f'id: {event_id}\nevent: {kind}\ndata: {data}\n\n'
+
+
+def format_comment(text=''):
+    return f': {text}\n\n'
+
+
+def encode(data):
+    return json.dumps(data, separators=(',', ':'))
+
+
+class Subscription:
+    """Events for one connected stream, filled by the broker's poller thread."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.skip = set()  # Ids already sent from the resume backlog
+        self._pending = collections.deque(maxlen=MAX_PENDING)
+        self._cond = threading.Condition()
+
+    def put(self, event):
+        with self._cond:
+            self._pending.append(event)
+            self._cond.notify()
+
+    def get(self, timeout):
+        """Waits up to `timeout` seconds; returns a list of (id, kind, data), possibly empty."""
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout)
+            pending = list(self._pending)
+            self._pending.clear()
+        return [event for event in pending if event[0] not in self.skip]
+
+
+class Broker:
+    """
+    `load(after_id)` returns [(id, user_id, kind, data), ...] ordered by id, and
+    `latest()` returns the highest stored id (0 if none). Both run on the poller thread.
+    """
+
+    def __init__(self, name, load, latest, poll_interval=1.0):
+        self.name = name
+        self.load = load
+        self.latest = latest
+        self.poll_interval = poll_interval
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = False
+        self._pid = None
+
+    def _reset_after_fork(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._subscribers = {}
+            self._running = False
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id)
+        with self._lock:
+            self._reset_after_fork()
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            if not self._running:
+                self._running = True
+                threading.Thread(target=self._run, name=f'{self.name}-poller', daemon=True).start()
+        metrics.record_event_stream(1)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+        metrics.record_event_stream(-1)
+
+    def wake(self):
+        self._wakeup.set()
+
+    def stats(self):
+        return {'users': len(self._subscribers), 'streams': sum(len(s) for s in self._subscribers.values())}
+
+    def _dispatch(self, rows):
+        with self._lock:
+            targets = {user_id: list(subscriptions) for user_id, subscriptions in self._subscribers.items()}
+        for event_id, user_id, kind, data in rows:
+            for subscription in targets.get(user_id, ()):
+                subscription.put((event_id, kind, data))
+
+    def _run(self):
+        start = cursor = None
+        seen, idle_since = set(), None
+        while True:
+            with self._lock:
+                if self._subscribers:
+                    idle_since = None
+                elif idle_since is None:
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since >= IDLE_EXIT_SECONDS:
+                    self._running = False
+                    return
+            try:
+                if cursor is None:
+                    # Streams replay their own backlog; the poller only delivers what comes next.
+                    start = cursor = self.latest()
+                else:
+                    rows = [row for row in self.load(max(cursor - REORDER_WINDOW, start))
+                            if row[0] not in seen]
+                    if rows:
+                        cursor = max(cursor, rows[-1][0])
+                        seen.update(row[0] for row in rows)
+                        seen = {event_id for event_id in seen if event_id > cursor - REORDER_WINDOW}
+                        self._dispatch(rows)
+            except Exception:
+                logs.log.exception('Event poll failed', extra={'broker': self.name})
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
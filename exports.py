@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+import zlib
+from flask import Response, stream_with_context
+
+# Streaming CSV / NDJSON downloads with a constant memory footprint.
+# Rows come from a generator (normally a server-side cursor); they are written into a
+# small buffer that is flushed whenever it passes FLUSH_BYTES, optionally through a
+# streaming gzip compressor, so neither the result set nor the file is ever held whole.
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+FLUSH_BYTES = 64 * 1024
+YIELD_PER = 1000
+
+
+def _encode_rows(rows, fields, fmt):
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        write = lambda row: writer.writerow([row.get(field) for field in fields])
+    else:
+        write = lambda row: buffer.write(json.dumps(row, default=str, ensure_ascii=False) + '\n')
+    for row in rows:
+        write(row)
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(rows, fields, fmt, filename, compress=False):
+    """
+    Builds a streamed attachment response. `rows` is an iterable of dicts that is only
+    consumed while the response is being sent, inside the original request context.
+    """
+    mimetype, extension = FORMATS[fmt]
+    chunks = _encode_rows(rows, fields, fmt)
+    filename = f"{filename}.{extension}"
+    if compress:
+        chunks = _gzip_chunks(chunks)
+        mimetype, filename = 'application/gzip', filename + '.gz'
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'private, no-store'
+    response.headers['X-Accel-Buffering'] = 'no'  # let nginx pass chunks straight through
+    return response
@@ -0,0 +1,288 @@
+import csv
+import io
+import json
+import threading
+import time
+import geo
+
+# Bulk farm import from CSV or a GeoJSON FeatureCollection.
+# Input is parsed as a stream, validated in chunks of CHUNK_SIZE rows and inserted with one
+# executemany per chunk, so a 10k-row file needs ~10 INSERT round trips instead of 10k
+# commits. Rows without coordinates are geocoded through a throttled, cached lookup.
+#
+# CSV columns: name, location, latitude, longitude, area_hectares, area_geojson (only
+# name and either location or latitude/longitude are required).
+# GeoJSON: Point, Polygon or MultiPolygon features with name/location/area_hectares in
+# properties; polygon areas and centres are computed when not given.
+
+CHUNK_SIZE = 1000
+ERROR_REPORT_LIMIT = 1000
+NAME_MAX, LOCATION_MAX = 100, 200
+GEOCODE_CACHE_MAX = 10000
+_READ_SIZE = 64 * 1024
+
+
+class ImportFormatError(ValueError):
+    """
+    The file as a whole cannot be parsed (as opposed to a single bad row). When raised
+    part-way through an import, `report` holds what was already inserted before it.
+    """
+
+    def __init__(self, message, report=None):
+        super().__init__(message)
+        self.report = report
+
+
+def detect_format(filename=None, mimetype=None, explicit=None):
+    if explicit:
+        return explicit.lower()
+    name = (filename or '').lower()
+    if name.endswith(('.geojson', '.json')) or mimetype in ('application/geo+json', 'application/json'):
+        return 'geojson'
+    return 'csv'
+
+
+def iter_csv(stream):
+    """Yields one dict per CSV row, reading the file incrementally."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    if not reader.fieldnames:
+        raise ImportFormatError('The CSV file is empty.')
+    for row in reader:
+        yield {key.strip().lower(): (value.strip() if isinstance(value, str) else value)
+               for key, value in row.items() if key}
+
+
+def iter_geojson(stream):
+    """
+    Yields the features of a FeatureCollection one at a time without loading the whole
+    document: the "features" array is located and each element decoded as it arrives.
+    """
+    decoder = json.JSONDecoder()
+    reader = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    buffer, position, eof = '', 0, False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = reader.read(_READ_SIZE)
+        if not chunk:
+            eof = True
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    fill()
+    while True:
+        marker = buffer.find('"features"')
+        if marker >= 0:
+            bracket = buffer.find('[', marker)
+            if bracket >= 0:
+                position = bracket + 1
+                break
+        if eof:
+            raise ImportFormatError('No "features" array found in the GeoJSON file.')
+        fill()
+
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(buffer):
+            if eof:
+                raise ImportFormatError('The GeoJSON file ends inside the "features" array.')
+            fill()
+            continue
+        if buffer[position] == ']':
+            return
+        try:
+            feature, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise ImportFormatError('The GeoJSON file contains invalid JSON.')
+            fill()
+            continue
+        position = end
+        yield _feature_to_row(feature) if isinstance(feature, dict) else {'_error': 'Feature is not a JSON object.'}
+
+
+def _feature_to_row(feature):
+    properties = feature.get('properties') or {}
+    geometry = feature.get('geometry') or {}
+    if not isinstance(properties, dict):
+        return {'_error': 'Feature properties must be a JSON object.'}
+    if not isinstance(geometry, dict):
+        return {'_error': 'Feature geometry must be a JSON object.'}
+    row = {key.lower(): value for key, value in properties.items()}
+    kind = geometry.get('type')
+    coordinates = geometry.get('coordinates')
+    if kind == 'Point':
+        if not isinstance(coordinates, list) or len(coordinates) < 2:
+            row['_error'] = 'Point geometry needs [longitude, latitude] coordinates.'
+            return row
+        row.setdefault('longitude', coordinates[0])
+        row.setdefault('latitude', coordinates[1])
+    elif kind in ('Polygon', 'MultiPolygon'):
+        try:
+            latitude, longitude = geo.polygon_center(geometry)
+            area = geo.polygon_area_hectares(geometry)
+        except (TypeError, ValueError, IndexError, KeyError):
+            row['_error'] = f'{kind} geometry has invalid coordinates.'
+            return row
+        row.setdefault('latitude', latitude)
+        row.setdefault('longitude', longitude)
+        if row.get('area_hectares') in (None, ''):
+            row['area_hectares'] = round(area, 2)
+        row['area_geojson'] = json.dumps({'type': 'Feature', 'geometry': geometry, 'properties': {}})
+    elif kind is not None:
+        row['_error'] = f'Unsupported geometry type "{kind}".'
+    return row
+
+
+def _number(value, field, errors, low=None, high=None):
+    if value in (None, ''):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        errors.append(f'{field} is not a number.')
+        return None
+    if (low is not None and number < low) or (high is not None and number > high):
+        errors.append(f'{field} must be between {low} and {high}.')
+        return None
+    return number
+
+
+def validate_row(row):
+    """Returns (clean_row, errors). clean_row may still lack coordinates that need geocoding."""
+    if row.get('_error'):
+        return {}, [row['_error']]  # The feature itself was unusable; field checks would only add noise
+    errors = []
+    name = str(row.get('name') or '').strip()
+    location = str(row.get('location') or '').strip()
+    if not name:
+        errors.append('name is required.')
+    elif len(name) > NAME_MAX:
+        errors.append(f'name is longer than {NAME_MAX} characters.')
+    if len(location) > LOCATION_MAX:
+        errors.append(f'location is longer than {LOCATION_MAX} characters.')
+    latitude = _number(row.get('latitude'), 'latitude', errors, -90, 90)
+    longitude = _number(row.get('longitude'), 'longitude', errors, -180, 180)
+    if (latitude is None) != (longitude is None) and not errors:
+        errors.append('latitude and longitude must be given together.')
+    area = _number(row.get('area_hectares'), 'area_hectares', errors, 0, 1e6)
+    if latitude is None and not location:
+        errors.append('either location or latitude/longitude is required.')
+    area_geojson = row.get('area_geojson') or None
+    if isinstance(area_geojson, dict):
+        area_geojson = json.dumps(area_geojson)
+    return {
+        'name': name, 'location': location, 'latitude': latitude, 'longitude': longitude,
+        'area_hectares': area, 'area_geojson': area_geojson,
+    }, errors
+
+
+class ThrottledGeocoder:
+    """
+    Wraps a lookup(query) -> (lat, lon) | None function with a process-wide cache and a
+    minimum interval between upstream calls (Nominatim allows one request per second).
+    At most `budget` upstream calls are made per instance, so one import cannot tie up
+    a worker for long; rows past the budget are reported as errors. `cached(query)` may
+    return (lat, lon) from a shared cache first, without throttling or spending the budget.
+    """
+    _cache = {}
+    _lock = threading.Lock()
+    _last_call = 0.0
+
+    def __init__(self, lookup, min_interval=1.0, budget=100, cached=None):
+        self.lookup = lookup
+        self.cached = cached
+        self.min_interval = min_interval
+        self.budget = budget
+        self.calls = 0
+
+    def __call__(self, query):
+        key = query.strip().lower()
+        if key in self._cache:
+            return self._cache[key]
+        shared = self.cached(query) if self.cached else None
+        if shared is not None:
+            return shared
+        if self.calls >= self.budget:
+            raise LookupError('geocoding limit for this import reached; add coordinates to the remaining rows.')
+        with ThrottledGeocoder._lock:
+            wait = ThrottledGeocoder._last_call + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            ThrottledGeocoder._last_call = time.monotonic()
+        self.calls += 1
+        result = self.lookup(query)
+        if result is not None:
+            if len(ThrottledGeocoder._cache) >= GEOCODE_CACHE_MAX:
+                ThrottledGeocoder._cache.clear()
+            ThrottledGeocoder._cache[key] = result
+        return result
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_farms(rows, user_id, insert_batch, geocoder, chunk_size=CHUNK_SIZE):
+    """
+    Validates and inserts farms. `rows` yields raw dicts (see iter_csv / iter_geojson),
+    `insert_batch(list_of_dicts)` writes one chunk, and `geocoder(location)` resolves
+    rows without coordinates. Returns a report with per-row errors (row numbers are
+    1-based data rows, not counting a CSV header). Chunks are inserted as they are read,
+    so a file that turns out to be unreadable part-way raises ImportFormatError carrying
+    the report of the farms already inserted.
+    """
+    started = time.perf_counter()
+    report = {'imported': 0, 'failed': 0, 'geocoded': 0, 'errors': []}
+
+    def fail(number, messages):
+        report['failed'] += 1
+        if len(report['errors']) < ERROR_REPORT_LIMIT:
+            report['errors'].append({'row': number, 'errors': messages})
+
+    try:
+        for chunk in _chunks(enumerate(rows, start=1), chunk_size):
+            batch = []
+            for number, raw in chunk:
+                clean, errors = validate_row(raw)
+                if not errors and clean['latitude'] is None:
+                    try:
+                        coordinates = geocoder(clean['location'])
+                    except LookupError as e:
+                        errors.append(str(e))
+                    else:
+                        if coordinates is None:
+                            errors.append(f'location "{clean["location"]}" could not be geocoded.')
+                        else:
+                            clean['latitude'], clean['longitude'] = coordinates
+                            report['geocoded'] += 1
+                if errors:
+                    fail(number, errors)
+                    continue
+                if not clean['location']:
+                    clean['location'] = f"{clean['latitude']:.5f}, {clean['longitude']:.5f}"
+                # Bulk inserts skip mapper events, so the geohash listener never sees these rows.
+                clean['geohash'] = geo.encode(clean['latitude'], clean['longitude'])
+                clean['user_id'] = user_id
+                batch.append(clean)
+            if batch:
+                insert_batch(batch)
+                report['imported'] += len(batch)
+    except (ImportFormatError, UnicodeDecodeError, csv.Error) as e:
+        raise ImportFormatError(str(e), report=_finish(report, started)) from e
+    return _finish(report, started)
+
+
+def _finish(report, started):
+    report['errors_truncated'] = report['failed'] > len(report['errors'])
+    report['elapsed_s'] = round(time.perf_counter() - started, 3)
+    return report
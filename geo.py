@@ -0,0 +1,168 @@
+import math
+
+# Geohash helpers used to index Farm locations.
+# A geohash cell of precision 5 is roughly 4.9km x 4.9km, which is finer than the
+# Open-Meteo model grid, so every farm inside one cell can share a single forecast.
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+BASE32_INDEX = {c: i for i, c in enumerate(BASE32)}
+
+FARM_GEOHASH_PRECISION = 7   # Stored on every Farm row (~150m x 150m)
+WEATHER_CELL_PRECISION = 5   # Prefix shared by farms that get the same forecast
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Approximate cell size (width_km, height_km) at the equator for each precision.
+CELL_SIZE_KM = {
+    1: (5000.0, 5000.0), 2: (1250.0, 625.0), 3: (156.0, 156.0), 4: (39.1, 19.5),
+    5: (4.89, 4.89), 6: (1.22, 0.61), 7: (0.153, 0.153), 8: (0.038, 0.019),
+}
+
+
+def encode(latitude, longitude, precision=FARM_GEOHASH_PRECISION):
+    """Encodes a latitude/longitude pair into a geohash string."""
+    if latitude is None or longitude is None:
+        return None
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def decode_bbox(geohash):
+    """Returns (min_lat, min_lon, max_lat, max_lon) of a geohash cell."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = BASE32_INDEX[char]
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def decode(geohash):
+    """Returns the (latitude, longitude) centre of a geohash cell."""
+    min_lat, min_lon, max_lat, max_lon = decode_bbox(geohash)
+    return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+
+def cell_for(latitude, longitude, precision=WEATHER_CELL_PRECISION):
+    """Returns the shared weather cell for a coordinate."""
+    return encode(latitude, longitude, precision)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def bbox_around(latitude, longitude, radius_km):
+    """Bounding box (min_lat, min_lon, max_lat, max_lon) that contains a radius around a point."""
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    d_lon = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat))
+    return (max(latitude - d_lat, -90.0), max(longitude - d_lon, -180.0),
+            min(latitude + d_lat, 90.0), min(longitude + d_lon, 180.0))
+
+
+def precision_for_span(span_km):
+    """Picks the finest precision whose cells are still larger than the searched span."""
+    for precision in range(8, 0, -1):
+        width, height = CELL_SIZE_KM[precision]
+        if min(width, height) >= span_km:
+            return precision
+    return 1
+
+
+def cells_covering_bbox(min_lat, min_lon, max_lat, max_lon, precision=None, max_cells=64):
+    """
+    Returns a set of geohash prefixes whose union covers the bounding box.
+    The precision is lowered automatically so the result never exceeds max_cells.
+    """
+    if precision is None:
+        span_km = haversine_km(min_lat, min_lon, min_lat, max_lon)
+        span_km = max(span_km, haversine_km(min_lat, min_lon, max_lat, min_lon))
+        precision = precision_for_span(span_km / 2 or 0.01)
+    while precision > 1:
+        cells = _walk_bbox(min_lat, min_lon, max_lat, max_lon, precision, max_cells)
+        if cells is not None:
+            return cells
+        precision -= 1
+    return _walk_bbox(min_lat, min_lon, max_lat, max_lon, 1, 32)
+
+
+def _walk_bbox(min_lat, min_lon, max_lat, max_lon, precision, max_cells):
+    cells = set()
+    lat = min_lat
+    cell_lat0, _, cell_lat1, _ = decode_bbox(encode(min_lat, min_lon, precision))
+    lat_step = cell_lat1 - cell_lat0
+    while lat <= max_lat + lat_step:
+        lon = min_lon
+        _, cell_lon0, _, cell_lon1 = decode_bbox(encode(min(lat, max_lat), min_lon, precision))
+        lon_step = cell_lon1 - cell_lon0
+        while lon <= max_lon + lon_step:
+            cells.add(encode(min(lat, max_lat), min(lon, max_lon), precision))
+            if len(cells) > max_cells:
+                return None
+            lon += lon_step
+        lat += lat_step
+    return cells
+
+
+
+def _ring_area_m2(ring):
+    # Spherical excess of a lon/lat ring, the same formula OpenLayers' ol.sphere.getArea
+    # uses in the farm drawing tool, so imported and drawn areas agree.
+    radius = EARTH_RADIUS_KM * 1000
+    total = 0.0
+    for (lon1, lat1), (lon2, lat2) in zip(ring, ring[1:] + ring[:1]):
+        total += math.radians(lon2 - lon1) * (2 + math.sin(math.radians(lat1)) + math.sin(math.radians(lat2)))
+    return abs(total * radius * radius / 2.0)
+
+
+def _polygons(geometry):
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    raise ValueError(f"unsupported geometry type {geometry['type']}")
+
+
+def polygon_area_hectares(geometry):
+    """Area of a GeoJSON Polygon or MultiPolygon geometry in hectares (holes subtracted)."""
+    area = 0.0
+    for rings in _polygons(geometry):
+        outer, holes = rings[0], rings[1:]
+        area += _ring_area_m2([tuple(p[:2]) for p in outer])
+        area -= sum(_ring_area_m2([tuple(p[:2]) for p in hole]) for hole in holes)
+    return area / 10000.0
+
+
+def polygon_center(geometry):
+    """Centre of the geometry's bounding box as (latitude, longitude), matching the drawing tool."""
+    points = [p for rings in _polygons(geometry) for p in rings[0]]
+    lons, lats = [p[0] for p in points], [p[1] for p in points]
+    return (min(lats) + max(lats)) / 2, (min(lons) + max(lons)) / 2
@@ -0,0 +1,40 @@
+import os
+import shutil
+import tempfile
+
+# Gunicorn settings picked up automatically from the working directory.
+# Workers write Prometheus metrics to a shared directory so /metrics reports
+# totals across all of them, not just the worker that answers the scrape.
+#
+# Threaded workers by default: an open /api/events stream occupies one thread that
+# mostly sleeps, not a whole sync worker process. Each worker gets GUNICORN_THREADS
+# threads for requests plus EVENT_STREAMS_PER_WORKER for streams; the app refuses
+# streams beyond that so they can never starve ordinary requests. Streams hold no
+# database connection, so the pool is sized to the request threads alone.
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'agri-assist-metrics'))
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+stream_threads = int(os.environ.get('EVENT_STREAMS_PER_WORKER', 24))
+threads = int(os.environ.get('GUNICORN_THREADS', 8)) + stream_threads
+
+
+def on_starting(server):
+    # Stale files from a previous master would otherwise be summed into the new counters.
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def post_fork(server, worker):
+    # Runs before the worker imports the app, so db_engine can size its pool to the request threads.
+    os.environ['GUNICORN_THREADS'] = str(max(server.cfg.threads - stream_threads, 1))
+    os.environ['EVENT_STREAMS_PER_WORKER'] = str(stream_threads)
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,116 @@
+import gzip
+import hashlib
+import time
+from flask import request, g, current_app, session
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+# Conditional GET and compression for dynamic responses.
+# Every 200 GET/HEAD response gets an ETag and answers If-None-Match with 304.
+# Bodies above COMPRESS_MIN_SIZE are compressed with brotli or gzip.
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'application/json',
+    'application/javascript', 'text/javascript', 'application/geo+json',
+    'application/x-ndjson', 'image/svg+xml',
+}
+
+# Default for anything without an explicit policy: browsers may keep a copy but
+# must revalidate, and shared proxies must never store per-user pages.
+DEFAULT_CACHE_CONTROL = {'private': True, 'no_cache': True}
+
+
+def cache_control(**directives):
+    """
+    Declares the Cache-Control policy for a view, e.g. @cache_control(private=True, max_age=300).
+    Place it below @login_required so the attribute is carried onto the wrapper.
+    """
+    def decorator(view):
+        view._cache_control = directives
+        return view
+    return decorator
+
+
+def _view_cache_policy():
+    view = current_app.view_functions.get(request.endpoint) if request.endpoint else None
+    return getattr(view, '_cache_control', DEFAULT_CACHE_CONTROL)
+
+
+def _etag_source(response):
+    """
+    Body bytes used for the ETag. The signed CSRF token changes on every render, so it is
+    replaced by the raw session token plus a time bucket. A revalidated page then keeps a
+    token that is at most half of WTF_CSRF_TIME_LIMIT old.
+    """
+    body = response.get_data()
+    signed_token = g.get('csrf_token')
+    if signed_token and response.mimetype == 'text/html':
+        time_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT') or 3600
+        bucket = int(time.time() // max(time_limit // 2, 1))
+        raw_token = session.get(current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token'), '')
+        # A different session (new login, expiry, rotation) must not match, or the
+        # browser would keep a page holding a token the new session rejects.
+        session_part = hashlib.sha1(str(raw_token).encode()).hexdigest()[:16]
+        body = body.replace(signed_token.encode(), f"csrf:{session_part}:{bucket}".encode())
+    return body
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(data, encoding):
+    level = current_app.config.get('COMPRESS_LEVEL', 6)
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=min(level, 9))
+
+
+def apply_http_caching(response):
+    """after_request hook: Cache-Control, ETag/304 and compression for dynamic responses."""
+    if response.direct_passthrough or response.is_streamed:
+        return response
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+        return response
+
+    if 'Cache-Control' not in response.headers:
+        for directive, value in _view_cache_policy().items():
+            setattr(response.cache_control, directive, value)
+
+    if response.get_etag() == (None, None):
+        weak = response.mimetype == 'text/html'
+        response.set_etag(hashlib.sha1(_etag_source(response)).hexdigest(), weak=weak)
+    response.make_conditional(request)
+    if response.status_code == 304:
+        return response
+
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers:
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.content_length is None or response.content_length < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+    encoding = _choose_encoding()
+    if not encoding:
+        return response
+
+    response.set_data(_compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    # Byte-level validators must differ per encoding; a weak tag is valid for all of them.
+    etag, _ = response.get_etag()
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.after_request(apply_http_caching)
@@ -0,0 +1,202 @@
+import hashlib
+import io
+import json
+import os
+import click
+from flask import current_app, url_for
+from flask.cli import AppGroup
+from markupsafe import Markup, escape
+from assets import DIST_DIRNAME
+
+# Responsive image derivatives.
+# `flask images build` writes AVIF/WebP copies of the large page images at several
+# widths into static/dist/images (served by the /assets/ route with immutable caching)
+# plus a manifest. Templates use picture() for <img> tags and responsive_background()
+# for CSS backgrounds; both fall back to the original file when no manifest exists.
+
+RESPONSIVE_IMAGES = ['login8.jpg', 'dashboard5.jpg', 'dashboard6.jpg', 'farm.jpg', 'voice.png']
+WIDTHS = (480, 960, 1440, 1920)
+FORMATS = (('avif', 'AVIF', {'quality': 50}), ('webp', 'WEBP', {'quality': 75, 'method': 6}))
+IMAGES_DIRNAME = 'images'
+MANIFEST_NAME = 'images.json'
+
+# Largest image painted above the fold on each page, used by the size report.
+PAGE_IMAGES = {
+    'home': ['farm.jpg', 'voice.png'],
+    'login': ['dashboard5.jpg'],
+    'register': ['login8.jpg'],
+    'verify_otp': ['login8.jpg'],
+}
+MOBILE_VIEWPORT = 480
+DESKTOP_VIEWPORT = 1440
+
+
+def build_images(static_folder, dist_folder):
+    """Generates every derivative and writes the manifest. Returns the manifest."""
+    try:
+        from PIL import Image, features
+    except ImportError:
+        raise click.ClickException("Pillow is required to build image derivatives: pip install Pillow")
+
+    manifest = {}
+    for name in RESPONSIVE_IMAGES:
+        source_path = os.path.join(static_folder, IMAGES_DIRNAME, name)
+        if not os.path.isfile(source_path):
+            continue
+        with Image.open(source_path) as original:
+            original.load()
+            width, height = original.size
+            entry = {'width': width, 'height': height, 'bytes': os.path.getsize(source_path), 'variants': {}}
+            widths = sorted({min(w, width) for w in WIDTHS})
+            stem = os.path.splitext(name)[0]
+            for fmt, pil_format, options in FORMATS:
+                if not features.check(fmt):
+                    continue
+                variants = []
+                for target_width in widths:
+                    target_height = round(height * target_width / width)
+                    resized = original if target_width == width else original.resize((target_width, target_height), Image.LANCZOS)
+                    buffer = io.BytesIO()
+                    resized.save(buffer, pil_format, **options)
+                    data = buffer.getvalue()
+                    digest = hashlib.sha256(data).hexdigest()[:10]
+                    filename = f"{IMAGES_DIRNAME}/{stem}-{target_width}.{digest}.{fmt}"
+                    target = os.path.join(dist_folder, filename)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    with open(target, 'wb') as fh:
+                        fh.write(data)
+                    variants.append({'width': target_width, 'file': filename, 'bytes': len(data)})
+                entry['variants'][fmt] = variants
+            manifest[name] = entry
+
+    with open(os.path.join(dist_folder, MANIFEST_NAME), 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(dist_folder):
+    try:
+        with open(os.path.join(dist_folder, MANIFEST_NAME), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _entry(name):
+    return current_app.extensions['image_manifest'].get(name)
+
+
+def _original_url(name):
+    return url_for('static', filename=f"{IMAGES_DIRNAME}/{name}")
+
+
+def _variant_url(variant):
+    return url_for('built_asset', filename=variant['file'])
+
+
+def _mimetype(name):
+    return 'image/png' if name.lower().endswith('.png') else 'image/jpeg'
+
+
+def picture(name, alt='', sizes='100vw', **attrs):
+    """Renders a <picture> with AVIF/WebP srcsets and the original image as the <img> fallback."""
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    attributes = ''.join(f' {key.rstrip("_").replace("_", "-")}="{escape(value)}"' for key, value in attrs.items())
+    entry = _entry(name)
+    img = f'<img src="{_original_url(name)}" alt="{escape(alt)}"{attributes}'
+    if not entry:
+        return Markup(img + '>')
+    img += f' width="{entry["width"]}" height="{entry["height"]}">'
+    sources = []
+    for fmt, variants in entry['variants'].items():
+        srcset = ', '.join(f"{_variant_url(v)} {v['width']}w" for v in variants)
+        sources.append(f'<source type="image/{fmt}" srcset="{srcset}" sizes="{escape(sizes)}">')
+    return Markup('<picture>' + ''.join(sources) + img + '</picture>')
+
+
+def responsive_background(selector, name):
+    """
+    CSS rules that swap a background image for the best format and a width that fits
+    the viewport. Emit it after the rule that sets the original background-image.
+    """
+    entry = _entry(name)
+    if not entry:
+        return Markup('')
+    widths = sorted({v['width'] for variants in entry['variants'].values() for v in variants})
+    rules = []
+    for index, width in enumerate(widths):
+        candidates = []
+        for fmt, variants in entry['variants'].items():
+            variant = next(v for v in variants if v['width'] == width)
+            candidates.append(f'url("{_variant_url(variant)}") type("image/{fmt}")')
+        candidates.append(f'url("{_original_url(name)}") type("{_mimetype(name)}")')
+        rule = f"{selector} {{ background-image: image-set({', '.join(candidates)}); }}"
+        if index == 0:
+            rules.append(rule)
+        else:
+            rules.append(f"@media (min-width: {widths[index - 1] + 1}px) {{ {rule} }}")
+    return Markup('\n'.join(rules))
+
+
+def page_report(manifest):
+    """Bytes of the above-the-fold images per page: original vs. best mobile/desktop variant."""
+    report = {}
+    for page, names in PAGE_IMAGES.items():
+        original = mobile = desktop = 0
+        for name in names:
+            entry = manifest.get(name)
+            if not entry:
+                continue
+            original += entry['bytes']
+            mobile += _best_variant_bytes(entry, MOBILE_VIEWPORT)
+            desktop += _best_variant_bytes(entry, DESKTOP_VIEWPORT)
+        report[page] = {'original': original, 'mobile': mobile, 'desktop': desktop}
+    return report
+
+
+def _best_variant_bytes(entry, viewport):
+    best = entry['bytes']
+    for variants in entry['variants'].values():
+        fitting = [v for v in variants if v['width'] >= viewport] or variants[-1:]
+        if fitting:
+            best = min(best, fitting[0]['bytes'])
+    return best
+
+
+images_cli = AppGroup('images', help='Build responsive image derivatives.')
+
+
+def _dist_folder():
+    return os.path.join(current_app.static_folder, DIST_DIRNAME)
+
+
+def _echo_report(manifest):
+    click.echo(f"{'page':<12} {'original':>10} {'mobile':>10} {'desktop':>10}")
+    for page, row in page_report(manifest).items():
+        saving = 100 * (1 - row['mobile'] / row['original']) if row['original'] else 0
+        click.echo(f"{page:<12} {row['original']:>10} {row['mobile']:>10} {row['desktop']:>10}   (-{saving:.0f}% on mobile)")
+
+
+@images_cli.command('build')
+def build_command():
+    """Writes AVIF/WebP derivatives at several widths and prints the per-page report."""
+    manifest = build_images(current_app.static_folder, _dist_folder())
+    click.echo(f"Built derivatives for {len(manifest)} images.")
+    _echo_report(manifest)
+
+
+@images_cli.command('report')
+def report_command():
+    """Prints the first-paint image payload per page from the existing manifest."""
+    manifest = load_manifest(_dist_folder())
+    if not manifest:
+        raise click.ClickException("No image manifest found; run 'flask images build' first.")
+    _echo_report(manifest)
+
+
+def init_app(app):
+    app.extensions['image_manifest'] = load_manifest(os.path.join(app.static_folder, DIST_DIRNAME))
+    app.jinja_env.globals['picture'] = picture
+    app.jinja_env.globals['responsive_background'] = responsive_background
+    app.cli.add_command(images_cli)
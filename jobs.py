@@ -0,0 +1,95 @@
+import os
+import queue
+import threading
+import time
+import logs
+
+# In-process worker pool for background jobs whose state lives in the database.
+# Web requests only insert a job row and call submit(); a handler thread picks the id
+# up. Threads are started on demand (up to max_threads, whenever more items are queued
+# than threads are waiting) and exit again after idle_timeout seconds without work,
+# keeping min_threads.
+# Idle threads periodically call `sweep()`, which returns ids of jobs that were never
+# dispatched (e.g. queued by a worker that was restarted) so they are picked up too.
+
+
+class ElasticPool:
+    def __init__(self, name, handler, min_threads=1, max_threads=8, idle_timeout=60.0, sweep=None, sweep_interval=10.0):
+        self.name = name
+        self.handler = handler
+        self.min_threads = min_threads
+        self.max_threads = max_threads
+        self.idle_timeout = idle_timeout
+        self.sweep = sweep
+        self.sweep_interval = sweep_interval
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = 0
+        self._idle = 0
+        self._pid = None
+        self._last_sweep = 0.0
+
+    def _reset_after_fork(self):
+        # Threads do not survive a fork; a forked worker starts with an empty pool.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._queue = queue.Queue()
+            self._threads = self._idle = 0
+
+    def start(self):
+        """Ensures the minimum number of threads is running in this process."""
+        with self._lock:
+            self._reset_after_fork()
+            while self._threads < self.min_threads:
+                self._spawn()
+
+    def submit(self, item):
+        with self._lock:
+            self._reset_after_fork()
+            self._queue.put(item)
+            # An idle thread counts as idle until it has dequeued, so compare against the
+            # backlog: a burst of submits must not all be left to the one waiting thread.
+            if self._queue.qsize() > self._idle and self._threads < self.max_threads:
+                self._spawn()
+
+    def stats(self):
+        return {'threads': self._threads, 'idle': self._idle, 'queued': self._queue.qsize()}
+
+    def _spawn(self):
+        self._threads += 1
+        threading.Thread(target=self._run, name=f'{self.name}-{self._threads}', daemon=True).start()
+
+    def _next_item(self):
+        """Waits for work; returns None when this thread should exit."""
+        idle_since = time.monotonic()
+        while True:
+            with self._lock:
+                self._idle += 1
+            try:
+                return self._queue.get(timeout=min(self.sweep_interval, self.idle_timeout))
+            except queue.Empty:
+                pass
+            finally:
+                with self._lock:
+                    self._idle -= 1
+            if self.sweep is not None and time.monotonic() - self._last_sweep >= self.sweep_interval:
+                self._last_sweep = time.monotonic()
+                try:
+                    for item in self.sweep():
+                        self._queue.put(item)
+                except Exception:
+                    logs.log.exception('Job sweep failed', extra={'pool': self.name})
+            with self._lock:
+                if self._queue.empty() and time.monotonic() - idle_since >= self.idle_timeout and self._threads > self.min_threads:
+                    self._threads -= 1
+                    return None
+
+    def _run(self):
+        while True:
+            item = self._next_item()
+            if item is None:
+                return
+            try:
+                self.handler(item)
+            except Exception:
+                logs.log.exception('Background job failed', extra={'pool': self.name, 'job': item})
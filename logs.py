@@ -0,0 +1,196 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, has_request_context, request
+
+# Non-blocking structured logging.
+# Request threads only put records on an in-memory queue; a single listener thread
+# formats them (JSON by default) and writes them to stderr, so a slow log pipe never
+# stalls a worker. Records carry the request id, user id and endpoint of the request
+# that produced them, and every request ends with one access record that includes its
+# database and upstream timings.
+#
+# Use logging.getLogger('agri') for application events and 'agri.upstream' for
+# third-party failures; the latter is rate-limited per message and service.
+
+log = logging.getLogger('agri')
+upstream_log = logging.getLogger('agri.upstream')
+access_log = logging.getLogger('agri.access')
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+def _user_id():
+    # Imported lazily: flask_login is only needed once a request is being handled.
+    from flask_login import current_user
+    try:
+        return current_user.get_id() if current_user.is_authenticated else None
+    except Exception:
+        return None
+
+
+class RequestContextFilter(logging.Filter):
+    """Copies request context onto the record while still on the request thread."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.user_id = _user_id()
+            record.endpoint = request.endpoint
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `limit` records per `period` seconds for each (message, service)
+    pair. The first record let through in a new window reports how many were dropped.
+    """
+
+    def __init__(self, limit, period=60.0):
+        super().__init__()
+        self.limit = limit
+        self.period = period
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not self.limit:
+            return True
+        key = (record.msg, getattr(record, 'service', None))
+        now = time.monotonic()
+        with self._lock:
+            started, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - started >= self.period:
+                started, count = now, 0
+            if count >= self.limit:
+                self._windows[key] = (started, count, suppressed + 1)
+                return False
+            self._windows[key] = (started, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, with the same extra fields appended."""
+
+    def format(self, record):
+        line = super().format(record)
+        extras = ' '.join(f'{k}={v}' for k, v in vars(record).items() if k not in _RESERVED and v is not None)
+        if extras:
+            line = f'{line} [{extras}]'
+        if record.exc_text and not record.exc_info:
+            line = f'{line}\n{record.exc_text}'
+        return line
+
+
+class _QueueHandler(QueueHandler):
+    # The stock prepare() flattens the record into one formatted string; keep the
+    # message, the extra fields and the traceback separate for the JSON formatter.
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _start_request():
+    incoming = request.headers.get(REQUEST_ID_HEADER, '')
+    g.request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+    g.log_started = time.perf_counter()
+
+
+def _finish_request(response):
+    response.headers.setdefault(REQUEST_ID_HEADER, g.get('request_id', ''))
+    started = g.pop('log_started', None)
+    if started is not None and request.endpoint not in ('static', 'built_asset', 'metrics'):
+        fields = {
+            'method': request.method, 'path': request.path, 'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+        if 'db_time' in g:
+            fields['db_ms'] = round(g.db_time * 1000, 1)
+        if g.get('upstream_timings'):
+            fields['upstream'] = g.upstream_timings
+        access_log.info('request', extra=fields)
+    return response
+
+
+class _Pipeline:
+    """Owns the queue, the request-side handler and the listener thread."""
+
+    def __init__(self, output):
+        self.output = output
+        self.queue = queue.SimpleQueue()
+        self.handler = _QueueHandler(self.queue)
+        self.handler.addFilter(RequestContextFilter())
+        self.listener = None
+
+    def start(self):
+        self.listener = QueueListener(self.queue, self.output, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def restart_in_child(self):
+        # A forked worker inherits the queue but not the listener thread.
+        self.queue = self.handler.queue = queue.SimpleQueue()
+        self.start()
+
+
+def init_app(app):
+    config = app.config
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JSONFormatter() if config.get('LOG_FORMAT', 'json') == 'json'
+                        else TextFormatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    pipeline = _Pipeline(output)
+    for handler in list(log.handlers):
+        log.removeHandler(handler)
+    log.addHandler(pipeline.handler)
+    log.setLevel(config.get('LOG_LEVEL', 'INFO'))
+    log.propagate = False
+    upstream_log.addFilter(RateLimitFilter(config.get('LOG_UPSTREAM_ERRORS_PER_MINUTE', 10)))
+    access_log.disabled = not config.get('LOG_REQUESTS', True)
+
+    pipeline.start()
+    atexit.register(pipeline.stop)
+    os.register_at_fork(after_in_child=pipeline.restart_in_child)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -0,0 +1,171 @@
+import hmac
+import ipaddress
+import os
+import time
+from contextlib import contextmanager
+from flask import Response, abort, current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+try:
+    import prometheus_client
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+except ImportError:  # Metrics are optional; every helper below becomes a no-op
+    prometheus_client = None
+
+# Prometheus metrics for routes, upstream APIs, the database and caches.
+# Under gunicorn, gunicorn.conf.py sets PROMETHEUS_MULTIPROC_DIR so every worker writes
+# to shared files and /metrics aggregates all of them, whichever worker serves it.
+
+UPSTREAM_SERVICES = ('open-meteo', 'archive', 'nominatim', 'mymemory', 'smtp')
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = Histogram(
+        'agri_http_request_duration_seconds', 'Time spent handling a request.',
+        ['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS)
+    REQUESTS_IN_FLIGHT = Gauge(
+        'agri_http_requests_in_flight', 'Requests currently being handled.', multiprocess_mode='livesum')
+    UPSTREAM_LATENCY = Histogram(
+        'agri_upstream_request_duration_seconds', 'Latency of calls to third-party services.',
+        ['service'], buckets=LATENCY_BUCKETS)
+    UPSTREAM_ERRORS = Counter(
+        'agri_upstream_errors_total', 'Failed calls to third-party services.', ['service', 'kind'])
+    DB_TIME = Histogram(
+        'agri_db_time_seconds', 'Total database time spent per request.', ['endpoint'], buckets=DB_BUCKETS)
+    DB_QUERIES = Counter(
+        'agri_db_queries_total', 'SQL statements executed.', ['endpoint'])
+    DB_ACQUIRE = Histogram(
+        'agri_db_connection_acquire_seconds', 'Time spent waiting for a pooled database connection.',
+        buckets=DB_BUCKETS)
+    CACHE_REQUESTS = Counter(
+        'agri_cache_requests_total', 'Cache lookups by outcome.', ['cache', 'result'])
+    SINGLEFLIGHT_CALLS = Counter(
+        'agri_singleflight_calls_total', 'Coalesced fetches by role (leader fetched, follower waited).',
+        ['name', 'role'])
+    EVENT_STREAMS = Gauge(
+        'agri_event_streams_open', 'Server-Sent Events streams currently connected.', multiprocess_mode='livesum')
+
+
+def _endpoint():
+    return request.endpoint or 'unmatched'
+
+
+@contextmanager
+def track_upstream(service):
+    """
+    Times a call to a third-party service and counts it as an error if it raises.
+    Inside a request the timing is also kept on g.upstream_timings for the access log.
+    """
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception as exc:
+        outcome = type(exc).__name__
+        if prometheus_client is not None:
+            UPSTREAM_ERRORS.labels(service, outcome).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        if prometheus_client is not None:
+            UPSTREAM_LATENCY.labels(service).observe(elapsed)
+        if has_request_context():
+            g.setdefault('upstream_timings', []).append(
+                {'service': service, 'ms': round(elapsed * 1000, 1), 'outcome': outcome})
+
+
+def record_db_acquire(seconds):
+    if prometheus_client is not None:
+        DB_ACQUIRE.observe(seconds)
+
+
+def record_cache(cache, hit):
+    if prometheus_client is not None:
+        CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def record_singleflight(name, role):
+    if prometheus_client is not None:
+        SINGLEFLIGHT_CALLS.labels(name, role).inc()
+
+
+def record_event_stream(delta):
+    if prometheus_client is not None:
+        EVENT_STREAMS.inc(delta)
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.db_time = 0.0
+    g.db_queries = 0
+    REQUESTS_IN_FLIGHT.inc()
+
+
+def _finish_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = _endpoint()
+        REQUEST_LATENCY.labels(endpoint, request.method, response.status_code).observe(time.perf_counter() - started)
+        DB_TIME.labels(endpoint).observe(g.get('db_time', 0.0))
+        if g.get('db_queries'):
+            DB_QUERIES.labels(endpoint).inc(g.db_queries)
+        REQUESTS_IN_FLIGHT.dec()
+    return response
+
+
+def _abandon_request(exc):
+    # after_request is skipped when a view raises; keep the in-flight gauge honest.
+    if g.pop('request_started', None) is not None:
+        REQUESTS_IN_FLIGHT.dec()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    if has_app_context() and 'db_time' in g:
+        g.db_time += time.perf_counter() - started
+        g.db_queries += 1
+
+
+def _is_local_request():
+    # A reverse proxy on the same host connects from loopback too, but adds a forwarding header.
+    if request.headers.get('X-Forwarded-For') or request.headers.get('Forwarded'):
+        return False
+    try:
+        return ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+
+def metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        # Bytes, since compare_digest raises TypeError on str with non-ASCII characters.
+        supplied = request.headers.get('Authorization', '').encode('utf-8')
+        if not hmac.compare_digest(supplied, f'Bearer {token}'.encode('utf-8')):
+            abort(401)
+    elif not _is_local_request():
+        # Without a token the per-endpoint and per-user series are only served to the host itself.
+        abort(403)
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app, db):
+    if prometheus_client is None:
+        return
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_abandon_request)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
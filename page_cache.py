@@ -0,0 +1,84 @@
+import functools
+import hashlib
+import os
+from flask import current_app, g, request, session
+from flask_babel import get_locale
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+import assets
+import cache
+import images
+
+# Full-page cache for pages whose anonymous rendering depends only on the locale.
+# @cached_page views are rendered once per (path, locale, deploy) for anonymous GETs
+# without pending flash messages and without a query string. The signed CSRF token in
+# the stored HTML is swapped for a placeholder, and a hit only puts this request's
+# token back with a single bytes replace, skipping Jinja completely.
+#
+# Entries are keyed by a deploy id (DEPLOY_ID, else a fingerprint of the templates,
+# compiled translations and the asset and image manifests), so a deploy never serves
+# pages from the previous release, including pages that link to its hashed bundles.
+
+CSRF_PLACEHOLDER = '__PAGE_CACHE_CSRF_TOKEN__'
+
+pages = cache.Namespace('page', ttl=3600, maxsize=64)
+_deploy_id = None
+
+
+def deploy_fingerprint(app):
+    """Hash of every template, compiled catalogue and build manifest, for setups without a DEPLOY_ID."""
+    digest = hashlib.sha1()
+    roots = [os.path.join(app.root_path, app.template_folder or 'templates'),
+             os.path.join(app.root_path, 'translations')]
+    for root in roots:
+        for directory, _dirs, files in sorted(os.walk(root)):
+            for name in sorted(files):
+                if name.endswith(('.html', '.mo')):
+                    with open(os.path.join(directory, name), 'rb') as fh:
+                        digest.update(name.encode())
+                        digest.update(fh.read())
+    # Pages embed hashed asset URLs, so a JS/CSS-only deploy must change the id as well.
+    dist_folder = os.path.join(app.static_folder, assets.DIST_DIRNAME)
+    for name in (assets.MANIFEST_NAME, images.MANIFEST_NAME):
+        try:
+            with open(os.path.join(dist_folder, name), 'rb') as fh:
+                digest.update(name.encode())
+                digest.update(fh.read())
+        except OSError:
+            pass  # Not built (development); templates fall back to plain /static URLs
+    return digest.hexdigest()[:12]
+
+
+def _cacheable():
+    return (current_app.config.get('PAGE_CACHE', True)
+            and request.method in ('GET', 'HEAD')
+            and not request.query_string
+            and not current_user.is_authenticated
+            and not session.get('_flashes'))
+
+
+def cached_page(view):
+    """Serves a stored anonymous rendering of the view when the request allows it."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _cacheable():
+            return view(*args, **kwargs)
+        key = f'{_deploy_id}:{get_locale()}:{request.path}'
+        stored = pages.get(key)
+        if stored is not None:
+            return current_app.response_class(
+                stored.replace(CSRF_PLACEHOLDER, generate_csrf()), mimetype='text/html')
+
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code == 200 and response.mimetype == 'text/html' and not response.is_streamed:
+            body = response.get_data(as_text=True)
+            token = g.get('csrf_token')
+            pages.set(key, body.replace(token, CSRF_PLACEHOLDER) if token else body,
+                      ttl=current_app.config.get('PAGE_CACHE_TTL'))
+        return response
+    return wrapper
+
+
+def init_app(app):
+    global _deploy_id
+    _deploy_id = app.config.get('DEPLOY_ID') or deploy_fingerprint(app)
@@ -0,0 +1,209 @@
+import glob
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+import click
+from flask import current_app, g, request
+from flask.cli import AppGroup
+
+# On-demand sampling profiler for individual requests.
+# A profiled request gets a helper thread that snapshots the request thread's stack every
+# PROFILE_INTERVAL_MS via sys._current_frames() and, once the response is done, writes a
+# collapsed-stack (flamegraph.pl / speedscope compatible) or speedscope JSON file named
+# <endpoint>.<locale>.<timestamp>.<pid>.<unique>.<ext> into PROFILE_DIR.
+#
+# A request is profiled when any of these hold:
+#   PROFILE_ALL=1                         every request (local debugging)
+#   PROFILE_SAMPLE_RATE=0.01              that fraction of requests
+#   X-Profile: <PROFILE_TOKEN>            forced by an authenticated client
+# PROFILE_ENDPOINTS=advisories,api_predict_yield limits sampling to those endpoints.
+# With none of the switches set no hooks are registered, so the cost is zero.
+
+DEFAULT_INTERVAL_MS = 5
+FORMATS = {'collapsed': 'collapsed', 'speedscope': 'speedscope.json'}
+
+
+class Sampler:
+    """Collects stack samples of one thread until stopped."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, frame.f_lineno))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[tuple(stack)] += 1
+
+
+def _frame_label(frame):
+    name, filename, line = frame
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def to_collapsed(samples):
+    return ''.join(f"{';'.join(_frame_label(f) for f in stack)} {count}\n" for stack, count in samples.items())
+
+
+def to_speedscope(samples, name, interval_ms):
+    frames, index = [], {}
+    profile_samples, weights = [], []
+    for stack, count in samples.items():
+        ids = []
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+            ids.append(index[frame])
+        profile_samples.append(ids)
+        weights.append(count * interval_ms)
+    return json.dumps({
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled', 'name': name, 'unit': 'milliseconds',
+            'startValue': 0, 'endValue': sum(weights),
+            'samples': profile_samples, 'weights': weights,
+        }],
+    })
+
+
+def _forced():
+    token = current_app.config.get('PROFILE_TOKEN')
+    header = request.headers.get('X-Profile')
+    return bool(token and header and hmac.compare_digest(header, token))
+
+
+def _should_profile():
+    if _forced() or current_app.config.get('PROFILE_ALL'):
+        return True
+    endpoints = current_app.config.get('PROFILE_ENDPOINTS')
+    if endpoints and request.endpoint not in endpoints:
+        return False
+    rate = current_app.config.get('PROFILE_SAMPLE_RATE') or 0.0
+    return rate > 0 and random.random() < rate
+
+
+def _start_profile():
+    if _should_profile():
+        interval = current_app.config.get('PROFILE_INTERVAL_MS') or DEFAULT_INTERVAL_MS
+        g.profiler = Sampler(threading.get_ident(), interval / 1000.0).start()
+
+
+def _profile_name():
+    # The locale is only known once the app's own before_request has run, so name lazily.
+    if 'profile_name' not in g:
+        locale = g.get('language') or current_app.config.get('BABEL_DEFAULT_LOCALE', 'en')
+        # The random part keeps threads that profile the same endpoint in the same second apart.
+        g.profile_name = '{}.{}.{}.{}.{}'.format(
+            request.endpoint or 'unmatched', locale, time.strftime('%Y%m%dT%H%M%S'), os.getpid(), uuid.uuid4().hex[:8])
+    return g.profile_name
+
+
+def _tag_response(response):
+    # Tell a forced caller which file to look for.
+    if g.get('profiler') is not None:
+        response.headers['X-Profile-File'] = _profile_name()
+    return response
+
+
+def _finish_profile(exc):
+    sampler = g.pop('profiler', None)
+    if sampler is None:
+        return
+    sampler.stop()
+    name = _profile_name()
+    fmt = current_app.config.get('PROFILE_FORMAT', 'collapsed')
+    interval_ms = sampler.interval * 1000
+    if fmt == 'speedscope':
+        body = to_speedscope(sampler.samples, f"{request.method} {request.path}", interval_ms)
+    else:
+        body = to_collapsed(sampler.samples)
+    profile_dir = current_app.config['PROFILE_DIR']
+    try:
+        os.makedirs(profile_dir, exist_ok=True)
+        with open(os.path.join(profile_dir, f"{name}.{FORMATS.get(fmt, 'collapsed')}"), 'w') as fh:
+            fh.write(body)
+    except OSError as e:
+        current_app.logger.warning("Could not write profile %s: %s", name, e)
+
+
+def merge_collapsed(profile_dir, endpoint, locale=None):
+    """Sums every collapsed profile for an endpoint (optionally one locale) into one Counter."""
+    pattern = f"{endpoint}.{locale or '*'}.*.collapsed"
+    merged = Counter()
+    for path in glob.glob(os.path.join(profile_dir, pattern)):
+        if path.endswith('.merged.collapsed'):
+            continue
+        with open(path) as fh:
+            for line in fh:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack and count.isdigit():
+                    merged[stack] += int(count)
+    return merged
+
+
+profile_cli = AppGroup('profile', help='Inspect sampling profiler output.')
+
+
+@profile_cli.command('merge')
+@click.argument('endpoint')
+@click.option('--locale', default=None, help='Only merge profiles recorded for this locale.')
+@click.option('--top', default=15, show_default=True, help='Leaf frames to print.')
+def merge_command(endpoint, locale, top):
+    """Combine per-request profiles into <endpoint>.<locale|all>.merged.collapsed."""
+    profile_dir = current_app.config['PROFILE_DIR']
+    merged = merge_collapsed(profile_dir, endpoint, locale)
+    if not merged:
+        click.echo(f"No collapsed profiles for '{endpoint}' in {profile_dir}.")
+        return
+    out_path = os.path.join(profile_dir, f"{endpoint}.{locale or 'all'}.merged.collapsed")
+    with open(out_path, 'w') as fh:
+        fh.writelines(f"{stack} {count}\n" for stack, count in merged.items())
+    total = sum(merged.values())
+    leaves = Counter()
+    for stack, count in merged.items():
+        leaves[stack.rsplit(';', 1)[-1]] += count
+    click.echo(f"{total} samples -> {out_path}")
+    for frame, count in leaves.most_common(top):
+        click.echo(f"{count / total:7.1%}  {frame}")
+
+
+def enabled(config):
+    return bool(config.get('PROFILE_ALL') or config.get('PROFILE_SAMPLE_RATE') or config.get('PROFILE_TOKEN'))
+
+
+def init_app(app):
+    app.cli.add_command(profile_cli)
+    if not enabled(app.config):
+        return
+    app.before_request(_start_profile)
+    app.after_request(_tag_response)
+    app.teardown_request(_finish_profile)
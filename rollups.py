@@ -0,0 +1,67 @@
+import math
+from sqlalchemy import case
+
+# Incrementally maintained aggregates.
+# Each rollup row holds count/sum/min/max for one key and is updated with a single
+# INSERT ... ON CONFLICT DO UPDATE per new value, so concurrent writers never lose an
+# update and reads never need GROUP BY. Percentiles come from a log-bucket histogram
+# (one row per non-empty bucket): bucket i covers (GAMMA**(i-1), GAMMA**i], so any
+# percentile is reported within RELATIVE_ACCURACY of the true value.
+
+RELATIVE_ACCURACY = 0.02
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+MIN_VALUE = 1e-3
+ALL = '*'  # Wildcard key part for the "all states" / "all seasons" rollups
+
+
+def bucket_for(value):
+    return math.ceil(math.log(max(value, MIN_VALUE)) / _LOG_GAMMA)
+
+
+def bucket_value(bucket):
+    """Representative value of a bucket (the midpoint that bounds the relative error)."""
+    return 2 * GAMMA ** bucket / (GAMMA + 1)
+
+
+def percentile(buckets, q):
+    """q in [0, 1] over {bucket: count}; None when empty."""
+    total = sum(buckets.values())
+    if not total:
+        return None
+    rank, seen = q * (total - 1), 0
+    for bucket in sorted(buckets):
+        seen += buckets[bucket]
+        if seen > rank:
+            return bucket_value(bucket)
+    return bucket_value(max(buckets))
+
+
+def percent_rank(buckets, value):
+    """Share of recorded values at or below `value`, as a percentage."""
+    total = sum(buckets.values())
+    if not total:
+        return None
+    target = bucket_for(value)
+    below = sum(count for bucket, count in buckets.items() if bucket <= target)
+    return round(100.0 * below / total, 1)
+
+
+def upsert(session, table, keys, values, increments=(), minimums=(), maximums=()):
+    """
+    Inserts keys+values, or on a key conflict adds `increments`, and keeps the lower of
+    `minimums` / the higher of `maximums`. Works on PostgreSQL and SQLite.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"upsert is not implemented for {dialect}")
+    statement = insert(table).values(**keys, **values)
+    excluded = statement.excluded
+    updates = {name: table.c[name] + excluded[name] for name in increments}
+    updates.update({name: case((excluded[name] < table.c[name], excluded[name]), else_=table.c[name]) for name in minimums})
+    updates.update({name: case((excluded[name] > table.c[name], excluded[name]), else_=table.c[name]) for name in maximums})
+    session.execute(statement.on_conflict_do_update(index_elements=list(keys), set_=updates))
@@ -0,0 +1,348 @@
+import hashlib
+import os
+import secrets
+import sqlite3
+import struct
+import threading
+import time
+from datetime import datetime
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSessionInterface, SessionInterface, SessionMixin
+from itsdangerous import BadSignature
+from sqlalchemy import Column, DateTime, LargeBinary, String, Table, delete, insert, select, update
+from werkzeug.datastructures import CallbackDict
+import cache
+import logs
+
+try:
+    import msgspec
+except ImportError:  # Sessions fall back to Flask's tagged JSON
+    msgspec = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Server-side sessions: the cookie holds only a random session id and the data lives in
+# a store chosen by SESSION_STORE:
+#   database                     a server_session table in the app database (default)
+#   redis://host:6379/0          a Redis-protocol server, expiring entries natively
+#   sqlite:///path/sessions.db   a WAL-mode SQLite file, for single-host setups
+#   cookie                       Flask's signed cookie sessions, as before
+# Data is packed with msgpack (msgspec), or tagged JSON for values msgpack cannot hold.
+# A request writes to the store only when the data changed or the expiry is more than
+# SESSION_TOUCH_SECONDS old, so the sliding expiry does not cost a write per request.
+# The id changes whenever the signed-in user does, and stores are keyed by a hash of
+# it, so neither a fixed id nor a leaked store can be used to take over a session.
+# Expired rows are deleted in batches by a background sweeper; one worker sweeps at a
+# time, coordinated through the shared cache lock. Requests for skip_endpoints (static
+# files) never touch the store, and an anonymous session holding nothing but its flags
+# and the CSRF token (every page renders one) lives in a signed cookie
+# instead, so cookie-less crawlers cost no store write. It moves to the store as soon
+# as it holds anything else, such as a signed-in user or a flash message.
+
+SWEEP_LOCK_TTL = 60
+_FORMAT_MSGPACK, _FORMAT_JSON = b'm', b'j'
+_COOKIE_PREFIX = 'c.'  # Marks a cookie holding signed data; store ids never contain a dot
+_tagged_json = TaggedJSONSerializer()
+
+
+def dumps(data):
+    if msgspec is not None:
+        try:
+            return _FORMAT_MSGPACK + msgspec.msgpack.encode(data)
+        except TypeError:
+            pass  # e.g. a datetime or bytes value; tagged JSON round-trips those
+    return _FORMAT_JSON + _tagged_json.dumps(data).encode('utf-8')
+
+
+def loads(raw):
+    raw = bytes(raw)
+    if raw[:1] == _FORMAT_MSGPACK:
+        return msgspec.msgpack.decode(raw[1:])
+    return _tagged_json.loads(raw[1:].decode('utf-8'))
+
+
+def _store_key(sid):
+    return hashlib.sha256(sid.encode('ascii')).hexdigest()
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, raw=None, expires=None, issued=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.raw = raw            # Stored bytes, to skip writes that would not change anything
+        self.expires = expires    # Epoch seconds of the stored copy
+        self.issued = issued      # Epoch seconds the signed cookie was issued, for cookie-held sessions
+        self.cookie_data = dict(self) if issued is not None else None
+        self.user_id = self.get('_user_id')
+        self.modified = False
+
+
+class DatabaseStore:
+    """Sessions in the application database, shared by every worker and host."""
+    name = 'database'
+
+    def __init__(self, engine, metadata):
+        self.engine = engine
+        self.table = Table(
+            'server_session', metadata,
+            Column('id', String(64), primary_key=True),
+            Column('data', LargeBinary, nullable=False),
+            Column('expires', DateTime, nullable=False, index=True),
+            extend_existing=True,
+        )
+
+    def load(self, key):
+        with self.engine.connect() as connection:
+            row = connection.execute(
+                select(self.table.c.data, self.table.c.expires).where(self.table.c.id == key)).first()
+        if row is None:
+            return None
+        return row.data, (row.expires - datetime(1970, 1, 1)).total_seconds()
+
+    def save(self, key, data, expires):
+        expires_at = datetime.utcfromtimestamp(expires)
+        with self.engine.begin() as connection:
+            updated = connection.execute(
+                update(self.table).where(self.table.c.id == key).values(data=data, expires=expires_at)).rowcount
+            if not updated:
+                connection.execute(insert(self.table).values(id=key, data=data, expires=expires_at))
+
+    def delete(self, key):
+        with self.engine.begin() as connection:
+            connection.execute(delete(self.table).where(self.table.c.id == key))
+
+    def sweep(self, batch_size):
+        expired = select(self.table.c.id).where(self.table.c.expires < datetime.utcnow()).limit(batch_size)
+        with self.engine.begin() as connection:
+            return connection.execute(delete(self.table).where(self.table.c.id.in_(expired.scalar_subquery()))).rowcount
+
+
+class SQLiteStore:
+    """Sessions in a local WAL-mode SQLite file (one connection per thread and process)."""
+    name = 'sqlite'
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = self._connection()
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS session (id TEXT PRIMARY KEY, data BLOB NOT NULL, expires REAL NOT NULL)')
+        connection.execute('CREATE INDEX IF NOT EXISTS session_expires ON session (expires)')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def load(self, key):
+        return self._connection().execute('SELECT data, expires FROM session WHERE id = ?', (key,)).fetchone()
+
+    def save(self, key, data, expires):
+        self._connection().execute('INSERT OR REPLACE INTO session (id, data, expires) VALUES (?, ?, ?)', (key, data, expires))
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM session WHERE id = ?', (key,))
+
+    def sweep(self, batch_size):
+        return self._connection().execute(
+            'DELETE FROM session WHERE id IN (SELECT id FROM session WHERE expires < ? LIMIT ?)',
+            (time.time(), batch_size)).rowcount
+
+
+class RedisStore:
+    """Sessions in Redis; entries expire by themselves, so there is nothing to sweep."""
+    name = 'redis'
+
+    def __init__(self, url, prefix):
+        if redis is None:
+            raise RuntimeError('SESSION_STORE points at Redis but the redis package is not installed.')
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.prefix = prefix
+
+    def load(self, key):
+        raw = self.client.get(f'{self.prefix}:session:{key}')
+        if raw is None:
+            return None
+        return raw[8:], struct.unpack('!d', raw[:8])[0]
+
+    def save(self, key, data, expires):
+        ttl = max(int(expires - time.time()), 1)
+        self.client.set(f'{self.prefix}:session:{key}', struct.pack('!d', expires) + data, ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(f'{self.prefix}:session:{key}')
+
+    def sweep(self, batch_size):
+        return 0
+
+
+def store_from_config(app, db):
+    url = app.config.get('SESSION_STORE') or 'database'
+    if url == 'cookie':
+        return None
+    if url == 'database':
+        # The table joins the app's metadata, so db.create_all() creates it with the others.
+        with app.app_context():
+            return DatabaseStore(db.engine, db.metadata)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisStore(url, app.config.get('CACHE_PREFIX', 'agri'))
+    if url.startswith('sqlite:///'):
+        return SQLiteStore(url[len('sqlite:///'):])
+    raise ValueError(f'Unsupported SESSION_STORE: {url}')
+
+
+def sweep_expired(store, batch_size, pause=0.05):
+    """Deletes expired sessions in batches of batch_size until none are left. Returns the number removed."""
+    removed = 0
+    while True:
+        deleted = store.sweep(batch_size)
+        removed += deleted
+        if deleted < batch_size:
+            return removed
+        time.sleep(pause)  # Let request writes in between the batches
+
+
+def _is_empty(session):
+    return all(key == '_permanent' for key in session)
+
+
+def _fits_cookie(session, csrf_field):
+    # Flask-Login marks anonymous sessions `_fresh: False`; that flag is no reason to store them.
+    return all(key in ('_permanent', '_fresh', csrf_field) for key in session)
+
+
+class ServerSessionInterface(SessionInterface):
+    def __init__(self, store, touch_seconds=60, sweep_seconds=300, sweep_batch=1000, skip_endpoints=()):
+        self.store = store
+        self.skip_endpoints = skip_endpoints
+        self.touch_seconds = touch_seconds
+        self.sweep_seconds = sweep_seconds
+        self.sweep_batch = sweep_batch
+        self._sweeper_pid = None
+
+    def _ensure_sweeper(self):
+        if not self.sweep_seconds or self._sweeper_pid == os.getpid():
+            return
+        self._sweeper_pid = os.getpid()
+        threading.Thread(target=self._sweep_loop, name='session-sweeper', daemon=True).start()
+
+    def _sweep_loop(self):
+        while True:
+            # Jitter so the workers of one server do not all wake at the same moment.
+            time.sleep(self.sweep_seconds * (0.75 + secrets.randbelow(500) / 1000))
+            token = cache.acquire_lock('session-sweep', SWEEP_LOCK_TTL)
+            if token is None:
+                continue
+            try:
+                removed = sweep_expired(self.store, self.sweep_batch)
+                if removed:
+                    logs.log.info('Expired sessions swept', extra={'store': self.store.name, 'removed': removed})
+            except Exception:
+                logs.log.exception('Session sweep failed', extra={'store': self.store.name})
+            finally:
+                cache.release_lock('session-sweep', token)
+
+    def open_session(self, app, request):
+        self._ensure_sweeper()
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and sid.startswith(_COOKIE_PREFIX):
+            try:
+                data, issued = self._cookie_serializer(app).loads(
+                    sid[len(_COOKIE_PREFIX):], max_age=app.permanent_session_lifetime.total_seconds(),
+                    return_timestamp=True)
+                return ServerSession(data, issued=issued.timestamp())
+            except BadSignature:
+                return ServerSession(sid=None)
+        if sid and request.endpoint not in self.skip_endpoints:
+            try:
+                stored = self.store.load(_store_key(sid))
+            except Exception as e:
+                logs.log.warning('Session load failed', extra={'store': self.store.name, 'error': str(e)})
+                stored = None
+            if stored is not None and stored[1] > time.time():
+                try:
+                    return ServerSession(loads(stored[0]), sid=sid, raw=bytes(stored[0]), expires=stored[1])
+                except Exception:
+                    logs.log.warning('Unreadable session discarded', extra={'store': self.store.name})
+        # Never adopt an id the client made up; a new session always gets a fresh one.
+        return ServerSession(sid=None)
+
+    def save_session(self, app, session, response):
+        name, domain, path = self.get_cookie_name(app), self.get_cookie_domain(app), self.get_cookie_path(app)
+        if session.sid is not None or session.issued is not None:
+            response.vary.add('Cookie')
+        if _is_empty(session):
+            if session.sid is not None:
+                self._delete(session.sid)
+            if session.sid is not None or session.issued is not None:
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app), httponly=self.get_cookie_httponly(app))
+            return
+        if session.sid is not None and session.get('_user_id') != session.user_id:
+            # Signing in or out: move the data to a new id so the old one is useless.
+            self._delete(session.sid)
+            session.sid = None
+        if session.sid is None and _fits_cookie(session, app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token')):
+            self._save_in_cookie(app, session, response)
+            return
+        data = dumps(dict(session))
+        now = time.time()
+        if (session.sid is not None and data == session.raw
+                and session.expires - now > app.permanent_session_lifetime.total_seconds() - self.touch_seconds):
+            return
+        sid = session.sid or secrets.token_urlsafe(32)
+        expires = now + app.permanent_session_lifetime.total_seconds()
+        try:
+            self.store.save(_store_key(sid), data, expires)
+        except Exception as e:
+            logs.log.warning('Session save failed', extra={'store': self.store.name, 'error': str(e)})
+            return
+        session.sid, session.raw, session.expires = sid, data, expires
+        response.set_cookie(
+            name, sid, expires=self.get_expiration_time(app, session), domain=domain, path=path,
+            secure=self.get_cookie_secure(app), httponly=self.get_cookie_httponly(app),
+            samesite=self.get_cookie_samesite(app))
+
+    def _cookie_serializer(self, app):
+        return SecureCookieSessionInterface().get_signing_serializer(app)
+
+    def _save_in_cookie(self, app, session, response):
+        """Keeps a session the store does not need (see _fits_cookie) in a signed cookie."""
+        if (session.issued is not None and dict(session) == session.cookie_data
+                and time.time() - session.issued < self.touch_seconds):
+            return
+        value = _COOKIE_PREFIX + self._cookie_serializer(app).dumps(dict(session))
+        response.vary.add('Cookie')
+        response.set_cookie(
+            self.get_cookie_name(app), value, expires=self.get_expiration_time(app, session),
+            domain=self.get_cookie_domain(app), path=self.get_cookie_path(app),
+            secure=self.get_cookie_secure(app), httponly=self.get_cookie_httponly(app),
+            samesite=self.get_cookie_samesite(app))
+
+    def _delete(self, sid):
+        try:
+            self.store.delete(_store_key(sid))
+        except Exception as e:
+            logs.log.warning('Session delete failed', extra={'store': self.store.name, 'error': str(e)})
+
+
+def init_app(app, db, skip_endpoints=()):
+    store = store_from_config(app, db)
+    if store is None:
+        app.session_interface = SecureCookieSessionInterface()
+        return None
+    app.session_interface = ServerSessionInterface(
+        store, touch_seconds=app.config.get('SESSION_TOUCH_SECONDS', 60),
+        sweep_seconds=app.config.get('SESSION_SWEEP_SECONDS', 300),
+        sweep_batch=app.config.get('SESSION_SWEEP_BATCH', 1000),
+        skip_endpoints=skip_endpoints)
+    return store
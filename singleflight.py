@@ -0,0 +1,101 @@
+import threading
+import time
+import metrics
+
+# Request coalescing for identical concurrent upstream calls.
+# Group.do(key, fn) lets one caller per key run fn while every other caller of the same
+# key waits for that result (or exception) instead of issuing its own request. Inside a
+# worker this uses an in-memory table of in-flight calls. With shared locks enabled
+# (SINGLEFLIGHT_SHARED, see cache.init_app) the leader also takes a lock in the shared
+# cache, and leaders in other workers poll `recheck` until the value appears. They
+# fetch it themselves if the lock expires or WAIT_TIMEOUT passes.
+
+WAIT_TIMEOUT = 15.0   # Longer than upstream.DEFAULT_TIMEOUT, so a slow leader is still waited for
+LOCK_TTL = 15
+_POLL_START, _POLL_MAX = 0.02, 0.25
+
+_shared_locks = None  # (acquire(name, ttl) -> token | None, release(name, token)) when enabled
+
+
+def use_shared_locks(acquire, release):
+    global _shared_locks
+    _shared_locks = (acquire, release) if acquire and release else None
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Group:
+    """One table of in-flight calls; `name` labels the metrics and the shared lock keys."""
+
+    def __init__(self, name, wait_timeout=WAIT_TIMEOUT, lock_ttl=LOCK_TTL):
+        self.name = name
+        self.wait_timeout = wait_timeout
+        self.lock_ttl = lock_ttl
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, recheck=None):
+        """
+        Runs fn() once for all concurrent callers with the same key and returns its result.
+        `recheck()` returns the value if some other worker already produced it, else None.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            metrics.record_singleflight(self.name, 'follower')
+            if not call.done.wait(self.wait_timeout):
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.record_singleflight(self.name, 'leader')
+        try:
+            call.result = self._run_leader(key, fn, recheck)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _run_leader(self, key, fn, recheck):
+        if _shared_locks is None:
+            return fn()
+        acquire, release = _shared_locks
+        lock_name = f'{self.name}:{key}'
+        deadline = time.monotonic() + self.wait_timeout
+        delay = _POLL_START
+        token = acquire(lock_name, self.lock_ttl)
+        while token is None and time.monotonic() < deadline:
+            # Another worker is fetching this key; wait for its result to land.
+            time.sleep(delay)
+            delay = min(delay * 2, _POLL_MAX)
+            if recheck is not None:
+                value = recheck()
+                if value is not None:
+                    metrics.record_singleflight(self.name, 'remote')
+                    return value
+            token = acquire(lock_name, self.lock_ttl)
+        try:
+            if token is not None and recheck is not None:
+                # The previous holder may have finished between our last poll and the lock.
+                value = recheck()
+                if value is not None:
+                    return value
+            return fn()
+        finally:
+            if token is not None:
+                release(lock_name, token)
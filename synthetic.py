@@ -0,0 +1,303 @@
+import hashlib
+import io
+import json
+import math
+import random
+import time
+import unicodedata
+from datetime import timedelta
+import geo
+
+# Synthetic data for testing query plans and indexes at production scale
+# (`flask synthetic generate`). Rows are produced by seeded generators, so the same
+# seed against the same starting database yields the same rows, and they are written
+# with the fastest path the database offers:
+#   postgresql   COPY ... FROM STDIN in text format, one COPY per batch
+#   other        DBAPI executemany, one transaction per batch
+# Ids are assigned here, continuing after the current maximum, so child rows can point
+# at parents without reading them back; Postgres sequences are moved past them after.
+#
+# Farms cluster around agricultural districts with a Gaussian spread, have lognormal
+# areas around India's ~1.1 ha median holding and a slightly irregular, rotated
+# quadrilateral boundary of that area. Advisories reuse a pool of rule payloads and are
+# skewed towards lower farm ids, so some farms have far more rows than others, as in
+# production.
+
+PAYLOAD_POOL_SIZE = 512
+ADVISORY_SKEW = 2.0       # Exponent on the farm pick; 1.0 is uniform
+FARM_SPREAD_KM = 35.0
+INDIA_BOUNDS = (6.8, 68.2, 35.5, 97.4)  # min_lat, min_lon, max_lat, max_lon
+_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# (district, state, latitude, longitude, relative weight)
+REGIONS = [
+    ('Ludhiana', 'Punjab', 30.90, 75.85, 6),
+    ('Karnal', 'Haryana', 29.69, 76.99, 4),
+    ('Meerut', 'Uttar Pradesh', 28.98, 77.71, 6),
+    ('Gorakhpur', 'Uttar Pradesh', 26.76, 83.37, 7),
+    ('Patna', 'Bihar', 25.59, 85.14, 7),
+    ('Purba Bardhaman', 'West Bengal', 23.23, 87.86, 6),
+    ('Sambalpur', 'Odisha', 21.47, 83.97, 3),
+    ('Raipur', 'Chhattisgarh', 21.25, 81.63, 3),
+    ('Indore', 'Madhya Pradesh', 22.72, 75.86, 5),
+    ('Jaipur', 'Rajasthan', 26.91, 75.79, 4),
+    ('Rajkot', 'Gujarat', 22.30, 70.80, 4),
+    ('Nashik', 'Maharashtra', 19.99, 73.79, 5),
+    ('Nagpur', 'Maharashtra', 21.15, 79.09, 4),
+    ('Guntur', 'Andhra Pradesh', 16.31, 80.44, 5),
+    ('Warangal', 'Telangana', 17.97, 79.59, 4),
+    ('Belagavi', 'Karnataka', 15.85, 74.50, 4),
+    ('Mandya', 'Karnataka', 12.52, 76.90, 3),
+    ('Thanjavur', 'Tamil Nadu', 10.79, 79.14, 4),
+    ('Palakkad', 'Kerala', 10.78, 76.65, 2),
+    ('Jorhat', 'Assam', 26.75, 94.22, 2),
+]
+
+FIRST_NAMES = [
+    'Aarav', 'Abhishek', 'Anil', 'Anita', 'Arjun', 'Asha', 'Balwinder', 'Bhavna', 'Deepak', 'Divya',
+    'Ganesh', 'Geeta', 'Gurpreet', 'Harish', 'Indira', 'Jagdish', 'Kavita', 'Lakshmi', 'Mahesh', 'Manjula',
+    'Meena', 'Mohan', 'Nagaraj', 'Neha', 'Pooja', 'Prakash', 'Priya', 'Rajesh', 'Ramesh', 'Rekha',
+    'Sanjay', 'Savita', 'Shankar', 'Sita', 'Sunil', 'Sunita', 'Suresh', 'Usha', 'Venkatesh', 'Vijay',
+]
+LAST_NAMES = [
+    'Yadav', 'Patel', 'Singh', 'Reddy', 'Gowda', 'Kumar', 'Sharma', 'Patil', 'Jadhav', 'Nair',
+    'Das', 'Mandal', 'Sahu', 'Chaudhary', 'Verma', 'Naidu', 'Pillai', 'Gill', 'Sandhu', 'Rao',
+]
+_VILLAGE_PREFIXES = ['Ram', 'Shiv', 'Krishna', 'Lakshmi', 'Hanuman', 'Sita', 'Gopal', 'Chandra',
+                     'Surya', 'Devi', 'Ganesh', 'Madhav', 'Nand', 'Bhim', 'Kesav', 'Hari']
+_VILLAGE_SUFFIXES = ['pur', 'pura', 'nagar', 'gaon', 'halli', 'wadi', 'palli', 'garh', 'kheda', 'ganj', 'abad', 'patti']
+_FARM_KINDS = ['Farm', 'Fields', 'Khet', 'Bagh', 'Orchard', 'Plot', 'Estate']
+_LANGUAGE_WEIGHTS = (('en', 4), ('hi', 4), ('kn', 2))
+
+# Advisory-style sentences to stand in as translation cache sources.
+_SOURCE_TEMPLATES = [
+    'Irrigate the {crop} field early in the morning to reduce evaporation.',
+    'Heavy rain is expected in the next {hours} hours; clear the drainage channels.',
+    'Apply {amount} kg of nitrogen per hectare to {crop} at this stage.',
+    'Temperatures above {temp} degrees may stress {crop}; consider mulching.',
+    'Scout {crop} for pests twice a week during the {stage} stage.',
+    'Delay spraying until the wind drops below {speed} km/h.',
+]
+_SOURCE_WORDS = {
+    'crop': ['rice', 'wheat', 'maize', 'cotton', 'sugarcane', 'groundnut', 'millet', 'tomato', 'onion'],
+    'stage': ['sowing', 'vegetative', 'flowering', 'harvesting'],
+}
+# Consonants of each script, to give translated text a realistic byte length per language.
+_SCRIPT_LETTERS = {
+    language: [chr(code) for code in range(low, high + 1) if unicodedata.category(chr(code)) == 'Lo']
+    for language, (low, high) in {'hi': (0x0915, 0x0939), 'kn': (0x0C95, 0x0CB9)}.items()
+}
+
+USER_COLUMNS = ('id', 'username', 'first_name', 'last_name', 'email', 'phone', 'password_hash',
+                'language', 'created_at', 'last_login', 'is_verified')
+FARM_COLUMNS = ('id', 'name', 'location', 'latitude', 'longitude', 'area_hectares', 'area_geojson',
+                'created_at', 'geohash', 'user_id')
+ADVISORY_COLUMNS = ('id', 'title', 'content', 'priority', 'created_at', 'farm_id', 'is_read',
+                    'payload', 'payload_hash')
+TRANSLATION_COLUMNS = ('id', 'source_hash', 'source_lang', 'target_lang', 'translated_text')
+
+
+def rng_for(seed, name):
+    """An independent generator per table, so changing one table's size does not shift the others."""
+    return random.Random(f'{seed}:{name}')
+
+
+def _timestamp(now, rng, max_days):
+    return (now - timedelta(seconds=rng.random() * max_days * 86400)).strftime(_DATETIME_FORMAT)
+
+
+def users(rng, start_id, count, password_hash, now):
+    """Yields USER_COLUMNS tuples. Every user shares `password_hash`, so hashing runs once."""
+    languages = [language for language, weight in _LANGUAGE_WEIGHTS for _ in range(weight)]
+    for user_id in range(start_id, start_id + count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        username = f'{first.lower()}.{last.lower()}{user_id}'
+        age_days = rng.random() * 730
+        created = now - timedelta(days=age_days)
+        last_login = None
+        if rng.random() < 0.7:
+            last_login = (created + timedelta(days=rng.random() * age_days)).strftime(_DATETIME_FORMAT)
+        yield (user_id, username, first, last, f'{username}@example.com',
+               f'+91{rng.randint(6, 9)}{rng.randrange(10 ** 9):09d}', password_hash, rng.choice(languages),
+               created.strftime(_DATETIME_FORMAT), last_login, rng.random() < 0.9)
+
+
+def farm_boundary(rng, latitude, longitude, area_hectares):
+    """A rotated, slightly irregular quadrilateral of about `area_hectares` centred on the point."""
+    aspect = 1 + rng.random() * 2
+    width = math.sqrt(area_hectares * 10000 / aspect)
+    half_w, half_l = width / 2, width * aspect / 2
+    angle = rng.random() * math.pi
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    metres_per_lon = 111320 * math.cos(math.radians(latitude))
+    ring = []
+    for dx, dy in ((-half_l, -half_w), (half_l, -half_w), (half_l, half_w), (-half_l, half_w)):
+        dx *= 0.92 + rng.random() * 0.16
+        dy *= 0.92 + rng.random() * 0.16
+        x, y = dx * cos_a - dy * sin_a, dx * sin_a + dy * cos_a
+        ring.append([round(longitude + x / metres_per_lon, 6), round(latitude + y / 111320, 6)])
+    ring.append(ring[0])
+    return {'type': 'Polygon', 'coordinates': [ring]}
+
+
+def farms(rng, start_id, count, user_ids, now):
+    """Yields FARM_COLUMNS tuples owned by users picked from `user_ids`."""
+    weights = [region[4] for region in REGIONS]
+    min_lat, min_lon, max_lat, max_lon = INDIA_BOUNDS
+    for farm_id in range(start_id, start_id + count):
+        district, state, centre_lat, centre_lon, _ = rng.choices(REGIONS, weights)[0]
+        latitude = centre_lat + rng.gauss(0, FARM_SPREAD_KM) / 111.32
+        longitude = centre_lon + rng.gauss(0, FARM_SPREAD_KM) / (111.32 * math.cos(math.radians(centre_lat)))
+        latitude = round(min(max(latitude, min_lat), max_lat), 6)
+        longitude = round(min(max(longitude, min_lon), max_lon), 6)
+        area = min(max(rng.lognormvariate(math.log(1.1), 0.8), 0.1), 50.0)
+        geometry = farm_boundary(rng, latitude, longitude, area)
+        village = rng.choice(_VILLAGE_PREFIXES) + rng.choice(_VILLAGE_SUFFIXES)
+        yield (farm_id, f'{rng.choice(LAST_NAMES)} {rng.choice(_FARM_KINDS)}', f'{village}, {district}, {state}',
+               latitude, longitude, round(geo.polygon_area_hectares(geometry), 2),
+               json.dumps({'type': 'Feature', 'geometry': geometry, 'properties': {}}, separators=(',', ':')),
+               _timestamp(now, rng, 365), geo.encode(latitude, longitude), rng.choice(user_ids))
+
+
+def payload_pool(rng, make_payload, size=PAYLOAD_POOL_SIZE):
+    """[(priority, payload_json, payload_hash), ...] from `make_payload(rng)`, serialised as Advisory.from_payload does."""
+    pool = []
+    for _ in range(size):
+        payload = make_payload(rng)
+        payload_json = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        pool.append((payload['priority'], payload_json, hashlib.sha1(payload_json.encode('utf-8')).hexdigest()))
+    return pool
+
+
+def advisories(rng, start_id, count, farm_ids, pool, now, days=365):
+    """Yields ADVISORY_COLUMNS tuples spread over the last `days` days; older ones are mostly read."""
+    farm_count = len(farm_ids)
+    for advisory_id in range(start_id, start_id + count):
+        age_days = rng.random() * days
+        priority, payload_json, payload_hash = rng.choice(pool)
+        yield (advisory_id, '', '', priority, (now - timedelta(days=age_days)).strftime(_DATETIME_FORMAT),
+               farm_ids[int(farm_count * rng.random() ** ADVISORY_SKEW)],
+               rng.random() < (0.9 if age_days > 7 else 0.3), payload_json, payload_hash)
+
+
+def _source_text(rng, number):
+    template = rng.choice(_SOURCE_TEMPLATES)
+    text = template.format(crop=rng.choice(_SOURCE_WORDS['crop']), stage=rng.choice(_SOURCE_WORDS['stage']),
+                           hours=rng.choice((12, 24, 48)), amount=rng.randint(20, 120),
+                           temp=rng.randint(32, 42), speed=rng.randint(10, 20))
+    return f'{text} (ref {number})'  # Keeps (source_hash, target_lang) unique across runs
+
+
+def _translated_text(rng, source, target_lang):
+    letters = _SCRIPT_LETTERS.get(target_lang, 'abcdefghijklmnopqrstuvwxyz')
+    return ' '.join(''.join(rng.choice(letters) for _ in range(max(len(word) - 1, 1))) for word in source.split())
+
+
+def translations(rng, start_id, count, target_langs):
+    """Yields TRANSLATION_COLUMNS tuples: each English source is cached once per target language."""
+    source = source_hash = None
+    for index, row_id in enumerate(range(start_id, start_id + count)):
+        target_lang = target_langs[index % len(target_langs)]
+        if index % len(target_langs) == 0:
+            source = _source_text(rng, row_id)
+            source_hash = hashlib.sha256(source.encode('utf-8')).hexdigest()
+        yield row_id, source_hash, 'en', target_lang, _translated_text(rng, source, target_lang)
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if value is True or value is False:
+        return 't' if value else 'f'
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BulkLoader:
+    """Writes generated rows into the tables of `engine` through its raw DBAPI connection."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self._quote = engine.dialect.identifier_preparer.quote
+
+    def _scalar(self, sql):
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(sql)
+            return cursor.fetchone()[0]
+        finally:
+            connection.close()
+
+    def next_id(self, table):
+        return (self._scalar(f'SELECT MAX(id) FROM {self._quote(table.name)}') or 0) + 1
+
+    def ids(self, table):
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(f'SELECT id FROM {self._quote(table.name)} ORDER BY id')
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            connection.close()
+
+    def load(self, table, columns, rows, batch_size=10000, progress=None):
+        """Inserts every row of the iterable; `progress(rows_so_far)` is called after each batch. Returns (rows, seconds)."""
+        names = ', '.join(self._quote(column) for column in columns)
+        started, loaded = time.perf_counter(), 0
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            if self.dialect == 'postgresql':
+                sql = f'COPY {self._quote(table.name)} ({names}) FROM STDIN'
+            else:
+                placeholder = '%s' if self.engine.dialect.paramstyle in ('format', 'pyformat') else '?'
+                sql = f'INSERT INTO {self._quote(table.name)} ({names}) VALUES ({", ".join([placeholder] * len(columns))})'
+            for batch in _batches(rows, batch_size):
+                if self.dialect == 'postgresql':
+                    self._copy(cursor, sql, batch)
+                else:
+                    cursor.executemany(sql, batch)
+                connection.commit()
+                loaded += len(batch)
+                if progress:
+                    progress(loaded)
+        finally:
+            connection.close()
+        return loaded, time.perf_counter() - started
+
+    @staticmethod
+    def _copy(cursor, sql, batch):
+        data = ''.join('\t'.join(_copy_value(value) for value in row) + '\n' for row in batch)
+        if hasattr(cursor, 'copy_expert'):  # psycopg2
+            cursor.copy_expert(sql, io.StringIO(data))
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(data)
+
+    def finish(self, table):
+        """Moves the id sequence past the loaded ids (Postgres) and refreshes planner statistics."""
+        name = self._quote(table.name)
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            if self.dialect == 'postgresql':
+                cursor.execute(f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+                               f"(SELECT COALESCE(MAX(id), 1) FROM {name}))")
+            cursor.execute(f'ANALYZE {name}')
+            connection.commit()
+        finally:
+            connection.close()
@@ -0,0 +1,52 @@
+import threading
+import jobs
+from conftest import wait_until
+
+
+def test_pool_scales_up_to_max_threads_and_queues_the_rest():
+    release, started = threading.Event(), []
+    pool = jobs.ElasticPool('test', lambda item: (started.append(item), release.wait(2)),
+                            min_threads=0, max_threads=3, idle_timeout=5)
+    for item in range(5):
+        pool.submit(item)
+    assert wait_until(lambda: len(started) == 3)
+    assert pool.stats()['threads'] == 3
+    assert pool.stats()['queued'] == 2
+    release.set()
+    assert wait_until(lambda: len(started) == 5)
+
+
+def test_idle_threads_exit_down_to_min_threads():
+    release, done = threading.Event(), []
+    pool = jobs.ElasticPool('test', lambda item: (release.wait(2), done.append(item)),
+                            min_threads=1, max_threads=4, idle_timeout=0.1, sweep_interval=0.05)
+    pool.start()
+    for item in range(4):
+        pool.submit(item)
+    assert wait_until(lambda: pool.stats()['threads'] == 4)
+    release.set()
+    assert wait_until(lambda: len(done) == 4)
+    assert wait_until(lambda: pool.stats()['threads'] == 1)
+
+
+def test_failed_job_does_not_stop_its_thread():
+    done = []
+
+    def handler(item):
+        if item == 'bad':
+            raise RuntimeError('boom')
+        done.append(item)
+
+    pool = jobs.ElasticPool('test', handler, min_threads=1, max_threads=1, idle_timeout=5)
+    pool.submit('bad')
+    pool.submit('good')
+    assert wait_until(lambda: done == ['good'])
+    assert pool.stats()['threads'] == 1
+
+
+def test_sweep_feeds_undispatched_items_to_idle_threads():
+    swept, done = [['late']], []
+    pool = jobs.ElasticPool('test', done.append, min_threads=1, max_threads=1, idle_timeout=5,
+                            sweep=lambda: swept.pop() if swept else [], sweep_interval=0.05)
+    pool.start()
+    assert wait_until(lambda: done == ['late'])
@@ -0,0 +1,122 @@
+import time
+import pytest
+from flask import Flask, session
+import sessions
+
+
+class MemoryStore:
+    name = 'memory'
+
+    def __init__(self):
+        self.rows = {}
+
+    def load(self, key):
+        return self.rows.get(key)
+
+    def save(self, key, data, expires):
+        self.rows[key] = (data, expires)
+
+    def delete(self, key):
+        self.rows.pop(key, None)
+
+    def sweep(self, batch_size):
+        expired = [key for key, (_data, expires) in self.rows.items() if expires < time.time()][:batch_size]
+        for key in expired:
+            del self.rows[key]
+        return len(expired)
+
+
+@pytest.fixture
+def store():
+    return MemoryStore()
+
+
+@pytest.fixture
+def client(store):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.session_interface = sessions.ServerSessionInterface(store, sweep_seconds=0)
+
+    @app.route('/csrf')
+    def csrf():
+        session['csrf_token'] = session.get('csrf_token') or 'token'
+        return ''
+
+    @app.route('/login')
+    def login():
+        session['_user_id'] = '1'
+        return ''
+
+    @app.route('/logout')
+    def logout():
+        session.pop('_user_id', None)
+        session['note'] = 'signed out'
+        return ''
+
+    @app.route('/whoami')
+    def whoami():
+        return session.get('_user_id') or '-'
+
+    return app.test_client()
+
+
+def _cookie(client):
+    cookie = client.get_cookie('session')
+    return cookie.value if cookie else None
+
+
+def test_login_rotates_the_session_id(client, store):
+    client.get('/csrf')
+    client.get('/whoami')
+    client.get('/login')
+    first = _cookie(client)
+    assert store.load(sessions._store_key(first)) is not None
+    client.get('/logout')
+    second = _cookie(client)
+    assert second != first
+    assert store.load(sessions._store_key(first)) is None
+    client.get('/login')
+    third = _cookie(client)
+    assert third not in (first, second)
+    assert store.load(sessions._store_key(second)) is None
+    assert list(store.rows) == [sessions._store_key(third)]
+
+
+def test_old_id_no_longer_signs_in(client, store):
+    client.get('/login')
+    old = _cookie(client)
+    client.get('/logout')
+    client.set_cookie('session', old)
+    assert client.get('/whoami').get_data(as_text=True) == '-'
+
+
+def test_made_up_id_is_not_adopted(client, store):
+    client.set_cookie('session', 'chosen-by-attacker')
+    client.get('/login')
+    assert _cookie(client) != 'chosen-by-attacker'
+    assert sessions._store_key('chosen-by-attacker') not in store.rows
+
+
+def test_token_only_anonymous_session_stays_out_of_the_store(client, store):
+    client.get('/csrf')
+    assert _cookie(client).startswith('c.')
+    assert store.rows == {}
+    client.get('/login')
+    assert not _cookie(client).startswith('c.')
+    assert len(store.rows) == 1
+
+
+def test_unchanged_session_is_not_rewritten(client, store, monkeypatch):
+    client.get('/login')
+    writes = []
+    monkeypatch.setattr(store, 'save', lambda *args: writes.append(args))
+    for _ in range(3):
+        client.get('/whoami')
+    assert writes == []
+
+
+def test_sweep_removes_only_expired_sessions(store):
+    store.save('old', b'j{}', time.time() - 10)
+    store.save('new', b'j{}', time.time() + 10)
+    assert sessions.sweep_expired(store, 1, pause=0) == 1
+    assert list(store.rows) == ['new']
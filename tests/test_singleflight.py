@@ -0,0 +1,116 @@
+import threading
+import pytest
+import singleflight
+from conftest import wait_until
+
+
+@pytest.fixture(autouse=True)
+def local_locks_only():
+    singleflight.use_shared_locks(None, None)
+    yield
+    singleflight.use_shared_locks(None, None)
+
+
+@pytest.fixture
+def roles(monkeypatch):
+    """Roles recorded by Group.do; a 'follower' entry means that caller is about to wait."""
+    recorded = []
+    monkeypatch.setattr(singleflight.metrics, 'record_singleflight', lambda name, role: recorded.append(role))
+    return recorded
+
+
+def _call_in_threads(group, key, fn, count, results):
+    def call():
+        try:
+            results.append(('ok', group.do(key, fn)))
+        except Exception as e:
+            results.append(('error', e))
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_followers_share_the_leaders_result(roles):
+    group, release, calls = singleflight.Group('test'), threading.Event(), []
+
+    def fetch():
+        calls.append(1)
+        release.wait(2)
+        return 'value'
+
+    results = []
+    leader = _call_in_threads(group, 'k', fetch, 1, results)
+    wait_until(lambda: calls)
+    followers = _call_in_threads(group, 'k', fetch, 3, results)
+    assert wait_until(lambda: roles.count('follower') == 3)
+    release.set()
+    for thread in leader + followers:
+        thread.join(2)
+    assert calls == [1]
+    assert results == [('ok', 'value')] * 4
+
+
+def test_leader_error_propagates_to_followers(roles):
+    group, release, calls = singleflight.Group('test'), threading.Event(), []
+
+    def fetch():
+        calls.append(1)
+        release.wait(2)
+        raise ValueError('upstream down')
+
+    results = []
+    leader = _call_in_threads(group, 'k', fetch, 1, results)
+    wait_until(lambda: calls)
+    followers = _call_in_threads(group, 'k', fetch, 3, results)
+    assert wait_until(lambda: roles.count('follower') == 3)
+    release.set()
+    for thread in leader + followers:
+        thread.join(2)
+    assert calls == [1]
+    assert len(results) == 4
+    assert all(kind == 'error' and str(error) == 'upstream down' for kind, error in results)
+    assert group._calls == {}
+
+
+def test_follower_runs_its_own_call_after_wait_timeout():
+    group, release, started = singleflight.Group('test', wait_timeout=0.05), threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(2)
+        return 'leader'
+
+    results = []
+    leader = _call_in_threads(group, 'k', slow, 1, results)
+    started.wait(1)
+    assert group.do('k', lambda: 'follower') == 'follower'
+    release.set()
+    leader[0].join(2)
+    assert results == [('ok', 'leader')]
+
+
+def test_next_call_after_an_error_runs_again():
+    group = singleflight.Group('test')
+    with pytest.raises(ValueError):
+        group.do('k', lambda: (_ for _ in ()).throw(ValueError('once')))
+    assert group.do('k', lambda: 'fresh') == 'fresh'
+
+
+def test_shared_lock_holder_elsewhere_is_waited_for_through_recheck():
+    group, calls = singleflight.Group('test', wait_timeout=1.0), []
+    singleflight.use_shared_locks(lambda name, ttl: None, lambda name, token: None)
+    checks = []
+
+    def recheck():
+        checks.append(1)
+        return 'remote' if len(checks) >= 2 else None
+
+    assert group.do('k', lambda: calls.append(1) or 'local', recheck=recheck) == 'remote'
+    assert calls == []
+
+
+def test_shared_lock_wait_gives_up_after_timeout():
+    group = singleflight.Group('test', wait_timeout=0.05)
+    singleflight.use_shared_locks(lambda name, ttl: None, lambda name, token: None)
+    assert group.do('k', lambda: 'local', recheck=lambda: None) == 'local'
@@ -1,16 +1,26 @@
+import os
 import requests
 import hashlib
+import cache
+import logs
+import singleflight
+import metrics
+import upstream
 # REMOVED: from app import TranslationCache (Do NOT import it here at the top)
 
 # MyMemory API endpoint
-API_URL = "https://api.mymemory.translated.net/get"
+API_URL = os.environ.get("MYMEMORY_API_URL", "https://api.mymemory.translated.net/get")
 
 # Optional: Register for free at mymemory.translated.net and add your email here
 MYMEMORY_EMAIL = None # Example: 'your-email@example.com'
 
+# Shared cache in front of the TranslationCache table, which remains the durable copy.
+translation_cache = cache.Namespace('translation', ttl=None, maxsize=4096)
+translation_flight = singleflight.Group('translation')
+
 def translate_text(text, target_language='en', source_language='en'):
     """
-    Translates text using the MyMemory API with database caching.
+    Translates text using the MyMemory API with shared-cache and database caching.
     """
     # MOVED a local import here to prevent circular dependency
     from app import TranslationCache 
@@ -18,12 +28,27 @@ def translate_text(text, target_language='en', source_language='en'):
     if not text or target_language == source_language:
         return text
 
-    # 1. Check the cache first to save API calls
+    # 1. Check the caches first to save API calls
+    key = f"{target_language}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+    cached = translation_cache.get(key)
+    if cached:
+        return cached
     cached = TranslationCache.get_translation(text, target_language)
+    metrics.record_cache('translation_db', cached is not None)
     if cached:
+        translation_cache.set(key, cached)
         return cached
     
-    # 2. If not in cache, call the MyMemory API
+    # 2. If not in cache, call the MyMemory API (once for all concurrent callers)
+    translated_text = translation_flight.do(
+        key, lambda: _fetch_translation(text, target_language, source_language, key),
+        recheck=lambda: translation_cache.get(key))
+    return translated_text if translated_text is not None else text
+
+def _fetch_translation(text, target_language, source_language, key):
+    """Calls MyMemory and stores the result; returns None when the text stays untranslated."""
+    from app import TranslationCache
+
     try:
         lang_pair = f"{source_language}|{target_language}"
         
@@ -34,8 +59,7 @@ def translate_text(text, target_language='en', source_language='en'):
         if MYMEMORY_EMAIL:
             params['de'] = MYMEMORY_EMAIL
 
-        response = requests.get(API_URL, params=params, timeout=10)
-        response.raise_for_status() 
+        response = upstream.get('mymemory', API_URL, params=params)
 
         data = response.json()
         
@@ -44,15 +68,16 @@ def translate_text(text, target_language='en', source_language='en'):
             
             # 3. Store the new translation in the cache for future use
             TranslationCache.add_translation(text, source_language, target_language, translated_text)
+            translation_cache.set(key, translated_text)
             
             return translated_text
         else:
-            print(f"MyMemory API Error: {data.get('responseDetails')}")
-            return text 
+            logs.upstream_log.warning("Translation rejected", extra={'service': 'mymemory', 'target': target_language, 'error': data.get('responseDetails')})
+            return None
 
     except requests.exceptions.RequestException as e:
-        print(f"Error connecting to MyMemory API: {e}")
-        return text 
+        logs.upstream_log.error("Translation request failed", extra={'service': 'mymemory', 'target': target_language, 'error': str(e)})
+        return None
     except Exception as e:
-        print(f"An unexpected error occurred during translation: {e}")
-        return text
\ No newline at end of file
+        logs.log.exception("Unexpected translation error", extra={'target': target_language})
+        return None
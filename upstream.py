@@ -0,0 +1,17 @@
+import requests
+from metrics import track_upstream
+
+# Single entry point for outbound HTTP calls to third-party services, so every call is
+# timed and counted per service ('open-meteo', 'archive', 'nominatim', 'mymemory').
+
+DEFAULT_TIMEOUT = 10
+NOMINATIM_HEADERS = {'User-Agent': 'AgriAssist/1.0'}
+
+
+def get(service, url, **kwargs):
+    """requests.get with per-service metrics. Raises requests exceptions exactly like requests.get."""
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    with track_upstream(service):
+        response = requests.get(url, **kwargs)
+        response.raise_for_status()
+    return response